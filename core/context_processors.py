@@ -1,12 +1,17 @@
-from marketplace.services.reminders import pending_orders_expiring
+from django.utils.functional import SimpleLazyObject
 
-def reminders_cp(request):
-    count = 0
+from marketplace.services.badges import reminders_count
+
+
+def _safe_reminders_count(user_id):
     try:
-        user = getattr(request, 'user', None)
-        if user is not None and user.is_authenticated:
-            count = pending_orders_expiring(user=user).count()
+        return reminders_count(user_id)
     except Exception:
-        count = 0
-    return {"reminders_count": count}
+        return 0
 
+
+def reminders_cp(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {"reminders_count": 0}
+    return {"reminders_count": SimpleLazyObject(lambda: _safe_reminders_count(user.pk))}
@@ -3,23 +3,26 @@ from django.utils import timezone
 from django.utils.text import slugify
 from django.db.models import Count, F, Q
 from marketplace.models import Partner, Pack
+from marketplace.services.cards import pack_cards
+from marketplace.services.catalog_cache import cached_home_sections, catalog_http_cache
 from marketplace.services.filters import apply_pack_filters, ui_filter_state
 from marketplace.services.reminders import pending_orders_expiring
+from marketplace.services.search import in_rank_order, search_pack_ids, search_partner_ids
 from marketplace.utils.images import stock_image_url
 
-def home(request):
+def _home_sections(params):
     base = Pack.objects.all()
     # Limit to 12 for at most two rows on desktop; CSS further clamps per viewport
-    newest = apply_pack_filters(base, request.GET)[:12]
+    newest = pack_cards(apply_pack_filters(base, params), limit=12)
 
-    params = request.GET.copy()
+    params = params.copy()
     params_mb = params.copy()
     params_mb["orden"] = params_mb.get("orden") or "mas-comprado"
-    most_bought = apply_pack_filters(base, params_mb)[:12]
+    most_bought = pack_cards(apply_pack_filters(base, params_mb), limit=12)
 
     params_of = params.copy()
     params_of["oferta"] = "1"
-    offers = apply_pack_filters(base, params_of)[:12]
+    offers = pack_cards(apply_pack_filters(base, params_of), limit=12)
 
     # Category tiles: build stock URLs via helper (stable per slug)
     categories = [
@@ -31,14 +34,23 @@ def home(request):
     {"slug": "verduleria", "title": "Verdulerías", "img_url": stock_image_url("verduleria", "home-verduleria"), "url": "/categoria/verduleria/"},
     {"slug": "panaderia", "title": "Panaderías", "img_url": stock_image_url("panaderia", "home-panaderia"), "url": "/categoria/panaderia/"},
 ]
-
-    ctx = {
-        "filter_state": ui_filter_state(request.GET),
+    return {
         "newest": newest,
         "most_bought": most_bought,
         "offers": offers,
         "categories": categories,
     }
+
+
+@catalog_http_cache
+def home(request):
+    # Secciones comunes a todos los usuarios: cacheadas por filtros + generación del catálogo
+    sections = cached_home_sections(request.GET, lambda: _home_sections(request.GET))
+
+    ctx = {
+        "filter_state": ui_filter_state(request.GET),
+        **sections,
+    }
     expiring_for_user = []
     try:
         if request.user.is_authenticated:
@@ -61,14 +73,12 @@ def search(request):
     partners_qs = Partner.objects.none()
 
     if q:
-        # Nota: el modelo Partner de tu proyecto no tiene campo 'vigente'.
-        # Filtramos por nombre solamente.
-        partners_qs = Partner.objects.filter(nombre__icontains=q).order_by("nombre")
-
-        # Pack tampoco requiere 'vigente'; aplicamos búsqueda por título/descripcion/partner
-        packs_qs = Pack.objects.filter(
-            Q(titulo__icontains=q) | Q(etiqueta__icontains=q) | Q(partner__nombre__icontains=q)
-        )
+        # Índice de búsqueda (FTS5 / tsvector): ids ya ordenados por relevancia
+        partner_ids = search_partner_ids(q) if tipo != "packs" else []
+        pack_ids = search_pack_ids(q) if tipo != "partners" else []
+        partners_qs = in_rank_order(Partner.objects.all(), partner_ids)
+
+        packs_qs = Pack.objects.select_related("partner").filter(pk__in=pack_ids)
         if stock:
             packs_qs = packs_qs.filter(stock__gt=0)
         if oferta:
@@ -81,7 +91,7 @@ def search(request):
         elif orden == "reciente":
             packs_qs = packs_qs.order_by("-creado_at")
         else:
-            packs_qs = packs_qs.order_by("-stock", "-creado_at")
+            packs_qs = in_rank_order(packs_qs, pack_ids)
     else:
         packs_qs = Pack.objects.none()
         partners_qs = Partner.objects.none()
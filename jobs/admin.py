@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "run_at", "attempts", "max_attempts", "locked_by", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "dedupe_key")
+    readonly_fields = ("created_at", "finished_at", "locked_at", "last_error", "result")
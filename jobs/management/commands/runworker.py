@@ -0,0 +1,53 @@
+import logging
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.registry import ensure_periodic, registered_tasks
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de jobs en base (tabla jobs_job, sin broker). Ejecuta las tareas "
+        "registradas en <app>/tasks.py, con reintentos y backoff, y programa las periódicas "
+        "(expiración, recordatorios, holds de stock, conciliación de pagos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=getattr(settings, "JOBS_CONCURRENCY", 4),
+                            help="Jobs en paralelo (hilos, una conexión a la base cada uno).")
+        parser.add_argument("--poll", type=float, default=getattr(settings, "JOBS_POLL_INTERVAL", 2.0),
+                            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--only", action="append", help="Ejecutar solo esta tarea (repetible).")
+        parser.add_argument("--once", action="store_true", help="Ejecutar los jobs vencidos y salir.")
+        parser.add_argument("--no-periodic", action="store_true", help="No programar tareas periódicas.")
+        parser.add_argument("--list", action="store_true", help="Listar las tareas registradas y salir.")
+
+    def handle(self, *args, **opts):
+        if opts["list"]:
+            for name, spec in sorted(registered_tasks().items()):
+                every = f"cada {spec.every:.0f}s" if spec.every else "a demanda"
+                self.stdout.write(f"{name:<40}{every:<16}intentos={spec.max_attempts} concurrencia={spec.concurrency or '-'}")
+            return
+
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        worker = Worker(concurrency=opts["concurrency"], only=opts["only"], periodic=not opts["no_periodic"])
+
+        if opts["once"]:
+            if worker.periodic:
+                ensure_periodic()
+            worker.requeue_stale()
+            ran = worker.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Jobs ejecutados: {ran}"))
+            return
+
+        def shutdown(signum, frame):
+            self.stdout.write("Deteniendo worker (termina los jobs en curso)...")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(f"Worker {worker.name}: {len(worker.task_names())} tareas, concurrencia {worker.concurrency}")
+        worker.run(poll_interval=opts["poll"])
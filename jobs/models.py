@@ -0,0 +1,51 @@
+from django.db import models
+from django.db.models import Q
+
+
+class Job(models.Model):
+    """
+    Tarea encolada en la base. La toma un `manage.py runworker`; ver jobs/registry.py
+    para declarar tareas y jobs/worker.py para el ciclo de vida.
+    """
+
+    class Estado(models.TextChoices):
+        QUEUED = "queued", "En cola"
+        RUNNING = "running", "Ejecutando"
+        DONE = "done", "Terminada"
+        FAILED = "failed", "Fallida"
+
+    name = models.CharField(max_length=120)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Estado.choices, default=Estado.QUEUED)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Evita duplicados mientras haya uno en cola o corriendo (periódicas, reintentos de webhooks)
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    locked_by = models.CharField(max_length=120, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim: próximas en cola por run_at
+            models.Index(
+                fields=["run_at"],
+                condition=Q(status="queued"),
+                name="job_queued_run_at_idx",
+            ),
+            models.Index(fields=["status", "locked_at"], name="job_status_locked_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=Q(status__in=["queued", "running"]),
+                name="job_active_dedupe_key_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name}#{self.pk} ({self.status})"
@@ -0,0 +1,103 @@
+"""
+Registro de tareas y encolado.
+
+    from jobs.registry import task, enqueue
+
+    @task("marketplace.expire_orders", every=300, max_attempts=3)
+    def expire_orders():
+        ...
+
+    enqueue("payments.process_webhook", {"event_id": 12}, dedupe_key="mp:12")
+
+Las tareas se declaran en <app>/tasks.py (JobsConfig.ready las importa). Los
+argumentos viajan como JSON (`kwargs` de Job): pasar ids, no instancias.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+class TaskSpec:
+    def __init__(self, name, func, max_attempts=5, retry_backoff=30, max_backoff=3600,
+                 concurrency=None, every=None, timeout=600):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        # Segundos antes del primer reintento; se duplica en cada intento (tope max_backoff)
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        # Máximo de jobs de esta tarea corriendo a la vez entre todos los workers
+        self.concurrency = concurrency
+        # Periódica: segundos entre el fin de una corrida y la siguiente
+        self.every = every
+        # Un job "running" más viejo que esto se considera de un worker caído y se reencola
+        self.timeout = timeout
+
+    def backoff(self, attempts):
+        return min(self.max_backoff, self.retry_backoff * 2 ** max(attempts - 1, 0))
+
+    @property
+    def periodic_key(self):
+        return f"periodic:{self.name}"
+
+
+_registry = {}
+
+
+def task(name, **options):
+    """Decorador: registra `func` como tarea `name` (ver TaskSpec para las opciones)."""
+    def decorator(func):
+        _registry[name] = TaskSpec(name, func, **options)
+        func.task_name = name
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def registered_tasks():
+    return dict(_registry)
+
+
+def enqueue(name, kwargs=None, run_at=None, delay=None, dedupe_key=None, max_attempts=None):
+    """
+    Encola una corrida de `name`. Con `dedupe_key`, si ya hay un job activo (en cola
+    o corriendo) con esa clave devuelve ese en vez de crear otro.
+    Dentro de una transacción el worker recién lo ve después del COMMIT.
+    """
+    from .models import Job
+
+    spec = _registry.get(name)
+    if spec is None:
+        raise LookupError(f"Tarea no registrada: {name}")
+    run_at = run_at or timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    job = Job(
+        name=name, kwargs=kwargs or {}, run_at=run_at, dedupe_key=dedupe_key,
+        max_attempts=max_attempts or spec.max_attempts,
+    )
+    if not dedupe_key:
+        job.save()
+        return job
+    active = Job.objects.filter(dedupe_key=dedupe_key, status__in=[Job.Estado.QUEUED, Job.Estado.RUNNING])
+    existing = active.first()
+    if existing:
+        return existing
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        # Otro proceso lo encoló entre el SELECT y el INSERT
+        return active.first()
+
+
+def ensure_periodic(now=None):
+    """Deja encolada la próxima corrida de cada tarea periódica que no tenga una activa."""
+    now = now or timezone.now()
+    return [enqueue(spec.name, run_at=now, dedupe_key=spec.periodic_key)
+            for spec in _registry.values() if spec.every]
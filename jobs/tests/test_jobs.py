@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import enqueue, ensure_periodic, task
+from jobs.worker import Worker
+
+CALLS = []
+
+
+@task("tests.echo")
+def echo(value=None):
+    CALLS.append(value)
+    return {"value": value}
+
+
+@task("tests.boom", max_attempts=2, retry_backoff=10)
+def boom():
+    raise RuntimeError("boom")
+
+
+@task("tests.limited", concurrency=1)
+def limited():
+    return None
+
+
+@task("tests.tick", every=60)
+def tick():
+    return "tick"
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.worker = Worker(only=["tests.echo", "tests.boom", "tests.limited", "tests.tick"], name="test")
+
+    def test_enqueue_and_run(self):
+        job = enqueue("tests.echo", {"value": 7})
+        later = enqueue("tests.echo", {"value": 8}, delay=3600)
+        self.assertEqual(self.worker.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Estado.DONE)
+        self.assertEqual(job.result, {"value": 7})
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(CALLS, [7])
+        later.refresh_from_db()
+        self.assertEqual(later.status, Job.Estado.QUEUED)
+
+    def test_unknown_task(self):
+        with self.assertRaises(LookupError):
+            enqueue("tests.nope")
+
+    def test_dedupe_key_while_active(self):
+        a = enqueue("tests.echo", dedupe_key="k")
+        self.assertEqual(enqueue("tests.echo", dedupe_key="k").pk, a.pk)
+        self.worker.run_pending()
+        self.assertNotEqual(enqueue("tests.echo", dedupe_key="k").pk, a.pk)
+
+    def test_retry_with_backoff_then_failed(self):
+        job = enqueue("tests.boom")
+        start = timezone.now()
+        self.worker.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Estado.QUEUED)
+        self.assertGreaterEqual(job.run_at, start + timedelta(seconds=10))
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.worker.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Estado.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_concurrency_limit(self):
+        for _ in range(3):
+            enqueue("tests.limited")
+        enqueue("tests.echo")
+        claimed = self.worker.claim(10)
+        self.assertEqual(sorted(j.name for j in claimed), ["tests.echo", "tests.limited"])
+        # Mientras uno corre, el otro worker no toma más de esa tarea
+        self.assertEqual(Worker(only=["tests.limited"], name="other").claim(10), [])
+
+    def test_periodic_reschedules(self):
+        ensure_periodic()
+        ensure_periodic()
+        self.assertEqual(Job.objects.filter(name="tests.tick").count(), 1)
+        self.worker.run_pending()
+        nxt = Job.objects.get(name="tests.tick", status=Job.Estado.QUEUED)
+        self.assertGreater(nxt.run_at, timezone.now() + timedelta(seconds=50))
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue("tests.echo")
+        self.worker.claim(1)
+        self.assertEqual(self.worker.requeue_stale(), 0)
+        later = timezone.now() + timedelta(hours=1)
+        self.assertEqual(self.worker.requeue_stale(now=later), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Estado.QUEUED)
+        self.assertEqual([j.pk for j in self.worker.claim(1, now=later)], [job.pk])
@@ -0,0 +1,182 @@
+"""
+Worker de la cola en base (sin broker).
+
+Ciclo: reencolar jobs de workers caídos -> tomar hasta N jobs vencidos (claim con
+un UPDATE condicional, `SKIP LOCKED` en Postgres) -> ejecutarlos en un pool de
+hilos -> marcar done / reintentar con backoff exponencial / failed. Las tareas
+periódicas se reprograman al terminar cada corrida.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+from .registry import enqueue, ensure_periodic, get_task, registered_tasks
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class Worker:
+    def __init__(self, concurrency=1, only=None, name=None, periodic=True):
+        self.concurrency = max(1, concurrency)
+        self.only = set(only or [])
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.periodic = periodic
+        self._stop = threading.Event()
+
+    # --- selección --------------------------------------------------------------
+    def task_names(self):
+        names = registered_tasks().keys()
+        return [n for n in names if not self.only or n in self.only]
+
+    def requeue_stale(self, now=None):
+        """Jobs 'running' cuyo worker murió: vuelven a la cola (o fallan si no quedan intentos)."""
+        now = now or timezone.now()
+        requeued = 0
+        for name, spec in registered_tasks().items():
+            stale = Job.objects.filter(
+                name=name, status=Job.Estado.RUNNING, locked_at__lt=now - timedelta(seconds=spec.timeout),
+            )
+            stale.filter(attempts__gte=F("max_attempts")).update(
+                status=Job.Estado.FAILED, finished_at=now, last_error="Timeout: worker perdido",
+            )
+            requeued += stale.update(status=Job.Estado.QUEUED, locked_by="", run_at=now)
+        return requeued
+
+    def claim(self, limit, now=None):
+        """Toma hasta `limit` jobs vencidos respetando el `concurrency` de cada tarea."""
+        now = now or timezone.now()
+        names = self.task_names()
+        if not names or limit <= 0:
+            return []
+        specs = registered_tasks()
+        limited = {n: specs[n].concurrency for n in names if specs[n].concurrency}
+        running = {}
+        if limited:
+            running = dict(Job.objects
+                           .filter(status=Job.Estado.RUNNING, name__in=limited)
+                           .values_list("name")
+                           .annotate(c=Count("id")))
+
+        token = f"{self.name}:{uuid.uuid4().hex[:12]}"
+        with transaction.atomic():
+            qs = (Job.objects
+                  .filter(status=Job.Estado.QUEUED, run_at__lte=now, name__in=names)
+                  .order_by("run_at", "id"))
+            if connection.features.has_select_for_update_skip_locked:
+                qs = qs.select_for_update(skip_locked=True)
+            picked = []
+            for job_id, name in qs.values_list("id", "name")[: limit * 4]:
+                if name in limited:
+                    if running.get(name, 0) >= limited[name]:
+                        continue
+                    running[name] = running.get(name, 0) + 1
+                picked.append(job_id)
+                if len(picked) >= limit:
+                    break
+            if not picked:
+                return []
+            # Condicional sobre status: si otro worker ganó alguno (SQLite), no se pisa
+            Job.objects.filter(id__in=picked, status=Job.Estado.QUEUED).update(
+                status=Job.Estado.RUNNING, locked_by=token, locked_at=now, attempts=F("attempts") + 1,
+            )
+        return list(Job.objects.filter(locked_by=token, status=Job.Estado.RUNNING).order_by("run_at", "id"))
+
+    # --- ejecución --------------------------------------------------------------
+    def execute(self, job):
+        spec = get_task(job.name)
+        mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+        t0 = time.perf_counter()
+        try:
+            result = spec.func(**job.kwargs)
+        except Exception as exc:
+            now = timezone.now()
+            error = "".join(traceback.format_exception(exc))[-4000:]
+            if job.attempts < job.max_attempts:
+                delay = spec.backoff(job.attempts) * random.uniform(1, 1.1)
+                mine.update(status=Job.Estado.QUEUED, locked_by="", last_error=error,
+                            run_at=now + timedelta(seconds=delay))
+                logger.warning("Job %s falló (intento %s/%s), reintento en %.0fs",
+                               job, job.attempts, job.max_attempts, delay)
+            else:
+                mine.update(status=Job.Estado.FAILED, finished_at=now, last_error=error)
+                logger.error("Job %s falló definitivamente: %s", job, exc)
+            ok = False
+        else:
+            mine.update(status=Job.Estado.DONE, finished_at=timezone.now(), last_error="",
+                        result=_jsonable(result))
+            ok = True
+        logger.info("Job %s %s en %.1f ms", job, "ok" if ok else "error", (time.perf_counter() - t0) * 1000)
+        if spec.every:
+            # Si quedó en cola para reintento, el dedupe_key evita duplicarla
+            enqueue(spec.name, delay=spec.every, dedupe_key=spec.periodic_key)
+        return ok
+
+    def _execute_in_thread(self, job):
+        close_old_connections()
+        try:
+            return self.execute(job)
+        finally:
+            close_old_connections()
+
+    def run_pending(self, max_jobs=None):
+        """Ejecuta en este hilo los jobs vencidos hasta vaciar la cola (o `max_jobs`). Devuelve cuántos corrió."""
+        done = 0
+        while max_jobs is None or done < max_jobs:
+            jobs = self.claim(1)
+            if not jobs:
+                break
+            self.execute(jobs[0])
+            done += 1
+        return done
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, poll_interval=2.0, periodic_every=60):
+        """Loop del worker: hasta `concurrency` jobs en paralelo, cada uno con su conexión."""
+        inflight = set()
+        lock = threading.Lock()
+        last_periodic = 0.0
+
+        def done(future):
+            with lock:
+                inflight.discard(future)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job") as pool:
+            while not self._stop.is_set():
+                if self.periodic and time.monotonic() - last_periodic > periodic_every:
+                    ensure_periodic()
+                    self.requeue_stale()
+                    last_periodic = time.monotonic()
+                with lock:
+                    free = self.concurrency - len(inflight)
+                jobs = self.claim(free) if free else []
+                for job in jobs:
+                    future = pool.submit(self._execute_in_thread, job)
+                    with lock:
+                        inflight.add(future)
+                    future.add_done_callback(done)
+                if not jobs:
+                    self._stop.wait(poll_interval)
+            logger.info("Worker %s: esperando %s jobs en curso", self.name, len(inflight))
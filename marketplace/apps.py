@@ -7,8 +7,13 @@ class MarketplaceConfig(AppConfig):
 
     def ready(self):
         # Ensure additional models modules are imported so Django registers them
+        from . import checks  # noqa: F401
         from . import models_cart  # noqa: F401
         from . import signals  # noqa: F401
+        from .utils.images import stock_index
+
+        # Indexar static/img/stock una sola vez por proceso
+        stock_index.build()
         if getattr(settings, "AUTO_CREATE_DEMO_PACKS", True):
             try:
                 from .services.demo_seed import ensure_demo_packs
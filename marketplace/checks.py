@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register("marketplace", deploy=True)
+def stock_stream_url_check(app_configs=None, **kwargs):
+    """`check --deploy`: sin STOCK_STREAM_URL las páginas no tienen stock en vivo."""
+    if getattr(settings, "STOCK_STREAM_URL", ""):
+        return []
+    return [Warning(
+        "STOCK_STREAM_URL no está configurada: el sitio corre en WSGI y packs:stock_stream "
+        "responde 204, así que las páginas no muestran el stock en vivo.",
+        hint="Levantar el proceso ASGI aparte (Procfile \"stream\" o render_stream_start.sh) "
+             "y setear STOCK_STREAM_URL con su URL absoluta de /packs/stock/stream/.",
+        id="marketplace.W001",
+    )]
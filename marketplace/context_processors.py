@@ -1,14 +1,18 @@
-from .models_cart import Cart
+from django.conf import settings
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
+from .services.badges import cart_count
 
 
 def cart_badge(request):
-    count = 0
+    # Lazy: solo consulta (caché y, si falta, la base) si el template usa el badge
     user = getattr(request, "user", None)
-    if user and user.is_authenticated:
-        try:
-            cart = Cart.objects.get(user=user)
-            count = cart.item_count()
-        except Cart.DoesNotExist:
-            count = 0
-    return {"cart_count": count}
+    if not (user and user.is_authenticated):
+        return {"cart_count": 0}
+    return {"cart_count": SimpleLazyObject(lambda: cart_count(user.pk))}
+
 
+def stock_stream_url(request):
+    # El stream corre en un proceso ASGI aparte (ver STOCK_STREAM_URL en settings)
+    return {"stock_stream_url": settings.STOCK_STREAM_URL or reverse("packs:stock_stream")}
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.services.bench import RESERVE_MODES, reservation_contention
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de contención: N compradores reservan el mismo pack en paralelo. "
+        "Compara el lock de fila anterior (lock) con el UPDATE condicional (conditional). "
+        "Falla si hay sobreventa. Usar contra Postgres para números representativos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=500)
+        parser.add_argument("--stock", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=32, help="Hilos (una conexión cada uno).")
+        parser.add_argument("--mode", choices=[*RESERVE_MODES, "both"], default="both")
+        parser.add_argument("--json", action="store_true", help="Imprimir resultados en JSON.")
+
+    def handle(self, *args, **opts):
+        modes = list(RESERVE_MODES) if opts["mode"] == "both" else [opts["mode"]]
+        results = [
+            reservation_contention(opts["buyers"], opts["stock"], opts["workers"], mode=mode)
+            for mode in modes
+        ]
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{'modo':<13}{'intentos/s':>11}{'p95 ms':>9}{'vendidos':>10}{'rechazos':>10}{'errores':>9}{'reintentos':>11}{'stock':>7}{'lock p95 ms':>13}"
+            )
+            for r in results:
+                self.stdout.write(
+                    f"{r['mode']:<13}{r['attempts_per_s']:>11}{r['p95_ms']:>9}{r['sold']:>10}"
+                    f"{r['rejected']:>10}{r['errors']:>9}{r['retries']:>11}{r['final_stock']:>7}{r['lock_hold_p95_ms']!s:>13}"
+                )
+        oversold = [r["mode"] for r in results if r["oversold"]]
+        if oversold:
+            raise CommandError(f"Sobreventa en: {', '.join(oversold)}")
@@ -0,0 +1,65 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from marketplace.models import Partner
+from marketplace.services.bench import DEFAULT_BUDGETS, check_budgets, run_benchmarks
+from marketplace.services.demo_seed import seed_scaled
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de vistas y endpoints públicos: queries, p50/p95 y memoria por request. "
+        "Falla (exit 1) si algún valor supera su presupuesto. Con --seed genera antes el "
+        "dataset grande (por defecto 10k partners / 200k packs / 2M órdenes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="Generar el dataset de benchmark antes de medir.")
+        parser.add_argument("--partners", type=int, default=10_000)
+        parser.add_argument("--packs", type=int, default=200_000)
+        parser.add_argument("--orders", type=int, default=2_000_000)
+        parser.add_argument("--runs", type=int, default=20, help="Requests medidos por target.")
+        parser.add_argument("--only", action="append", help="Medir solo este target (repetible).")
+        parser.add_argument("--budgets", type=str, default="", help="JSON con presupuestos que pisan los por defecto.")
+        parser.add_argument("--json", action="store_true", help="Imprimir resultados en JSON.")
+        parser.add_argument("--no-fail", action="store_true", help="Reportar violaciones sin fallar.")
+
+    def handle(self, *args, **opts):
+        if opts["seed"]:
+            user = seed_scaled(opts["partners"], opts["packs"], opts["orders"], log=self.stdout.write)
+        else:
+            user = get_user_model().objects.filter(username="bench_user").first()
+            if user is None:
+                raise CommandError("No existe bench_user: correr primero con --seed.")
+
+        partner = Partner.objects.filter(slug__startswith="bench-").order_by("id").first()
+        if partner is None:
+            raise CommandError("No hay partners de benchmark: correr primero con --seed.")
+
+        budgets = {k: dict(v) for k, v in DEFAULT_BUDGETS.items()}
+        if opts["budgets"]:
+            with open(opts["budgets"], encoding="utf-8") as fh:
+                for name, override in json.load(fh).items():
+                    budgets.setdefault(name, {}).update(override)
+
+        results = run_benchmarks(user, partner.slug, runs=opts["runs"], only=opts["only"])
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(f"{'target':<20}{'status':>7}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}{'mem KiB':>10}")
+            for name, r in results.items():
+                self.stdout.write(
+                    f"{name:<20}{r['status']:>7}{r['queries']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['mem_kb']:>10}"
+                )
+
+        errors = check_budgets(results, budgets)
+        if not errors:
+            self.stdout.write(self.style.SUCCESS("Todo dentro de presupuesto."))
+            return
+        for err in errors:
+            self.stdout.write(self.style.ERROR(err))
+        if not opts["no_fail"]:
+            raise CommandError(f"{len(errors)} presupuestos excedidos")
@@ -1,11 +1,12 @@
 # marketplace/management/commands/expire_orders.py
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import transaction
-from marketplace.models import Order
+from marketplace.services.expiry import expire_orders, expiring_orders
 
 class Command(BaseCommand):
-    help = "Marca como EXPIRADO las órdenes cuya franja de retiro ya terminó (pickup_end < now) y estén en PENDIENTE o PAGADO."
+    help = (
+        "Marca como EXPIRADO las órdenes cuya franja de retiro ya terminó (pickup_end < now) y estén en "
+        "PENDIENTE o PAGADO. Trabaja en tandas y devuelve el stock de las pendientes."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -13,22 +14,20 @@ class Command(BaseCommand):
             action="store_true",
             help="Muestra cuántas órdenes expirarían sin modificar la base.",
         )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Órdenes por transacción.")
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="Corta después de N tandas; la próxima corrida sigue desde ahí.")
 
     def handle(self, *args, **options):
-        now = timezone.now()
-        estados_target = [Order.Estado.PENDIENTE, Order.Estado.PAGADO]
-
-        qs = Order.objects.select_related("pack").filter(
-            estado__in=estados_target,
-            pack__pickup_end__lt=now,
-        )
-
-        count = qs.count()
         if options["dry_run"]:
+            count = expiring_orders().count()
             self.stdout.write(self.style.WARNING(f"[dry-run] Órdenes a expirar: {count}"))
             return
 
-        with transaction.atomic():
-            updated = qs.update(estado=Order.Estado.EXPIRADO)
-
-        self.stdout.write(self.style.SUCCESS(f"Órdenes expiradas: {updated}"))
+        stats = expire_orders(batch_size=options["batch_size"], max_batches=options["max_batches"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Órdenes expiradas: {stats['expired']} · stock devuelto: {stats['stock_returned']} · "
+            f"{stats['batches']} tandas en {stats['seconds']}s ({stats['per_second']}/s)"
+        ))
+        if not stats["done"]:
+            self.stdout.write(self.style.WARNING("Quedan órdenes por expirar: volver a correr para seguir."))
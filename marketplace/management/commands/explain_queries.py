@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from marketplace.services.filters import apply_pack_filters
+from marketplace.services.reminders import pending_orders_expiring
+
+
+def hot_queries():
+    """
+    Querysets con la misma forma que las vistas/comandos más usados.
+    (nombre, queryset) — los ids usados son los primeros que haya en la base.
+    """
+    now = timezone.now()
+    user = get_user_model().objects.order_by("id").first()
+    partner = Partner.objects.order_by("id").first()
+    pack = Pack.objects.order_by("id").first()
+    user_id = user.id if user else 0
+    partner_id = partner.id if partner else 0
+    pack_id = pack.id if pack else 0
+
+    live = dict(stock__gt=0, pickup_start__lte=now, pickup_end__gte=now)
+    return [
+        ("home: nuevo", apply_pack_filters(Pack.objects.all(), {})[:12]),
+        ("home: mas-comprado", apply_pack_filters(Pack.objects.all(), {"orden": "mas-comprado"})[:12]),
+        ("home: ofertas", apply_pack_filters(Pack.objects.all(), {"oferta": "1"})[:12]),
+        ("/packs/ stock+abierto", Pack.objects.filter(**live).order_by("-creado_at")[:24]),
+        ("/api/packs/?vigentes=1", Pack.objects.select_related("partner").filter(**live).order_by("-creado_at")[:12]),
+        ("/categoria/<slug>/", Pack.objects.filter(partner__categoria="cafe").order_by("-creado_at")[:24]),
+        ("/c/<slug>/", Pack.objects.filter(partner_id=partner_id).order_by("-creado_at")[:24]),
+        ("/merchant/<slug>/", Pack.objects.filter(partner_id=partner_id, **live).order_by("-creado_at")),
+        ("/mis-pedidos/", Order.objects.select_related("pack", "pack__partner").filter(user_id=user_id).order_by("-creado_at")[:24]),
+        ("/mis-pedidos/?estado=pendiente", Order.objects.filter(user_id=user_id, estado="pendiente").order_by("-creado_at")[:24]),
+        ("reservar: duplicada", Order.objects.filter(user_id=user_id, pack_id=pack_id, estado__in=["pendiente", "pagado"])),
+        ("send_reminders", pending_orders_expiring()),
+        ("expire_orders", Order.objects.filter(estado__in=["pendiente", "pagado"], pack__pickup_end__lt=now)),
+        ("oferta", Pack.objects.filter(precio_oferta__lt=F("precio_original"), pickup_end__gte=now).order_by("-creado_at")[:12]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Imprime EXPLAIN de las queries calientes (listados, mis pedidos, recordatorios). "
+        "Con --compare muestra el plan SIN los índices de Meta.indexes (borrados dentro de una "
+        "transacción que se revierte) y CON ellos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--compare", action="store_true", help="Mostrar plan antes/después de los índices.")
+        parser.add_argument("--only", type=str, default="", help="Filtrar por substring del nombre de la query.")
+
+    def _explain_all(self, label, only):
+        for name, qs in hot_queries():
+            if only and only not in name:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{label}] {name}"))
+            try:
+                self.stdout.write(qs.explain())
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"  (sin plan: {e})"))
+            self.stdout.write("")
+
+    def handle(self, *args, **opts):
+        only = opts["only"]
+        self.stdout.write(f"Backend: {connection.vendor}")
+        if not opts["compare"]:
+            self._explain_all("actual", only)
+            return
+
+        models_with_indexes = [(m, list(m._meta.indexes)) for m in (Pack, Order)]
+        with transaction.atomic():
+            sid = transaction.savepoint()
+            # DROP INDEX a mano: el schema editor de SQLite no se puede usar dentro
+            # de una transacción, y el rollback del savepoint los vuelve a crear.
+            with connection.cursor() as cursor:
+                for model, indexes in models_with_indexes:
+                    for index in indexes:
+                        try:
+                            with transaction.atomic():
+                                cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                        except Exception as e:
+                            self.stdout.write(self.style.WARNING(f"No se pudo quitar {index.name}: {e}"))
+            self._explain_all("sin índices", only)
+            transaction.savepoint_rollback(sid)
+        self._explain_all("con índices", only)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from marketplace.models import StockHold
+from marketplace.services.inventory import reap_expired_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Libera el stock apartado por checkouts no pagados: cancela las órdenes pendientes "
+        "cuyo StockHold venció (STOCK_HOLD_TTL) y borra los holds vencidos. Correr por cron "
+        "cada minuto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo contar los holds vencidos.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = StockHold.objects.filter(expires_at__lt=timezone.now()).count()
+            self.stdout.write(self.style.WARNING(f"[dry-run] Holds vencidos: {count}"))
+            return
+        cancelled, deleted = reap_expired_holds(batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Órdenes canceladas: {cancelled} · holds liberados: {deleted}"))
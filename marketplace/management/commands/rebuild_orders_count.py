@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.models import Pack
+
+
+class Command(BaseCommand):
+    help = "Recalcula Pack.orders_count (órdenes no canceladas) desde la tabla de órdenes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pack", type=int, action="append", dest="packs", help="Limitar a estos pack ids (repetible).")
+
+    def handle(self, *args, **opts):
+        updated = Pack.rebuild_orders_count(pack_ids=opts.get("packs"))
+        self.stdout.write(self.style.SUCCESS(f"Packs recalculados: {updated}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.models import Partner, Pack
+from marketplace.services.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Regenera el índice de búsqueda (FTS5 en SQLite, tsvector en Postgres) de packs y comercios."
+
+    def handle(self, *args, **opts):
+        backend = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice '{backend}' regenerado: {Pack.objects.count()} packs, {Partner.objects.count()} comercios"
+        ))
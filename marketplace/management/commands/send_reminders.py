@@ -1,36 +1,36 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from marketplace.services.reminders import pending_orders_expiring, send_reminder_email
+from marketplace.services.reminders import orders_to_remind, send_due_reminders
 
 
 class Command(BaseCommand):
-    help = "Envía emails de recordatorio para pedidos pendientes cuyo retiro vence pronto."
+    help = (
+        "Envía emails de recordatorio para pedidos pendientes cuyo retiro vence pronto. "
+        "Cada pedido se recuerda una sola vez (Order.reminded_at)."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("--dry-run", action="store_true", help="No envía, solo lista.")
-        parser.add_argument("--limit", type=int, default=200, help="Máximo de recordatorios a procesar.")
+        parser.add_argument("--limit", type=int, default=None, help="Máximo de recordatorios a procesar.")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Pedidos leídos por tanda.")
+        parser.add_argument("--workers", type=int, default=4, help="Envíos en paralelo (una conexión SMTP cada uno).")
 
     def handle(self, *args, **opts):
         if not getattr(settings, "REMINDER_ENABLED", True):
             self.stdout.write(self.style.WARNING("Recordatorios deshabilitados por settings.REMINDER_ENABLED=False"))
             return
 
-        qs = pending_orders_expiring()[: opts["limit"]]
-        if not qs.exists():
-            self.stdout.write("No hay pedidos por vencer dentro de la ventana.")
-            return
-
-        sent = 0
-        for o in qs:
-            if opts["dry_run"]:
+        if opts["dry_run"]:
+            qs = orders_to_remind()
+            if opts["limit"]:
+                qs = qs[: opts["limit"]]
+            for o in qs.iterator(chunk_size=opts["chunk_size"]):
                 self.stdout.write(f"[DRY] Pedido #{o.id} → {getattr(getattr(o, 'user', None), 'email', '-')}")
-                continue
-            ok = send_reminder_email(o)
-            if ok:
-                sent += 1
-                self.stdout.write(self.style.SUCCESS(f"✓ Enviado #{o.id}"))
-            else:
-                self.stdout.write(self.style.WARNING(f"✗ No se pudo enviar #{o.id}"))
+            return
 
+        sent, failed = send_due_reminders(
+            limit=opts["limit"], chunk_size=opts["chunk_size"], workers=opts["workers"],
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f"✗ No se pudieron enviar: {failed}"))
         self.stdout.write(self.style.MIGRATE_HEADING(f"Total enviados: {sent}"))
-
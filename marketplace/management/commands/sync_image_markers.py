@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.models import Partner, Pack
+
+
+class Command(BaseCommand):
+    help = "Recalcula imagen_presente contra el storage (por si se borraron archivos de media a mano)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo informa diferencias, no guarda.")
+
+    def handle(self, *args, **opts):
+        total_changed = 0
+        for Model in (Partner, Pack):
+            to_true, to_false = [], []
+            for obj in Model.objects.only("id", "imagen", "imagen_presente").iterator():
+                present = False
+                if obj.imagen and obj.imagen.name:
+                    try:
+                        present = obj.imagen.storage.exists(obj.imagen.name)
+                    except Exception:
+                        present = False
+                if present != obj.imagen_presente:
+                    (to_true if present else to_false).append(obj.id)
+            if not opts["dry_run"]:
+                if to_true:
+                    Model.objects.filter(id__in=to_true).update(imagen_presente=True)
+                if to_false:
+                    Model.objects.filter(id__in=to_false).update(imagen_presente=False)
+            changed = len(to_true) + len(to_false)
+            total_changed += changed
+            self.stdout.write(f"{Model.__name__}: {changed} marcadores desactualizados")
+
+        prefix = "[dry-run] " if opts["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}Total: {total_changed}"))
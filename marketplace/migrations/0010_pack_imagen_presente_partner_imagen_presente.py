@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def backfill_imagen_presente(apps, schema_editor):
+    # Única pasada contra el storage: a partir de acá el marcador se mantiene en save()
+    for model_name in ("Partner", "Pack"):
+        Model = apps.get_model("marketplace", model_name)
+        present_ids = []
+        for obj in Model.objects.exclude(imagen="").exclude(imagen__isnull=True).only("id", "imagen").iterator():
+            try:
+                if obj.imagen.storage.exists(obj.imagen.name):
+                    present_ids.append(obj.id)
+            except Exception:
+                continue
+        if present_ids:
+            Model.objects.filter(id__in=present_ids).update(imagen_presente=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_order_metodo_pago'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pack',
+            name='imagen_presente',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='partner',
+            name='imagen_presente',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_imagen_presente, migrations.RunPython.noop),
+    ]
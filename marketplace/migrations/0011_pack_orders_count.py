@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:02
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_orders_count(apps, schema_editor):
+    Pack = apps.get_model("marketplace", "Pack")
+    Order = apps.get_model("marketplace", "Order")
+    active = (Order.objects
+              .filter(pack=models.OuterRef("pk"))
+              .exclude(estado="cancelado")
+              .order_by()
+              .values("pack")
+              .annotate(c=models.Count("id"))
+              .values("c"))
+    Pack.objects.update(orders_count=Coalesce(models.Subquery(active, output_field=models.IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_pack_imagen_presente_partner_imagen_presente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pack',
+            name='orders_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_orders_count, migrations.RunPython.noop),
+    ]
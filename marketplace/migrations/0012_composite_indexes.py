@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0011_pack_orders_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pack',
+            name='orders_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-creado_at'], include=('pack', 'estado', 'precio_pagado', 'metodo_pago'), name='order_user_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'estado', '-creado_at'], name='order_user_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'pack', 'estado'], name='order_user_pack_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('estado__in', ['pendiente', 'pagado'])), fields=['pack', 'estado'], include=('user',), name='order_open_pack_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pack',
+            index=models.Index(fields=['-creado_at'], name='pack_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pack',
+            index=models.Index(fields=['-orders_count', '-creado_at'], name='pack_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pack',
+            index=models.Index(fields=['partner', '-creado_at'], name='pack_partner_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pack',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['pickup_end', 'pickup_start'], name='pack_live_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pack',
+            index=models.Index(fields=['pickup_end'], name='pack_pickup_end_idx'),
+        ),
+    ]
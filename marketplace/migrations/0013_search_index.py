@@ -0,0 +1,102 @@
+from django.db import migrations
+
+# SQL tal como quedó en esta migración (no importa services/search.py: si el
+# runtime cambia, esto no). Para regenerar el índice: manage.py rebuild_search_index
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_pack_fts "
+    "USING fts5(titulo, partner, etiqueta, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_partner_fts "
+    "USING fts5(nombre, descripcion, tokenize='unicode61 remove_diacritics 2')",
+    "DELETE FROM marketplace_partner_fts",
+    "INSERT INTO marketplace_partner_fts(rowid, nombre, descripcion) "
+    "SELECT id, nombre, short_description FROM marketplace_partner",
+    "DELETE FROM marketplace_pack_fts",
+    "INSERT INTO marketplace_pack_fts(rowid, titulo, partner, etiqueta) "
+    "SELECT p.id, p.titulo, pa.nombre, replace(p.etiqueta, '_', ' ') "
+    "FROM marketplace_pack p JOIN marketplace_partner pa ON pa.id = p.partner_id",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TABLE IF EXISTS marketplace_pack_fts",
+    "DROP TABLE IF EXISTS marketplace_partner_fts",
+]
+
+
+def _pg_vector(column, weight):
+    return f"setweight(to_tsvector('spanish', marketplace_unaccent(coalesce({column}, ''))), '{weight}')"
+
+
+PG_ETIQUETA = "replace(p.etiqueta, '_', ' ')"
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE OR REPLACE FUNCTION marketplace_unaccent(text) RETURNS text AS "
+    "$$ SELECT public.unaccent('public.unaccent', $1) $$ "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+    "CREATE TABLE IF NOT EXISTS marketplace_pack_search ("
+    " pack_id bigint PRIMARY KEY REFERENCES marketplace_pack(id) ON DELETE CASCADE,"
+    " document tsvector NOT NULL,"
+    " plain text NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS marketplace_partner_search ("
+    " partner_id bigint PRIMARY KEY REFERENCES marketplace_partner(id) ON DELETE CASCADE,"
+    " document tsvector NOT NULL,"
+    " plain text NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS marketplace_pack_search_doc_gin ON marketplace_pack_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS marketplace_pack_search_trgm_gin "
+    "ON marketplace_pack_search USING GIN (plain gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS marketplace_partner_search_doc_gin "
+    "ON marketplace_partner_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS marketplace_partner_search_trgm_gin "
+    "ON marketplace_partner_search USING GIN (plain gin_trgm_ops)",
+    "INSERT INTO marketplace_partner_search (partner_id, document, plain) "
+    f"SELECT id, {_pg_vector('nombre', 'A')} || {_pg_vector('short_description', 'B')}, "
+    "lower(marketplace_unaccent(nombre)) FROM marketplace_partner "
+    "ON CONFLICT (partner_id) DO UPDATE SET document = EXCLUDED.document, plain = EXCLUDED.plain",
+    "INSERT INTO marketplace_pack_search (pack_id, document, plain) "
+    f"SELECT p.id, {_pg_vector('p.titulo', 'A')} || {_pg_vector('pa.nombre', 'B')} "
+    f"|| {_pg_vector(PG_ETIQUETA, 'C')}, "
+    "lower(marketplace_unaccent(p.titulo || ' ' || pa.nombre)) "
+    "FROM marketplace_pack p JOIN marketplace_partner pa ON pa.id = p.partner_id "
+    "ON CONFLICT (pack_id) DO UPDATE SET document = EXCLUDED.document, plain = EXCLUDED.plain",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP TABLE IF EXISTS marketplace_pack_search",
+    "DROP TABLE IF EXISTS marketplace_partner_search",
+    "DROP FUNCTION IF EXISTS marketplace_unaccent(text)",
+]
+
+
+def _statements(connection, install):
+    """SQL del motor; SQLite sin FTS5 y otros motores no tienen índice (icontains)."""
+    if connection.vendor == "postgresql":
+        return POSTGRES_INSTALL if install else POSTGRES_UNINSTALL
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if cursor.fetchone()[0]:
+                return SQLITE_INSTALL if install else SQLITE_UNINSTALL
+    return []
+
+
+def install_search_index(apps, schema_editor):
+    for sql in _statements(schema_editor.connection, install=True):
+        schema_editor.execute(sql)
+
+
+def uninstall_search_index(apps, schema_editor):
+    for sql in _statements(schema_editor.connection, install=False):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0012_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
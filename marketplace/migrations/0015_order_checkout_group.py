@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0014_stock_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='checkout_group',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0016_order_reminded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='retirado_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
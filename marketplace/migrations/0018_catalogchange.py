@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0017_order_retirado_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('stock', 'Stock'), ('pack', 'Pack'), ('partner', 'Comercio'), ('borrado', 'Borrado')], max_length=10)),
+                ('pack_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('partner_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('delta', models.IntegerField(blank=True, null=True)),
+                ('creado_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -4,14 +4,66 @@
 # marketplace/models.py
 from django.db import models
 from django.conf import settings
-from marketplace.utils.images import stock_image_url
+from marketplace.utils.images import media_or_stock_url
+from marketplace.signals import stock_changed
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
 
 
-class Partner(models.Model):
+def _sync_imagen_presente(instance, update_fields=None):
+    """
+    Recalcula `imagen_presente` al guardar. Es el único punto que consulta el
+    storage (HEAD en S3), y solo si `imagen` cambió desde que se cargó la fila;
+    en lectura alcanza con mirar el marcador.
+    Devuelve los update_fields a usar en super().save().
+    """
+    if update_fields is not None and "imagen" not in update_fields:
+        return update_fields
+    f = instance.imagen
+    name = (f.name if f else "") or ""
+    if getattr(f, "_committed", True) and not instance._state.adding and name == instance._imagen_cargada:
+        return update_fields
+    present = False
+    if name:
+        if not getattr(f, "_committed", True):
+            # Archivo nuevo: FileField.pre_save lo sube en este mismo save()
+            present = True
+        else:
+            try:
+                present = f.storage.exists(name)
+            except Exception:
+                present = False
+    instance.imagen_presente = present
+    if update_fields is not None:
+        update_fields = set(update_fields) | {"imagen_presente"}
+    return update_fields
+
+
+class ImagenCargadaMixin:
+    """Recuerda el nombre de `imagen` tal como está en la base (ver _sync_imagen_presente)."""
+    # None = desconocido (instancia nueva o campo diferido): se consulta el storage
+    _imagen_cargada = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "imagen" in instance.__dict__:
+            instance._imagen_cargada = instance.__dict__["imagen"] or ""
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._recordar_imagen(fields)
+
+    def _recordar_imagen(self, update_fields=None):
+        if update_fields is None or "imagen" in update_fields:
+            self._imagen_cargada = (self.imagen.name if self.imagen else "") or ""
+
+
+class Partner(ImagenCargadaMixin, models.Model):
     class Categoria(models.TextChoices):
         RESTAURANTE = "restaurante", "Restaurante"
         VERDULERIA = "verduleria", "VerdulerÃ­a"
@@ -27,6 +79,8 @@ class Partner(models.Model):
     direccion = models.CharField(max_length=200)
     creado_at = models.DateTimeField(auto_now_add=True)
     imagen = models.ImageField(upload_to="partners/", blank=True, null=True)
+    # Marcador persistido: evita storage.exists() al resolver URLs
+    imagen_presente = models.BooleanField(default=False, editable=False)
     slug = models.SlugField(max_length=140, unique=True, blank=True, null=True)
     short_description = models.CharField(max_length=200, blank=True)
 
@@ -37,7 +91,9 @@ class Partner(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.nombre)[:140]
+        kwargs["update_fields"] = _sync_imagen_presente(self, kwargs.get("update_fields"))
         super().save(*args, **kwargs)
+        self._recordar_imagen(kwargs["update_fields"])
 
     @classmethod
     def with_active_packs(cls):
@@ -51,25 +107,14 @@ class Partner(models.Model):
 
     @property
     def image_or_stock_url(self):
-        # Force stock if flag is enabled
-        if getattr(settings, "USE_STOCK_IMAGES_FORCE_STOCK", False):
-            slug = getattr(self, "categoria", "otros")
-            return stock_image_url(slug, self.nombre or getattr(self, "slug", "") or str(self.pk))
-
-        # Otherwise prefer real media if file exists
-        if getattr(self, "imagen", None) and self.imagen:
-            try:
-                if self.imagen.name and self.imagen.storage.exists(self.imagen.name):
-                    return self.imagen.url
-            except Exception:
-                pass
-
-        if getattr(settings, "USE_STOCK_IMAGES_FOR_EMPTY", True):
-            slug = getattr(self, "categoria", "otros")
-            return stock_image_url(slug, self.nombre or getattr(self, "slug", "") or str(self.pk))
-        return ""
+        # Media real si el marcador dice que existe; si no, stock (o forzado por settings)
+        return media_or_stock_url(
+            self.imagen.name, self.imagen_presente, self.imagen.storage,
+            getattr(self, "categoria", "otros"),
+            self.nombre or getattr(self, "slug", "") or str(self.pk),
+        )
 
-class Pack(models.Model):
+class Pack(ImagenCargadaMixin, models.Model):
     class Etiqueta(models.TextChoices):
         POR_VENCER = "por_vencer", "Por vencer"
         EXCEDENTE = "excedente", "Excedente"
@@ -84,30 +129,72 @@ class Pack(models.Model):
     pickup_end = models.DateTimeField()
     creado_at = models.DateTimeField(auto_now_add=True)
     imagen = models.ImageField(upload_to="packs/", blank=True, null=True)  # ðŸ‘ˆ imagen opcional
+    imagen_presente = models.BooleanField(default=False, editable=False)
+    # Órdenes no canceladas; contador materializado para ordenar por "mas-comprado"
+    orders_count = models.PositiveIntegerField(default=0, editable=False)
 
+    class Meta:
+        indexes = [
+            # Listados: orden por defecto y "mas-comprado"
+            models.Index(fields=["-creado_at"], name="pack_creado_idx"),
+            models.Index(fields=["-orders_count", "-creado_at"], name="pack_popular_idx"),
+            # Página de comercio / merchant_detail / related
+            models.Index(fields=["partner", "-creado_at"], name="pack_partner_creado_idx"),
+            # Packs vivos (stock > 0): ventana de retiro. Parcial en Postgres/SQLite.
+            models.Index(
+                fields=["pickup_end", "pickup_start"],
+                condition=Q(stock__gt=0),
+                name="pack_live_window_idx",
+            ),
+            # Escaneos por vencimiento (home, recordatorios, expiración)
+            models.Index(fields=["pickup_end"], name="pack_pickup_end_idx"),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.partner.nombre}"
 
-    @property
-    def image_or_stock_url(self):
-        if getattr(settings, "USE_STOCK_IMAGES_FORCE_STOCK", False):
-            slug = getattr(self.partner, "categoria", "otros")
-            key = f"{self.titulo}-{getattr(self.partner, 'nombre', '')}-{self.pk}"
-            return stock_image_url(slug, key)
+    def save(self, *args, **kwargs):
+        kwargs["update_fields"] = _sync_imagen_presente(self, kwargs.get("update_fields"))
+        super().save(*args, **kwargs)
+        self._recordar_imagen(kwargs["update_fields"])
 
-        if getattr(self, "imagen", None) and self.imagen:
-            try:
-                if self.imagen.name and self.imagen.storage.exists(self.imagen.name):
-                    return self.imagen.url
-            except Exception:
-                pass
+    @classmethod
+    def adjust_stock(cls, pack_id, delta):
+        """
+        Suma `delta` al stock con un UPDATE atómico (F()) y avisa `stock_changed`.
+        Todo cambio de stock debe pasar por acá para que cachés e índices se enteren.
+        """
+        updated = cls.objects.filter(pk=pack_id).update(stock=models.F("stock") + delta)
+        if updated:
+            stock_changed.send(sender=cls, pack_ids=[pack_id], deltas={pack_id: delta})
+        return updated
 
-        if getattr(settings, "USE_STOCK_IMAGES_FOR_EMPTY", True):
-            slug = getattr(self.partner, "categoria", "otros")
-            key = f"{self.titulo}-{getattr(self.partner, 'nombre', '')}-{self.pk}"
-            return stock_image_url(slug, key)
-        return ""
+    @classmethod
+    def bump_orders_count(cls, pack_id, delta):
+        return cls.objects.filter(pk=pack_id).update(orders_count=models.F("orders_count") + delta)
+
+    @classmethod
+    def rebuild_orders_count(cls, pack_ids=None):
+        """Recalcula orders_count desde Order en un único UPDATE (correlated subquery)."""
+        active = (Order.objects
+                  .filter(pack=models.OuterRef("pk"))
+                  .exclude(estado=Order.Estado.CANCELADO)
+                  .order_by()
+                  .values("pack")
+                  .annotate(c=Count("id"))
+                  .values("c"))
+        qs = cls.objects.all()
+        if pack_ids is not None:
+            qs = qs.filter(pk__in=pack_ids)
+        return qs.update(orders_count=Coalesce(models.Subquery(active, output_field=models.IntegerField()), 0))
+
+    @property
+    def image_or_stock_url(self):
+        return media_or_stock_url(
+            self.imagen.name, self.imagen_presente, self.imagen.storage,
+            getattr(self.partner, "categoria", "otros"),
+            f"{self.titulo}-{getattr(self.partner, 'nombre', '')}-{self.pk}",
+        )
 
 # marketplace/models.py
 class Order(models.Model):
@@ -132,6 +219,32 @@ class Order(models.Model):
     paid_at = models.DateTimeField(null=True, blank=True)
     stock_decremented = models.BooleanField(default=False)
     metodo_pago = models.CharField(max_length=20, choices=METODO_PAGO_CHOICES, default="mp")
+    # Órdenes creadas juntas por un mismo checkout del carrito
+    checkout_group = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
+    # Último recordatorio de retiro enviado (send_reminders no vuelve a mandarlo)
+    reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Momento del canje en el comercio (estado RETIRADO)
+    retirado_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Mis pedidos: user (+ estado) ordenado por fecha; covering en Postgres
+            models.Index(
+                fields=["user", "-creado_at"],
+                include=["pack", "estado", "precio_pagado", "metodo_pago"],
+                name="order_user_creado_idx",
+            ),
+            models.Index(fields=["user", "estado", "-creado_at"], name="order_user_estado_idx"),
+            # reservar: duplicadas por user + pack + estado
+            models.Index(fields=["user", "pack", "estado"], name="order_user_pack_estado_idx"),
+            # Recordatorios / expiración: órdenes abiertas por pack (join a pickup_end)
+            models.Index(
+                fields=["pack", "estado"],
+                include=["user"],
+                condition=Q(estado__in=["pendiente", "pagado"]),
+                name="order_open_pack_idx",
+            ),
+        ]
 
     def clean(self):
         """
@@ -139,31 +252,125 @@ class Order(models.Model):
         """
         # Si se llama desde save() en creaciÃ³n, self._state.adding es True
         if self._state.adding:
-            if self.pack.stock <= 0:
+            # Con _stock_reserved el stock lo toma el UPDATE condicional de services.inventory
+            if not getattr(self, "_stock_reserved", False) and self.pack.stock <= 0:
                 raise ValidationError("No hay stock disponible para este pack.")
             if timezone.now() > self.pack.pickup_end:
                 raise ValidationError("La franja de retiro de este pack ya expirÃ³.")
     def save(self, *args, **kwargs):
         creating = self._state.adding
+        reserved = creating and getattr(self, "_stock_reserved", False)
         if creating:
             self.full_clean()  # valida al crear
+            if reserved:
+                self.stock_decremented = True
         super().save(*args, **kwargs)
+        # Con _stock_reserved orders_count lo suma el mismo UPDATE que toma el stock
+        if creating and not reserved and self.estado != self.Estado.CANCELADO:
+            Pack.bump_orders_count(self.pack_id, +1)
         # Descontar stock únicamente cuando la orden es NUEVA y no se omite (checkout)
-        if creating and not getattr(self, "_skip_stock", False):
-            Pack.objects.filter(pk=self.pack_id).update(stock=models.F("stock") - 1)
+        # ni lo descuenta quien la crea (services.inventory.take_stock)
+        if creating and not reserved and not getattr(self, "_skip_stock", False):
+            Pack.adjust_stock(self.pack_id, -1)
             type(self).objects.filter(pk=self.pk).update(stock_decremented=True)
 
+    def cancel(self):
+        """
+        Cancela la orden: devuelve el stock si ya se había descontado y la saca
+        del contador de compras del pack. No valida permisos ni ventana.
+        """
+        if self.estado == self.Estado.CANCELADO:
+            return
+        self.estado = self.Estado.CANCELADO
+        self.save(update_fields=["estado"])
+        Pack.bump_orders_count(self.pack_id, -1)
+        if self.stock_decremented:
+            Pack.adjust_stock(self.pack_id, +1)
+            type(self).objects.filter(pk=self.pk).update(stock_decremented=False)
+            self.stock_decremented = False
+
     def mark_paid(self):
+        """
+        Marca la orden como pagada y descuenta el stock si todavía no lo hizo.
+        Devuelve False si es un pago tardío de una orden cancelada/expirada y el
+        pack ya no tiene stock (o cerró la franja): la orden queda como estaba.
+        """
         if self.estado == self.Estado.PAGADO and self.stock_decremented:
-            return
+            return True
+        if self.estado in (self.Estado.CANCELADO, self.Estado.EXPIRADO) and not self.stock_decremented:
+            # Su stock ya se devolvió: se vuelve a tomar con el UPDATE condicional
+            from marketplace.services.inventory import take_stock
+
+            if not take_stock(self.pack_id):
+                return False
+            type(self).objects.filter(pk=self.pk).update(stock_decremented=True)
+            self.stock_decremented = True
+        if self.estado == self.Estado.CANCELADO:
+            # Pago tardío de una orden cancelada: vuelve a contar como compra
+            Pack.bump_orders_count(self.pack_id, +1)
         if self.estado != self.Estado.PAGADO:
             self.estado = self.Estado.PAGADO
             self.paid_at = timezone.now()
             self.save(update_fields=["estado", "paid_at"])
         # decrement stock only once for orders created via checkout (no prior decrement)
         if not self.stock_decremented:
-            Pack.objects.filter(pk=self.pack_id).update(stock=models.F("stock") - 1)
+            Pack.adjust_stock(self.pack_id, -1)
             type(self).objects.filter(pk=self.pk).update(stock_decremented=True)
+            self.stock_decremented = True
+        return True
+
+
+class StockHold(models.Model):
+    """
+    Stock apartado por una orden pendiente de pago (checkout del carrito).
+    El stock ya se descontó de Pack; si la orden sigue pendiente al vencer
+    `expires_at`, el reaper (reap_stock_holds) la cancela y lo devuelve.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="stock_hold")
+    pack = models.ForeignKey(Pack, on_delete=models.CASCADE, related_name="stock_holds")
+    quantity = models.PositiveIntegerField(default=1)
+    expires_at = models.DateTimeField()
+    creado_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["expires_at"], name="stockhold_expires_idx")]
+
+    def __str__(self):
+        return f"Hold #{self.order_id} x{self.quantity} hasta {self.expires_at:%H:%M}"
 
 
+class CatalogChange(models.Model):
+    """
+    Registro de cambios del catálogo. El id es la versión: crece con cada cambio
+    y "qué cambió desde N" es un rango sobre la PK (services/catalog_changes.py).
+    Sin FK a Pack/Partner para que los borrados también queden registrados.
+    """
+    class Tipo(models.TextChoices):
+        STOCK   = "stock",   "Stock"
+        PACK    = "pack",    "Pack"
+        PARTNER = "partner", "Comercio"
+        BORRADO = "borrado", "Borrado"
 
+    id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    pack_id = models.PositiveIntegerField(null=True, blank=True)
+    partner_id = models.PositiveIntegerField(null=True, blank=True)
+    # Solo para STOCK: unidades sumadas (negativo = vendidas/apartadas)
+    delta = models.IntegerField(null=True, blank=True)
+    creado_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"v{self.id} {self.tipo} pack={self.pack_id} partner={self.partner_id}"
+
+
+class Checkpoint(models.Model):
+    """
+    Último id procesado por una tarea por tandas (p.ej. expire_orders), para que
+    una corrida cortada siga desde ahí aunque sea otro proceso.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
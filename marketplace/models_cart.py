@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
 from .models import Pack
@@ -14,38 +16,58 @@ class Cart(models.Model):
     def items(self):
         return self.cart_items.select_related("pack", "pack__partner")
 
+    def snapshot(self):
+        """Resumen del carrito calculado sobre una sola lectura de los items."""
+        return CartSnapshot(self.items.order_by("id"))
+
     def merchant(self):
-        first = self.items.first()
-        return first.pack.partner if first else None
+        return self.snapshot().merchant
 
     def item_count(self):
-        return self.items.count()
+        return self.cart_items.count()
 
     def total(self):
-        from decimal import Decimal
-        total = Decimal("0.00")
-        for it in self.items:
-            total += it.pack.precio_oferta * it.quantity
-        return total
+        return self.snapshot().total
 
     def window_intersection(self):
-        qs = self.items
-        if not qs.exists():
-            return (None, None)
-        starts = [it.pack.pickup_start for it in qs]
-        ends = [it.pack.pickup_end for it in qs]
-        return (max(starts), min(ends))
+        snap = self.snapshot()
+        return (snap.window_start, snap.window_end)
+
+    def to_dict(self):
+        return self.snapshot().to_dict()
+
+
+class CartSnapshot:
+    """
+    Comercio, cantidad, total y ventana de retiro de un carrito a partir de una
+    lista de CartItem (con pack y partner ya cargados). Un solo query para armarlo
+    y ninguno después: se puede pasar a templates y serializar sin volver a la base.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.item_count = len(self.items)
+        self.total = sum((it.pack.precio_oferta * it.quantity for it in self.items), Decimal("0.00"))
+        self.merchant = self.items[0].pack.partner if self.items else None
+        if self.items:
+            self.window_start = max(it.pack.pickup_start for it in self.items)
+            self.window_end = min(it.pack.pickup_end for it in self.items)
+        else:
+            self.window_start = self.window_end = None
+
+    def with_item(self, item):
+        """Snapshot nuevo con `item` agregado (evita releer tras un add)."""
+        return CartSnapshot(self.items + [item])
 
     def to_dict(self):
-        m = self.merchant()
-        start_max, end_min = self.window_intersection()
+        m = self.merchant
         return {
             "merchant": m.nombre if m else None,
             "merchant_id": m.id if m else None,
-            "item_count": self.item_count(),
-            "total": str(self.total()),
-            "window_start": start_max.isoformat() if start_max else None,
-            "window_end": end_min.isoformat() if end_min else None,
+            "item_count": self.item_count,
+            "total": str(self.total),
+            "window_start": self.window_start.isoformat() if self.window_start else None,
+            "window_end": self.window_end.isoformat() if self.window_end else None,
             "items": [
                 {
                     "pack_id": it.pack.id,
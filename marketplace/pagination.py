@@ -0,0 +1,62 @@
+# marketplace/pagination.py
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from marketplace.services.keyset import KeysetPaginator
+
+# ?ordering= del OrderingFilter -> columnas del keyset (siempre con id para desempatar)
+PACK_API_ORDERINGS = {
+    "precio_oferta": ("precio_oferta", "id"),
+    "-precio_oferta": ("-precio_oferta", "-id"),
+    "creado_at": ("creado_at", "id"),
+    "-creado_at": ("-creado_at", "-id"),
+}
+
+
+class PackCursorPagination(BasePagination):
+    """
+    Paginación por cursor para /api/packs/ con el mismo sobre que PageNumberPagination
+    (count/next/previous/results). `count` es estimado (None si el motor no da
+    estimación); con ?count=exact se hace el COUNT. ?page=N sigue funcionando
+    para clientes viejos.
+    """
+    page_size_query_param = None
+    cursor_query_param = "cursor"
+
+    def __init__(self):
+        from django.conf import settings
+
+        self.page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE", 12)
+        self.legacy = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if request.query_params.get("page"):
+            self.legacy = PageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        ordering = (request.query_params.get("ordering") or "").split(",")[0].strip()
+        keys = PACK_API_ORDERINGS.get(ordering, PACK_API_ORDERINGS["-creado_at"])
+        self.paginator = KeysetPaginator(queryset, keys, self.page_size)
+        self.page = self.paginator.page(request.query_params.get(self.cursor_query_param))
+        return list(self.page)
+
+    def _cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        exact = self.request.query_params.get("count") == "exact"
+        return Response({
+            "count": self.paginator.count(exact=exact),
+            "next": self._cursor_link(self.page.next_cursor),
+            "previous": self._cursor_link(self.page.previous_cursor),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
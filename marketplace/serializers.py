@@ -13,7 +13,7 @@ class PartnerSerializer(serializers.ModelSerializer):
     def get_imagen_url(self, obj):
         # Legacy: real media URL if present
         try:
-            if getattr(obj, "imagen", None) and obj.imagen and obj.imagen.name and obj.imagen.storage.exists(obj.imagen.name):
+            if obj.imagen_presente and obj.imagen:
                 request = self.context.get("request")
                 url = obj.imagen.url
                 return request.build_absolute_uri(url) if request else url
@@ -42,7 +42,7 @@ class PackSerializer(serializers.ModelSerializer):
         
     def get_imagen_url(self, obj):
         try:
-            if getattr(obj, "imagen", None) and obj.imagen and obj.imagen.name and obj.imagen.storage.exists(obj.imagen.name):
+            if obj.imagen_presente and obj.imagen:
                 request = self.context.get("request")
                 url = obj.imagen.url
                 return request.build_absolute_uri(url) if request else url
@@ -73,7 +73,7 @@ class PackSerializer(serializers.ModelSerializer):
 
     def get_partner_imagen_url(self, obj):
         try:
-            if getattr(obj.partner, "imagen", None) and obj.partner.imagen and obj.partner.imagen.name and obj.partner.imagen.storage.exists(obj.partner.imagen.name):
+            if obj.partner.imagen_presente and obj.partner.imagen:
                 request = self.context.get("request")
                 url = obj.partner.imagen.url
                 return request.build_absolute_uri(url) if request else url
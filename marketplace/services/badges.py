@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CART_KEY = "badges:cart:{}"
+REMINDERS_KEY = "badges:reminders:{}"
+
+
+def _ttl():
+    # Los recordatorios dependen de la hora (ventana móvil): el TTL acota ese desfase
+    return getattr(settings, "BADGE_CACHE_TTL", 60)
+
+
+def _cached_count(key, compute):
+    count = cache.get(key)
+    if count is None:
+        count = compute()
+        cache.set(key, count, timeout=_ttl())
+    return count
+
+
+def cart_count(user_id) -> int:
+    """Cantidad de items en el carrito del usuario (sin crear el carrito)."""
+    from marketplace.models_cart import CartItem
+
+    return _cached_count(
+        CART_KEY.format(user_id),
+        lambda: CartItem.objects.filter(cart__user_id=user_id).count(),
+    )
+
+
+def reminders_count(user_id) -> int:
+    """Pedidos pendientes del usuario que vencen dentro de la ventana de recordatorio."""
+    from marketplace.services.reminders import pending_orders_expiring
+
+    return _cached_count(
+        REMINDERS_KEY.format(user_id),
+        lambda: pending_orders_expiring().filter(user_id=user_id).select_related(None).count(),
+    )
+
+
+def invalidate_cart_badge(user_id):
+    cache.delete(CART_KEY.format(user_id))
+
+
+class _CartBadgeBatch:
+    """Carritos tocados en una transacción: una lectura de user_id y un delete_many, al COMMIT."""
+
+    def __init__(self):
+        self.user_ids, self.cart_ids = set(), set()
+
+    def __call__(self):
+        from marketplace.models_cart import Cart
+
+        user_ids = set(self.user_ids)
+        if self.cart_ids:
+            user_ids.update(Cart.objects.filter(pk__in=self.cart_ids).values_list("user_id", flat=True))
+        cache.delete_many([CART_KEY.format(uid) for uid in user_ids])
+
+
+def invalidate_cart_badge_on_commit(user_id=None, cart_id=None):
+    """
+    Invalida el badge del carrito al COMMIT, una sola vez por transacción aunque
+    se borren N items (QuerySet.delete manda un post_delete por item). Pasar
+    `user_id` si ya se conoce; si no, `cart_id` y se resuelve en una consulta.
+    """
+    conn = transaction.get_connection()
+    # El lote ya registrado en este mismo savepoint; si se revierte, se va con él
+    sids = set(conn.savepoint_ids)
+    batch = next((func for ids, func, _ in conn.run_on_commit
+                  if isinstance(func, _CartBadgeBatch) and ids == sids), None)
+    new = batch is None
+    if new:
+        batch = _CartBadgeBatch()
+    if user_id is not None:
+        batch.user_ids.add(user_id)
+    else:
+        batch.cart_ids.add(cart_id)
+    if new:
+        transaction.on_commit(batch)
+
+
+def invalidate_reminders_badge(user_id):
+    cache.delete(REMINDERS_KEY.format(user_id))
@@ -0,0 +1,256 @@
+import queue
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, connections, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from marketplace.models import Order, Pack, Partner
+from marketplace.services import inventory
+
+# nombre -> (url, requiere login)
+DEFAULT_TARGETS = {
+    "home": ("/", False),
+    "buscar": ("/buscar/?q=pack", False),
+    "categoria": ("/categoria/cafes/", False),
+    "partner": ("/c/{partner_slug}/", False),
+    "api_packs": ("/api/packs/", False),
+    "api_packs_vigentes": ("/api/packs/?vigentes=1", False),
+    "api_orders": ("/api/orders/", True),
+    "api_cart": ("/api/cart/", True),
+    "mis_pedidos": ("/mis-pedidos/", True),
+}
+
+# Presupuestos: queries por request, p95 en ms y memoria pico del request en KiB.
+# Las queries no dependen del tamaño del dataset: un N+1 las dispara enseguida.
+DEFAULT_BUDGETS = {
+    "home": {"queries": 6, "p95_ms": 300, "mem_kb": 2048},
+    "buscar": {"queries": 4, "p95_ms": 500, "mem_kb": 2048},
+    "categoria": {"queries": 4, "p95_ms": 300, "mem_kb": 2048},
+    "partner": {"queries": 6, "p95_ms": 300, "mem_kb": 2048},
+    "api_packs": {"queries": 3, "p95_ms": 300, "mem_kb": 2048},
+    "api_packs_vigentes": {"queries": 3, "p95_ms": 300, "mem_kb": 2048},
+    "api_orders": {"queries": 5, "p95_ms": 300, "mem_kb": 2048},
+    "api_cart": {"queries": 10, "p95_ms": 300, "mem_kb": 2048},
+    "mis_pedidos": {"queries": 10, "p95_ms": 400, "mem_kb": 2048},
+}
+
+
+def _percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    # quantiles(n=100) devuelve 99 cortes; el índice pct-1 es el percentil pct
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def measure(client, url, runs=10, warmup=1):
+    """
+    Pide `url` `runs` veces y devuelve status, queries (máximo por request),
+    p50/p95 en ms y memoria pico en KiB (tracemalloc, solo en una corrida
+    aparte para no inflar la latencia).
+    """
+    for _ in range(warmup):
+        client.get(url)
+
+    timings, queries, status = [], 0, None
+    for _ in range(runs):
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            res = client.get(url)
+            timings.append((time.perf_counter() - t0) * 1000)
+        queries = max(queries, len(ctx.captured_queries))
+        status = res.status_code
+
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    reset_queries()
+
+    return {
+        "url": url,
+        "status": status,
+        "queries": queries,
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(_percentile(timings, 95), 2),
+        "mem_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(user, partner_slug, runs=10, only=None, targets=None):
+    """Mide cada target; los que requieren login usan `user`. Devuelve {nombre: resultado}."""
+    targets = targets or DEFAULT_TARGETS
+    # Fuera de los tests "testserver" no está en ALLOWED_HOSTS
+    host = next((h for h in settings.ALLOWED_HOSTS if h != "*" and not h.startswith(".")), "testserver")
+    anon, auth = Client(SERVER_NAME=host), Client(SERVER_NAME=host)
+    auth.force_login(user)
+    results = {}
+    for name, (url, needs_login) in targets.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(auth if needs_login else anon, url.format(partner_slug=partner_slug), runs=runs)
+    return results
+
+
+def check_budgets(results, budgets=None):
+    """Lista de violaciones (strings) — vacía si todo entra en presupuesto."""
+    budgets = budgets or DEFAULT_BUDGETS
+    errors = []
+    for name, res in results.items():
+        if res["status"] != 200:
+            errors.append(f"{name}: status {res['status']} en {res['url']}")
+        for metric, limit in budgets.get(name, {}).items():
+            if res[metric] > limit:
+                errors.append(f"{name}: {metric}={res[metric]} > {limit}")
+    return errors
+
+
+# --- contención de reservas ---------------------------------------------------
+
+def _reserve_locked(user, pack_id):
+    """Camino anterior de /reservar/: select_for_update() del pack durante toda la transacción."""
+    with transaction.atomic():
+        pack = Pack.objects.select_for_update().get(pk=pack_id)
+        if pack.stock <= 0 or timezone.now() > pack.pickup_end:
+            raise ValidationError("Sin stock disponible.")
+        if Order.objects.filter(user=user, pack=pack, estado__in=["pendiente", "pagado"]).exists():
+            raise ValidationError("Ya reservaste este pack.")
+        return Order.objects.create(user=user, pack=pack, precio_pagado=pack.precio_oferta)
+
+
+def _reserve_conditional(user, pack_id):
+    return inventory.reserve(user, Pack.objects.get(pk=pack_id))
+
+
+RESERVE_MODES = {"lock": _reserve_locked, "conditional": _reserve_conditional}
+# Reintentos por comprador ante errores de la base (locks de SQLite, serialización)
+DB_RETRIES = 50
+
+
+def setup_contention(buyers, stock):
+    """Pack `bench-contention` con `stock` unidades y `buyers` compradores (reutilizados entre corridas)."""
+    User = get_user_model()
+    owner, _ = User.objects.get_or_create(username="bench_owner")
+    partner, _ = Partner.objects.get_or_create(
+        slug="bench-contention", defaults={"owner": owner, "nombre": "Bench Contention", "direccion": "-"},
+    )
+    Order.objects.filter(pack__partner=partner).delete()
+    Pack.objects.filter(partner=partner).delete()
+    now = timezone.now()
+    pack = Pack.objects.create(
+        partner=partner, titulo="Pack contención", etiqueta=Pack.Etiqueta.EXCEDENTE,
+        precio_original=1000, precio_oferta=500, stock=stock,
+        pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+    )
+    names = [f"bench_buyer_{i}" for i in range(buyers)]
+    existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+    User.objects.bulk_create([User(username=n) for n in names if n not in existing])
+    return pack, list(User.objects.filter(username__in=names).order_by("id"))
+
+
+def reservation_contention(buyers=500, stock=100, workers=32, mode="conditional"):
+    """
+    `buyers` compradores distintos reservan el mismo pack desde `workers` hilos
+    (cada uno con su conexión). Devuelve throughput, vendidos, rechazos y errores
+    de la base, y verifica que no haya sobreventa. Representativo en Postgres; en
+    SQLite las escrituras se serializan igual por el lock de archivo.
+
+    `lock_hold_p95_ms`: desde el statement que bloquea la fila del pack (SELECT
+    FOR UPDATE o el UPDATE del stock) hasta el COMMIT, en las reservas exitosas.
+    """
+    pack, users = setup_contention(buyers, stock)
+    reserve = RESERVE_MODES[mode]
+    lock = threading.Lock()
+    counts = {"ok": 0, "rejected": 0, "errors": 0, "retries": 0}
+    latencies = []
+    lock_holds = []
+
+    def attempt(user):
+        t0 = time.perf_counter()
+        retries = 0
+        while True:
+            locked, released = [], []
+
+            def track(execute, sql, params, many, context):
+                if not locked and ("FOR UPDATE" in sql or sql.startswith('UPDATE "marketplace_pack"')):
+                    locked.append(time.perf_counter())
+                    # Primer callback de la transacción: corre apenas termina el COMMIT
+                    transaction.on_commit(lambda: released.append(time.perf_counter()))
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(track):
+                    reserve(user, pack.id)
+                key = "ok"
+            except ValidationError:
+                key = "rejected"
+            except DatabaseError:
+                # SQLite devuelve "database is locked" en vez de esperar: se reintenta
+                if retries < DB_RETRIES:
+                    retries += 1
+                    time.sleep(0.005 * retries)
+                    continue
+                key = "errors"
+            break
+        end = time.perf_counter()
+        elapsed = (end - t0) * 1000
+        with lock:
+            counts[key] += 1
+            counts["retries"] += retries
+            latencies.append(elapsed)
+            if key == "ok" and locked:
+                # Dentro de un atomic externo (tests) no hay COMMIT: hasta que vuelve reserve()
+                lock_holds.append(((released[0] if released else end) - locked[0]) * 1000)
+
+    pending = queue.Queue()
+    for user in users:
+        pending.put(user)
+
+    def worker():
+        try:
+            while True:
+                try:
+                    attempt(pending.get_nowait())
+                except queue.Empty:
+                    return
+        finally:
+            connections.close_all()
+
+    t0 = time.perf_counter()
+    if workers <= 1:
+        for user in users:
+            attempt(user)
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - t0
+
+    sold = Order.objects.filter(pack=pack).count()
+    final_stock = Pack.objects.values_list("stock", flat=True).get(pk=pack.pk)
+    return {
+        "mode": mode,
+        "buyers": buyers,
+        "workers": workers,
+        "stock": stock,
+        "sold": sold,
+        "final_stock": final_stock,
+        "oversold": sold > stock or sold + final_stock != stock,
+        **counts,
+        "elapsed_s": round(elapsed, 3),
+        "attempts_per_s": round(buyers / elapsed, 1) if elapsed else None,
+        "p95_ms": round(_percentile(sorted(latencies), 95), 2) if latencies else None,
+        "lock_hold_p95_ms": round(_percentile(sorted(lock_holds), 95), 3) if lock_holds else None,
+    }
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+from marketplace.models import Pack
+from marketplace.services.keyset import KeysetPaginator, pack_ordering
+from marketplace.utils.images import media_or_stock_url
+
+# Columnas que necesita una card de pack en los listados (home, categoría, comercio, /packs/)
+CARD_FIELDS = (
+    "id", "titulo", "etiqueta", "precio_original", "precio_oferta", "stock",
+    "pickup_start", "pickup_end", "creado_at", "orders_count", "imagen", "imagen_presente",
+    "partner_id", "partner__nombre", "partner__slug", "partner__categoria",
+)
+
+
+def pack_card_values(qs):
+    """
+    Proyección compacta de un queryset de Pack para listados.
+
+    Devuelve un queryset de dicts (`.values()`) con la clave de imagen calculada
+    en la base. Respeta filtros y orden de `qs`; paginar/recortar sobre el resultado.
+    """
+    return qs.annotate(
+        # Misma clave que Pack.image_or_stock_url: "<titulo>-<partner>-<id>"
+        image_key=Concat(
+            "titulo", Value("-"), "partner__nombre", Value("-"), Cast("id", CharField()),
+            output_field=CharField(),
+        ),
+    ).values(*CARD_FIELDS, "image_key")
+
+
+class PackCard(SimpleNamespace):
+    """Fila de pack_card_values con los atributos que usan los templates de listados."""
+
+    @classmethod
+    def from_row(cls, row, storage=None):
+        storage = storage or Pack._meta.get_field("imagen").storage
+        partner = SimpleNamespace(
+            id=row["partner_id"],
+            nombre=row["partner__nombre"],
+            slug=row["partner__slug"],
+            categoria=row["partner__categoria"],
+        )
+        return cls(
+            id=row["id"],
+            pk=row["id"],
+            titulo=row["titulo"],
+            etiqueta=row["etiqueta"],
+            precio_original=row["precio_original"],
+            precio_oferta=row["precio_oferta"],
+            stock=row["stock"],
+            pickup_start=row["pickup_start"],
+            pickup_end=row["pickup_end"],
+            creado_at=row["creado_at"],
+            partner=partner,
+            image_or_stock_url=media_or_stock_url(
+                row["imagen"], row["imagen_presente"], storage,
+                row["partner__categoria"] or "otros", row["image_key"],
+            ),
+        )
+
+
+def as_pack_cards(rows):
+    storage = Pack._meta.get_field("imagen").storage
+    return [PackCard.from_row(r, storage) for r in rows]
+
+
+def pack_cards(qs, limit=None):
+    """Atajo: proyectar, recortar y envolver en PackCard."""
+    values = pack_card_values(qs)
+    if limit is not None:
+        values = values[:limit]
+    return as_pack_cards(values)
+
+
+def paginate_cards(page):
+    """Reemplaza las filas de `page` (Page de Paginator o KeysetPage) por PackCard, mismo orden."""
+    page.object_list = as_pack_cards(page.object_list)
+    return page
+
+
+def pack_cards_page(qs, orden, cursor=None, per_page=24):
+    """Página por cursor (keyset) de cards según el `orden` de la UI; ver services.keyset."""
+    paginator = KeysetPaginator(pack_card_values(qs), pack_ordering(orden), per_page)
+    return paginate_cards(paginator.page(cursor))
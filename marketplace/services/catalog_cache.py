@@ -0,0 +1,155 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+GENERATION_KEY = "catalog:generation"
+
+# Parámetros de filtros que afectan las secciones de la home (ver apply_pack_filters)
+HOME_FILTER_KEYS = ("categoria", "oferta", "stock", "abierto", "orden")
+
+
+def catalog_generation() -> int:
+    """Generación actual del catálogo; cambia con cada escritura de Pack/Partner/Order/stock."""
+    gen = cache.get(GENERATION_KEY)
+    if gen is None:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        gen = cache.get(GENERATION_KEY, 1)
+    return gen
+
+
+def bump_catalog_generation():
+    """Invalida en O(1) todo lo cacheado con la generación anterior."""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 2, timeout=None)
+        return cache.get(GENERATION_KEY, 2)
+
+
+def normalize_home_params(params) -> tuple:
+    """Solo los filtros relevantes, ordenados y sin vacíos (orden de la query string no importa)."""
+    items = []
+    for key in HOME_FILTER_KEYS:
+        value = (params.get(key) or "").strip()
+        if value:
+            items.append((key, value))
+    return tuple(items)
+
+
+def home_sections_key(params) -> str:
+    raw = repr(normalize_home_params(params)).encode("utf-8")
+    digest = hashlib.md5(raw).hexdigest()
+    return f"home:sections:v{catalog_generation()}:{digest}"
+
+
+def cached_home_sections(params, builder):
+    """
+    Devuelve las secciones de la home (dict) desde caché o llamando a `builder()`.
+    La clave incluye la generación del catálogo, así que cualquier escritura la
+    invalida; HOME_CACHE_TTL es solo la red de seguridad entre procesos.
+    """
+    key = home_sections_key(params)
+    data = cache.get(key)
+    if data is None:
+        data = builder()
+        cache.set(key, data, timeout=getattr(settings, "HOME_CACHE_TTL", 60))
+    return data
+
+
+def http_max_age() -> int:
+    return getattr(settings, "CATALOG_HTTP_MAX_AGE", 60)
+
+
+def _time_bucket() -> int:
+    """Inicio (epoch) de la franja de max-age actual."""
+    max_age = max(1, http_max_age())
+    return int(time.time()) // max_age * max_age
+
+
+def catalog_validators(request):
+    """
+    (ETag, Last-Modified) de una página pública: versión del registro de cambios
+    + URL completa + franja de max-age. La franja cubre lo que cambia solo con el
+    tiempo (packs que vencen). La versión sale de la base, así que todos los
+    procesos dan el mismo ETag.
+    """
+    from marketplace.services.catalog_changes import catalog_version
+
+    version, changed_at = catalog_version()
+    bucket = _time_bucket()
+    raw = f"{version}:{bucket}:{request.get_full_path()}"
+    etag = f'"{hashlib.md5(raw.encode("utf-8")).hexdigest()}"'
+    last_modified = datetime.fromtimestamp(bucket, tz=dt_timezone.utc)
+    if changed_at is not None:
+        last_modified = max(last_modified, changed_at.replace(microsecond=0))
+    return etag, last_modified
+
+
+def is_cacheable_request(request) -> bool:
+    """Solo GET/HEAD anónimos sin sesión: la página no depende de nada del visitante."""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return False
+    if "HTTP_AUTHORIZATION" in request.META:
+        return False
+    # Carrito/mensajes de un anónimo viven en la sesión o en cookies propias
+    return not any(name in request.COOKIES for name in (settings.SESSION_COOKIE_NAME, "messages"))
+
+
+def uses_visitor_data(request, res) -> bool:
+    """True si la respuesta lleva algo del visitante: cookies o el token CSRF (get_token)."""
+    return bool(res.cookies) or bool(request.META.get("CSRF_COOKIE_NEEDS_UPDATE"))
+
+
+def _patch_catalog_cache_control(request, res):
+    if uses_visitor_data(request, res):
+        # El cuerpo trae su csrfmiddlewaretoken (y el middleware le sumará la cookie):
+        # compartirla en un proxy/CDN se la daría a todos
+        patch_cache_control(res, private=True, max_age=0, must_revalidate=True)
+    else:
+        patch_cache_control(
+            res, public=True, max_age=http_max_age(),
+            stale_while_revalidate=getattr(settings, "CATALOG_HTTP_STALE_WHILE_REVALIDATE", 300),
+        )
+    return res
+
+
+def catalog_http_cache(view):
+    """
+    GET condicional para páginas/APIs públicas del catálogo: ETag, Last-Modified, 304 y
+    `Cache-Control: public, max-age, stale-while-revalidate` para anónimos.
+    Con usuario logueado la respuesta queda como estaba (solo suma Vary: Cookie).
+    Si el render pidió el token CSRF la respuesta queda privada.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            res = view(request, *args, **kwargs)
+            patch_vary_headers(res, ("Cookie",))
+            return res
+
+        etag, last_modified = catalog_validators(request)
+        res = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if res is None:
+            res = view(request, *args, **kwargs)
+            if res.status_code != 200:
+                return res
+            res["ETag"] = etag
+            res["Last-Modified"] = http_date(last_modified.timestamp())
+        if getattr(res, "is_rendered", True):
+            _patch_catalog_cache_control(request, res)
+        else:
+            # TemplateResponse (p.ej. DRF): el token recién se pide al renderizar
+            res.add_post_render_callback(lambda rendered: _patch_catalog_cache_control(request, rendered))
+        patch_vary_headers(res, ("Cookie",))
+        return res
+
+    return wrapped
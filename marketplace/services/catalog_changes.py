@@ -0,0 +1,106 @@
+"""
+Registro de cambios del catálogo (CatalogChange).
+
+Cada cambio de stock (Pack.adjust_stock, take_stock*), alta/edición/baja de
+Pack o de Partner deja una fila, en la misma transacción que el cambio: si se
+revierte, la fila también. El id de la última fila es la versión del catálogo,
+compartida por todos los procesos (a diferencia de la generación en caché).
+
+Ojo: con transacciones concurrentes un id menor puede commitear después de uno
+mayor. Quien necesite no perderse ninguno relee una ventana (`lookback`) y
+descarta por id lo que ya aplicó (`seen`).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from marketplace.models import CatalogChange
+
+Tipo = CatalogChange.Tipo
+
+
+def record_stock_changes(deltas):
+    """Una fila STOCK por pack; `deltas` es {pack_id: unidades sumadas}. Un único INSERT."""
+    if deltas:
+        CatalogChange.objects.bulk_create([
+            CatalogChange(tipo=Tipo.STOCK, pack_id=pack_id, delta=delta)
+            for pack_id, delta in sorted(deltas.items())
+        ])
+
+
+def record_change(tipo, pack_id=None, partner_id=None):
+    CatalogChange.objects.create(tipo=tipo, pack_id=pack_id, partner_id=partner_id)
+
+
+def catalog_version():
+    """(versión, fecha del último cambio); (0, None) si todavía no hubo cambios. Lee una fila por PK."""
+    last = CatalogChange.objects.order_by("-id").values_list("id", "creado_at").first()
+    return last or (0, None)
+
+
+def changes_since(version, limit=1000, lookback=0, seen=()):
+    """
+    Qué cambió después de `version`, leyendo solo esas filas (rango de PK).
+
+    Con `lookback` relee también las últimas `lookback` filas hasta `version`
+    (las que commitearon tarde) y saltea los ids de `seen`, ya aplicados.
+
+    Devuelve un dict con:
+      version   última versión incluida (la que hay que pedir la próxima vez)
+      ids       ids de las filas aplicadas (para armar el próximo `seen`)
+      stock     {pack_id: delta neto}
+      packs     ids de packs editados/creados
+      partners  ids de comercios editados/creados
+      deleted_packs / deleted_partners
+      more      True si se cortó en `limit` (volver a pedir desde `version`)
+      reset     True si `version` es anterior a lo que se conserva: recargar todo
+    """
+    rows = list(CatalogChange.objects
+                .filter(id__gt=max(version - lookback, 0))
+                .order_by("id")
+                .values_list("id", "tipo", "pack_id", "partner_id", "delta")[:limit])
+    result = {
+        "version": max(rows[-1][0], version) if rows else version,
+        "ids": [],
+        "stock": {},
+        "packs": set(),
+        "partners": set(),
+        "deleted_packs": set(),
+        "deleted_partners": set(),
+        "more": len(rows) == limit,
+        # La primera fila conservada está más allá: lo intermedio ya se podó
+        "reset": bool(rows) and version > 0 and rows[0][0] > version + 1 and _pruned_before(rows[0][0]),
+    }
+    for change_id, tipo, pack_id, partner_id, delta in rows:
+        if change_id in seen:
+            continue
+        result["ids"].append(change_id)
+        if tipo == Tipo.STOCK:
+            result["stock"][pack_id] = result["stock"].get(pack_id, 0) + (delta or 0)
+        elif tipo == Tipo.PACK:
+            result["packs"].add(pack_id)
+        elif tipo == Tipo.PARTNER:
+            result["partners"].add(partner_id)
+        elif pack_id is not None:
+            result["deleted_packs"].add(pack_id)
+        else:
+            result["deleted_partners"].add(partner_id)
+    return result
+
+
+def _pruned_before(first_id):
+    # Los huecos de ids también salen de transacciones revertidas; solo es reset
+    # si la poda llegó hasta ahí (no queda nada anterior a `first_id`)
+    return not CatalogChange.objects.filter(id__lt=first_id).exists()
+
+
+def prune_changes(keep_hours=None, now=None):
+    """Borra filas viejas; siempre conserva la última para que la versión no retroceda."""
+    now = now or timezone.now()
+    if keep_hours is None:
+        keep_hours = getattr(settings, "CATALOG_CHANGES_RETENTION_HOURS", 24)
+    last_id, _ = catalog_version()
+    return (CatalogChange.objects
+            .filter(creado_at__lt=now - timedelta(hours=keep_hours), id__lt=last_id)
+            .delete()[0])
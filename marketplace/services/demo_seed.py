@@ -1,5 +1,6 @@
 from datetime import timedelta
-from random import randint, choice
+from decimal import Decimal
+from random import Random, randint, choice
 
 from django.contrib.auth import get_user_model
 from django.db import models
@@ -187,3 +188,104 @@ def ensure_demo_packs(min_count: int = 40):
         categoria = getattr(partner, "categoria", "")
         titulo = choice(PACK_VARIANTS.get(categoria, ["Pack variado para llevar"]))
         build_pack(partner, titulo)
+
+
+def seed_scaled(partners: int, packs: int, orders: int, users: int = 0, batch_size: int = 5000, log=None):
+    """
+    Dataset grande para benchmarks (ej. 10k partners / 200k packs / 2M órdenes).
+    Usa bulk_create (sin save() ni señales), así que al final recalcula
+    orders_count. Devuelve el usuario "bench_user", que tiene órdenes y carrito.
+    """
+    from marketplace.models import Order
+    from marketplace.models_cart import Cart, CartItem
+
+    log = log or (lambda msg: None)
+    rnd = Random(1234)  # determinístico: mismas corridas, mismos datos
+    user_model = get_user_model()
+    now = timezone.now()
+    categorias = [c for _, c in NAMES]
+
+    owner, _ = user_model.objects.get_or_create(username="bench_owner")
+    bench_user, _ = user_model.objects.get_or_create(username="bench_user")
+    bench_user.set_password("bench1234")
+    bench_user.save()
+
+    users = users or max(1, orders // 20)
+    start = user_model.objects.filter(username__startswith="bench_u").count()
+    new_users = [user_model(username=f"bench_u{i}") for i in range(start, users)]
+    for u in new_users:
+        u.set_unusable_password()
+    user_model.objects.bulk_create(new_users, batch_size=batch_size)
+    user_ids = [bench_user.id] + list(
+        user_model.objects.filter(username__startswith="bench_u").values_list("id", flat=True)[:users]
+    )
+    log(f"Usuarios: {len(user_ids)}")
+
+    base = Partner.objects.filter(slug__startswith="bench-").count()
+    Partner.objects.bulk_create(
+        [
+            Partner(
+                owner=owner,
+                categoria=categorias[i % len(categorias)],
+                nombre=f"Comercio Bench {i}",
+                direccion="Av. Bench 123",
+                slug=f"bench-{i}",
+            )
+            for i in range(base, partners)
+        ],
+        batch_size=batch_size,
+    )
+    partner_rows = list(Partner.objects.filter(slug__startswith="bench-").values_list("id", "categoria"))
+    log(f"Partners: {len(partner_rows)}")
+
+    def pack_batch(offset, n):
+        for i in range(offset, offset + n):
+            partner_id, categoria = partner_rows[i % len(partner_rows)]
+            precio = Decimal(rnd.randint(1800, 6200))
+            descuento = rnd.choice([0, 10, 15, 20, 25])
+            yield Pack(
+                partner_id=partner_id,
+                titulo=rnd.choice(PACK_VARIANTS.get(categoria, ["Pack variado para llevar"])),
+                etiqueta=rnd.choice(["excedente", "por_vencer"]),
+                precio_original=precio,
+                precio_oferta=(precio * (100 - descuento) / 100).quantize(Decimal("0.01")),
+                stock=rnd.randint(0, 12),
+                pickup_start=now + timedelta(hours=rnd.randint(-6, 2)),
+                pickup_end=now + timedelta(hours=rnd.randint(-2, 10)),
+            )
+
+    existing = Pack.objects.filter(partner__slug__startswith="bench-").count()
+    for offset in range(existing, packs, batch_size):
+        Pack.objects.bulk_create(pack_batch(offset, min(batch_size, packs - offset)))
+        log(f"Packs: {min(offset + batch_size, packs)}/{packs}")
+    pack_ids = list(Pack.objects.filter(partner__slug__startswith="bench-").values_list("id", "precio_oferta"))
+
+    estados = ["pendiente", "pagado", "retirado", "cancelado", "expirado"]
+    existing = Order.objects.filter(pack__partner__slug__startswith="bench-").count()
+    for offset in range(existing, orders, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, orders)):
+            pack_id, precio = pack_ids[rnd.randrange(len(pack_ids))]
+            # El primer 0,1% va a bench_user para que /mis-pedidos/ tenga volumen
+            user_id = bench_user.id if i % 1000 == 0 else user_ids[rnd.randrange(len(user_ids))]
+            batch.append(Order(
+                user_id=user_id, pack_id=pack_id, precio_pagado=precio,
+                estado=rnd.choice(estados), metodo_pago="mp", stock_decremented=True,
+            ))
+        Order.objects.bulk_create(batch)
+        log(f"Órdenes: {min(offset + batch_size, orders)}/{orders}")
+
+    cart, _ = Cart.objects.get_or_create(user=bench_user)
+    if not cart.cart_items.exists() and pack_ids:
+        # El carrito es de un solo comercio: tres packs del comercio del primero
+        first = Pack.objects.only("partner_id").get(pk=pack_ids[0][0])
+        cart_packs = (Pack.objects.filter(partner_id=first.partner_id)
+                      .order_by("id").values_list("id", flat=True)[:3])
+        CartItem.objects.bulk_create([CartItem(cart=cart, pack_id=pid, quantity=1) for pid in cart_packs])
+
+    # bulk_create no dispara señales: contadores e índice de búsqueda a mano
+    Pack.rebuild_orders_count()
+    from marketplace.services.search import rebuild_search_index
+
+    rebuild_search_index()
+    return bench_user
@@ -0,0 +1,95 @@
+"""
+Expiración de órdenes cuya franja de retiro ya terminó.
+
+Trabaja en tandas de `batch_size` ids, cada una en su propia transacción, así
+nunca bloquea más que esas filas. Las pendientes que ya habían descontado stock
+lo devuelven con un UPDATE por pack. El último id procesado queda en la base
+(Checkpoint): una corrida cortada por `max_batches` (o interrumpida) sigue desde
+ahí, aunque la próxima sea otro proceso (el comando, el worker).
+"""
+import logging
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace.models import Checkpoint, Order, Pack, StockHold
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "marketplace.expire_orders"
+OPEN_STATES = [Order.Estado.PENDIENTE, Order.Estado.PAGADO]
+
+
+def expiring_orders(now=None):
+    """Órdenes PENDIENTE/PAGADO cuya franja de retiro ya terminó."""
+    now = now or timezone.now()
+    return Order.objects.filter(estado__in=OPEN_STATES, pack__pickup_end__lt=now)
+
+
+def _expire_batch(ids):
+    """Expira las órdenes `ids` que sigan abiertas. Devuelve (expiradas, unidades_devueltas)."""
+    with transaction.atomic():
+        rows = list(Order.objects
+                    .select_for_update()
+                    .filter(id__in=ids, estado__in=OPEN_STATES)
+                    .values_list("id", "pack_id", "estado", "stock_decremented"))
+        if not rows:
+            return 0, 0
+        to_return = [(oid, pack_id) for oid, pack_id, estado, taken in rows
+                     if estado == Order.Estado.PENDIENTE and taken]
+        per_pack = Counter(pack_id for _, pack_id in to_return)
+        # Orden fijo de packs: dos tandas concurrentes no se bloquean cruzadas
+        for pack_id in sorted(per_pack):
+            Pack.adjust_stock(pack_id, per_pack[pack_id])
+        if to_return:
+            Order.objects.filter(id__in=[oid for oid, _ in to_return]).update(stock_decremented=False)
+        expired_ids = [oid for oid, *_ in rows]
+        Order.objects.filter(id__in=expired_ids).update(estado=Order.Estado.EXPIRADO)
+        StockHold.objects.filter(order_id__in=expired_ids).delete()
+    return len(rows), len(to_return)
+
+
+def expire_orders(now=None, batch_size=1000, max_batches=None):
+    """
+    Expira hasta `max_batches` tandas (sin tope si es None). Devuelve métricas:
+    expired, stock_returned, batches, seconds, per_second y `done` (False si
+    quedaron órdenes para la próxima corrida).
+    """
+    now = now or timezone.now()
+    t0 = time.perf_counter()
+    last_id = Checkpoint.objects.filter(name=CHECKPOINT_NAME).values_list("last_id", flat=True).first() or 0
+    expired = returned = batches = 0
+    done = False
+    while max_batches is None or batches < max_batches:
+        ids = list(expiring_orders(now)
+                   .filter(id__gt=last_id)
+                   .order_by("id")
+                   .values_list("id", flat=True)[:batch_size])
+        if not ids:
+            done = True
+            break
+        n, units = _expire_batch(ids)
+        expired += n
+        returned += units
+        batches += 1
+        last_id = ids[-1]
+        Checkpoint.objects.update_or_create(name=CHECKPOINT_NAME, defaults={"last_id": last_id})
+    if done:
+        # Pasada completa: la próxima arranca de cero (órdenes viejas que vencieron después)
+        Checkpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+
+    seconds = time.perf_counter() - t0
+    stats = {
+        "expired": expired,
+        "stock_returned": returned,
+        "batches": batches,
+        "seconds": round(seconds, 3),
+        "per_second": round(expired / seconds, 1) if seconds else 0.0,
+        "done": done,
+    }
+    if expired:
+        logger.info("expire_orders: %(expired)s órdenes en %(batches)s tandas, %(stock_returned)s "
+                    "unidades devueltas, %(per_second)s órdenes/s", stats)
+    return stats
@@ -1,4 +1,4 @@
-from django.db.models import Q, F, Count
+from django.db.models import Q, F
 from django.utils import timezone
 
 # Mapeo simple de categorías a nombre de Partner (sin migraciones reales)
@@ -44,8 +44,8 @@ def apply_pack_filters(qs, params):
 
     orden = (params.get("orden") or "").strip()
     if orden == "mas-comprado":
-        # related_name 'orders' desde Order a Pack existe en el proyecto
-        qs = qs.annotate(n=Count("orders")).order_by("-n", "-creado_at")
+        # Contador materializado (ver Pack.orders_count); evita el GROUP BY sobre orders
+        qs = qs.order_by("-orders_count", "-creado_at")
     elif orden == "precio-asc":
         qs = qs.order_by(F("precio_oferta").asc(nulls_last=True), F("precio_original").asc(nulls_last=True))
     elif orden == "precio-desc":
@@ -0,0 +1,176 @@
+"""
+Reservas de stock sin select_for_update().
+
+El stock se toma con un UPDATE condicional (`stock >= n` y ventana vigente en el
+WHERE): la base decide quién gana y la fila de Pack queda bloqueada desde ese
+UPDATE hasta el COMMIT, no durante las validaciones previas. El mismo UPDATE
+suma orders_count (la orden se crea antes, sin tocar Pack). Entre el UPDATE y el
+COMMIT solo va el INSERT del registro de cambios (CatalogChange, vía
+stock_changed): es parte de la misma transacción para que el cambio y su
+registro sean atómicos.
+Todo lo demás que escucha stock_changed (índices en memoria, SSE) espera al
+COMMIT. `bench_reservations` mide cuánto dura el lock (lock_hold_p95_ms).
+Las órdenes del checkout del carrito además dejan un StockHold con TTL; el
+reaper devuelve el stock de las que no se pagaron a tiempo.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from marketplace.models import Order, Pack, StockHold
+from marketplace.services.badges import invalidate_reminders_badge
+from marketplace.signals import stock_changed
+
+
+# Métodos que se confirman sin pasar por MP: la reserva vale hasta el retiro
+OFFLINE_PAYMENT_METHODS = ("efectivo", "transferencia")
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, "STOCK_HOLD_TTL", 900))
+
+
+def take_stock(pack_id, quantity=1, now=None, count_orders=False):
+    """
+    Descuenta `quantity` solo si alcanza y el pack sigue vigente.
+    Devuelve True si lo tomó; el rowcount del UPDATE hace de RETURNING.
+    Con `count_orders` también suma la orden a orders_count en el mismo UPDATE.
+    """
+    now = now or timezone.now()
+    fields = {"stock": models.F("stock") - quantity}
+    if count_orders:
+        fields["orders_count"] = models.F("orders_count") + 1
+    updated = (Pack.objects
+               .filter(pk=pack_id, stock__gte=quantity, pickup_end__gte=now)
+               .update(**fields))
+    if updated:
+        stock_changed.send(sender=Pack, pack_ids=[pack_id], deltas={pack_id: -quantity})
+    return bool(updated)
+
+
+def reserve(user, pack, now=None):
+    """
+    Reserva directa (/api/packs/<id>/reservar/): orden PENDIENTE con el stock ya
+    descontado. Lanza ValidationError con el motivo si no se puede.
+    """
+    now = now or timezone.now()
+    if pack.stock <= 0:
+        raise ValidationError("Sin stock disponible.")
+    if now > pack.pickup_end:
+        raise ValidationError("La franja de retiro ya expiró.")
+
+    with transaction.atomic():
+        # Lock de la fila del usuario (no del Pack): serializa sus reservas, así un
+        # doble submit no pasa dos veces el chequeo de duplicadas
+        get_user_model().objects.select_for_update().filter(pk=user.pk).values_list("pk").get()
+        if Order.objects.filter(user=user, pack=pack, estado__in=[Order.Estado.PENDIENTE, Order.Estado.PAGADO]).exists():
+            raise ValidationError("Ya reservaste este pack.")
+        order = Order(user=user, pack=pack, precio_pagado=pack.precio_oferta, estado=Order.Estado.PENDIENTE)
+        order._stock_reserved = True
+        order.save()
+        # Al final de la transacción: primer UPDATE de Pack; después solo va el INSERT de CatalogChange
+        if not take_stock(pack.id, now=now, count_orders=True):
+            transaction.set_rollback(True)
+            raise ValidationError("Sin stock disponible.")
+    return order
+
+
+def take_stock_many(pack_ids, now=None, count_orders=False):
+    """
+    Una unidad de cada pack en un único UPDATE condicional. Devuelve True solo si
+    alcanzó para todos; si no, el caller tiene que revertir la transacción.
+    Con `count_orders` también suma las órdenes a orders_count en el mismo UPDATE.
+    """
+    now = now or timezone.now()
+    pack_ids = set(pack_ids)
+    fields = {"stock": models.F("stock") - 1}
+    if count_orders:
+        fields["orders_count"] = models.F("orders_count") + 1
+    updated = (Pack.objects
+               .filter(pk__in=pack_ids, stock__gte=1, pickup_end__gte=now)
+               .update(**fields))
+    if updated:
+        # Si no alcanzó para todos el caller revierte, y el registro de cambios con él
+        stock_changed.send(sender=Pack, pack_ids=sorted(pack_ids), deltas=dict.fromkeys(pack_ids, -1))
+    return updated == len(pack_ids)
+
+
+def hold_orders(orders, now=None, count_orders=False):
+    """
+    Aparta el stock de órdenes recién creadas del checkout (una por pack) y deja
+    un StockHold por cada una. Llamar dentro de la transacción que las creó: si
+    algún pack no alcanza lanza ValidationError y el caller revierte todo.
+    """
+    now = now or timezone.now()
+    expires = now + hold_ttl()
+    holds = StockHold.objects.bulk_create(
+        [StockHold(order=o, pack_id=o.pack_id, quantity=1, expires_at=expires) for o in orders]
+    )
+    # Al final: el lock de las filas de Pack dura esto + el INSERT de CatalogChange
+    pack_ids = [o.pack_id for o in orders]
+    if not take_stock_many(pack_ids, now=now, count_orders=count_orders):
+        sold_out = (Pack.objects
+                    .filter(pk__in=pack_ids)
+                    .exclude(stock__gte=1, pickup_end__gte=now)
+                    .values_list("titulo", flat=True)
+                    .first())
+        raise ValidationError(f"{sold_out or 'Un pack del carrito'} ya no está disponible")
+    return holds
+
+
+def create_checkout_orders(user, packs, now=None):
+    """
+    Checkout del carrito: una orden PENDIENTE por pack (ya validados por el caller)
+    con un bulk_create, el stock apartado con StockHold y orders_count actualizado
+    en un solo UPDATE. Todas comparten `checkout_group`. Lanza ValidationError si
+    algún pack se agotó; no deja nada creado.
+    """
+    now = now or timezone.now()
+    group = uuid.uuid4()
+    orders = [
+        Order(user=user, pack=p, precio_pagado=p.precio_oferta, estado=Order.Estado.PENDIENTE,
+              stock_decremented=True, checkout_group=group)
+        for p in packs
+    ]
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        hold_orders(orders, now=now, count_orders=True)
+    # bulk_create no dispara post_save
+    invalidate_reminders_badge(user.id)
+    return orders
+
+
+def release_hold(order):
+    """
+    La orden quedó confirmada (efectivo/transferencia): el stock sigue apartado
+    pero ya no vence con el hold; la expiración por franja se encarga si no retira.
+    """
+    return StockHold.objects.filter(order_id=order.pk).delete()[0]
+
+
+def reap_expired_holds(now=None, batch_size=500):
+    """
+    Cancela las órdenes todavía pendientes de pago online cuyo hold venció
+    (Order.cancel devuelve el stock) y borra los holds vencidos.
+    Devuelve (canceladas, holds_borrados).
+    """
+    now = now or timezone.now()
+    cancelled = deleted = 0
+    while True:
+        batch = list(StockHold.objects
+                     .filter(expires_at__lt=now)
+                     .order_by("expires_at")[:batch_size])
+        if not batch:
+            return cancelled, deleted
+        for hold in batch:
+            with transaction.atomic():
+                order = Order.objects.select_for_update().get(pk=hold.order_id)
+                if order.estado == Order.Estado.PENDIENTE and order.metodo_pago not in OFFLINE_PAYMENT_METHODS:
+                    order.cancel()
+                    cancelled += 1
+        deleted += StockHold.objects.filter(pk__in=[h.pk for h in batch]).delete()[0]
@@ -0,0 +1,169 @@
+"""
+Paginación por keyset (cursor) para listados grandes.
+
+En vez de OFFSET + COUNT(*), cada página filtra "después de la última fila vista"
+según las columnas de orden (terminando siempre en `id` para desempatar), así el
+costo no crece con la profundidad de la página y usa los índices compuestos
+(p.ej. pack_creado_idx, order_user_creado_idx).
+
+El cursor es firmado (django.core.signing) y lleva los valores de la fila borde;
+uno inválido o adulterado equivale a la primera página.
+"""
+import json
+
+from django.core import signing
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.http import HttpResponse
+
+CURSOR_SALT = "marketplace.keyset"
+
+# Órdenes soportadas por los listados de packs (parámetro `orden` de la UI)
+PACK_ORDERINGS = {
+    "nuevo": ("-creado_at", "-id"),
+    "precio-asc": ("precio_oferta", "id"),
+    "precio-desc": ("-precio_oferta", "-id"),
+    "mas-comprado": ("-orders_count", "-creado_at", "-id"),
+}
+
+
+def pack_ordering(orden):
+    return PACK_ORDERINGS.get(orden, PACK_ORDERINGS["nuevo"])
+
+
+def _parse_keys(keys):
+    return [(k.lstrip("-"), k.startswith("-")) for k in keys]
+
+
+def _row_value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def estimated_count(qs):
+    """
+    Cantidad aproximada según el planner (Postgres), sin recorrer la tabla.
+    En otros motores devuelve None: el conteo exacto queda opt-in.
+    """
+    from django.db import connections
+
+    if connections[qs.db].vendor != "postgresql":
+        return None
+    try:
+        plan = json.loads(qs.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        return None
+
+
+class KeysetPage:
+    """Página de un KeysetPaginator; interfaz mínima parecida a django.core.paginator.Page."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, paginator):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.paginator = paginator
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    `keys`: columnas de orden estilo order_by ("-creado_at", "-id"); la última
+    debe ser única. `qs` puede ser un queryset de modelos o de `.values()`
+    (en ese caso tiene que incluir las columnas de `keys`).
+    """
+
+    def __init__(self, qs, keys, per_page):
+        self.qs = qs
+        self.keys = _parse_keys(keys)
+        self._keys_tag = ",".join(keys)
+        self.per_page = per_page
+        self._count = None
+
+    # --- cursores ------------------------------------------------------------
+    def encode_cursor(self, row, reverse):
+        values = [_row_value(row, name) for name, _ in self.keys]
+        raw = [v.isoformat() if hasattr(v, "isoformat") else str(v) for v in values]
+        return signing.dumps({"k": self._keys_tag, "v": raw, "r": int(reverse)}, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """(valores, reverse) o None si el cursor no sirve para este orden."""
+        if not cursor:
+            return None
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            raw = data["v"]
+            # Un cursor de otro orden (el usuario cambió ?orden=) vuelve a la primera página
+            if data.get("k") != self._keys_tag or len(raw) != len(self.keys):
+                return None
+            values = [self.qs.model._meta.get_field(name).to_python(v) for (name, _), v in zip(self.keys, raw)]
+            return values, bool(data.get("r"))
+        except Exception:
+            return None
+
+    # --- consulta ------------------------------------------------------------
+    def _ordering(self, reverse):
+        return [f"-{name}" if (desc != reverse) else name for name, desc in self.keys]
+
+    def _after(self, values, reverse):
+        # (a, b, id) > (va, vb, vid) expandido: a>va OR (a=va AND b>vb) OR ...
+        cond = Q()
+        for i, (name, desc) in enumerate(self.keys):
+            eq = {n: v for (n, _), v in zip(self.keys[:i], values[:i])}
+            op = "lt" if (desc != reverse) else "gt"
+            cond |= Q(**eq, **{f"{name}__{op}": values[i]})
+        return cond
+
+    def page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        values, reverse = decoded if decoded else (None, False)
+        qs = self.qs.order_by(*self._ordering(reverse))
+        if values is not None:
+            qs = qs.filter(self._after(values, reverse))
+        rows = list(qs[: self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+
+        # Hacia adelante, la fila extra dice si hay siguiente y el cursor si hay anterior;
+        # hacia atrás es al revés
+        has_next, has_previous = (True, more) if reverse else (more, values is not None)
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_next:
+                next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if has_previous:
+                previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return KeysetPage(rows, next_cursor, previous_cursor, self)
+
+    def count(self, exact=False):
+        """Total exacto (COUNT, opt-in) o estimado (planner; None si no hay estimación)."""
+        if self._count is None:
+            self._count = self.qs.count() if exact else estimated_count(self.qs)
+        return self._count
+
+
+def cards_fragment(request, template, page, **context):
+    """
+    Respuesta del endpoint de scroll infinito (?partial=1): solo las cards de la
+    página, con el próximo cursor en X-Next-Cursor (vacío si no hay más).
+    """
+    html = render_to_string(template, {"page": page, **context}, request=request)
+    response = HttpResponse(html)
+    response["X-Next-Cursor"] = page.next_cursor or ""
+    return response
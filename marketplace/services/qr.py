@@ -0,0 +1,59 @@
+"""
+QR de las órdenes, cacheado.
+
+El token firmado y la imagen se generan una vez por (orden, pack, versión de
+payload, formato) y quedan en la caché con su ETag y fecha, así las recargas en
+el mostrador responden 304 o el binario guardado sin volver a firmar ni dibujar.
+Cambiar QR_PAYLOAD_VERSION invalida todos los QR de una.
+"""
+import hashlib
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+QR_PAYLOAD_VERSION = 1
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def qr_token(order_id, pack_id):
+    """Payload firmado (para evitar manipulaciones); lo valida verify_qr."""
+    return signing.dumps({"order_id": order_id, "pack_id": pack_id, "v": QR_PAYLOAD_VERSION})
+
+
+def render_qr(token, fmt="png"):
+    if fmt == "svg":
+        # Vectorial: más barato de generar y más liviano que el PNG
+        img = qrcode.make(token, image_factory=qrcode.image.svg.SvgPathImage, box_size=8, border=2)
+        buf = BytesIO()
+        img.save(buf)
+    else:
+        img = qrcode.make(token, box_size=8, border=2)
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _cache_key(order_id, pack_id, fmt):
+    return f"qr:{order_id}:{pack_id}:v{QR_PAYLOAD_VERSION}:{fmt}"
+
+
+def order_qr(order_id, pack_id, fmt="png"):
+    """Devuelve {"content", "etag", "last_modified"} del QR, generándolo solo si no está en caché."""
+    key = _cache_key(order_id, pack_id, fmt)
+    entry = cache.get(key)
+    if entry is None:
+        content = render_qr(qr_token(order_id, pack_id), fmt)
+        entry = {
+            "content": content,
+            "etag": f'"{hashlib.sha1(content).hexdigest()}"',
+            # Sin microsegundos: Last-Modified tiene resolución de segundos
+            "last_modified": timezone.now().replace(microsecond=0),
+        }
+        cache.set(key, entry, getattr(settings, "QR_CACHE_TTL", 86400))
+    return entry
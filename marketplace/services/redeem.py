@@ -0,0 +1,81 @@
+"""
+Canje en el mostrador: verificar y canjear en un solo paso.
+
+Cada código (token firmado del QR o id de orden) se resuelve a un id sin tocar
+la base; después un único UPDATE condicional canjea todas las órdenes que estén
+PENDIENTE/PAGADO, dentro de la franja y sean de un comercio del usuario, y un
+SELECT arma el resultado de cada código. Dos queries, sea uno o sean cincuenta.
+"""
+from django.core import signing
+from django.utils import timezone
+
+from marketplace.models import Order
+from marketplace.services.badges import invalidate_reminders_badge
+
+REDEEMABLE = [Order.Estado.PENDIENTE, Order.Estado.PAGADO]
+MAX_BATCH = 50
+
+
+def order_id_from_code(code):
+    """Id de orden de un token firmado del QR o de un id tipeado a mano. None si no es válido."""
+    code = str(code or "").strip()
+    if code.isdigit():
+        return int(code)
+    try:
+        payload = signing.loads(code)
+    except signing.BadSignature:
+        return None
+    order_id = payload.get("order_id") if isinstance(payload, dict) else None
+    return order_id if isinstance(order_id, int) else None
+
+
+def _failure(row, user, now):
+    """(status HTTP, motivo) de una orden que el UPDATE no canjeó."""
+    if row is None:
+        return 404, "Orden inexistente."
+    if row["pack__partner__owner_id"] != user.id:
+        return 403, "No sos el dueño de este comercio."
+    if now < row["pack__pickup_start"] or now > row["pack__pickup_end"]:
+        return 400, "Fuera de la franja de retiro."
+    if row["estado"] == Order.Estado.RETIRADO:
+        return 400, "El pedido ya fue retirado."
+    return 400, f"No se puede canjear una orden en estado {row['estado']}."
+
+
+def redeem_codes(user, codes, now=None):
+    """
+    Canjea los códigos para el comercio de `user`. Devuelve una lista (en el orden
+    de `codes`) de dicts con ok, status, order_id y detail.
+    """
+    now = now or timezone.now()
+    ids = [order_id_from_code(c) for c in codes]
+    valid = {i for i in ids if i is not None}
+    rows = {}
+    if valid:
+        (Order.objects
+         .filter(id__in=valid, estado__in=REDEEMABLE,
+                 pack__partner__owner=user, pack__pickup_start__lte=now, pack__pickup_end__gte=now)
+         .update(estado=Order.Estado.RETIRADO, retirado_at=now))
+        rows = {r["id"]: r for r in Order.objects.filter(id__in=valid).values(
+            "id", "user_id", "estado", "retirado_at",
+            "pack__partner__owner_id", "pack__pickup_start", "pack__pickup_end",
+        )}
+
+    results, redeemed = [], set()
+    for order_id in ids:
+        if order_id is None:
+            results.append({"ok": False, "status": 400, "order_id": None, "detail": "Token inválido."})
+            continue
+        row = rows.get(order_id)
+        # retirado_at == now: lo canjeó este UPDATE (y no un canje anterior)
+        if row and row["estado"] == Order.Estado.RETIRADO and row["retirado_at"] == now and order_id not in redeemed:
+            redeemed.add(order_id)
+            results.append({"ok": True, "status": 200, "order_id": order_id, "detail": "Orden marcada como RETIRADA."})
+            continue
+        code, detail = _failure(row, user, now)
+        results.append({"ok": False, "status": code, "order_id": order_id, "detail": detail})
+
+    # update() no dispara post_save: el badge de recordatorios del cliente se invalida acá
+    for user_id in {rows[i]["user_id"] for i in redeemed}:
+        invalidate_reminders_badge(user_id)
+    return results
@@ -1,19 +1,24 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from itertools import islice
 from django.utils import timezone
 from django.db.models import Q
-from django.core.mail import send_mail
+from django.core.mail import get_connection, send_mail, send_mass_mail
 from django.conf import settings
 from marketplace.models import Order
 
+logger = logging.getLogger(__name__)
 
-def pending_orders_expiring(window_minutes=None, user=None):
+
+def pending_orders_expiring(window_minutes=None, user=None, now=None):
     """
     Devuelve pedidos PENDIENTES cuyo pickup_end esté dentro de la ventana futura.
     Si 'user' está dado, filtra por ese usuario.
     """
     if window_minutes is None:
         window_minutes = getattr(settings, "REMINDER_WINDOW_MINUTES", 120)
-    now = timezone.now()
+    now = now or timezone.now()
     soon = now + timedelta(minutes=window_minutes)
     qs = Order.objects.select_related("pack", "pack__partner", "user").filter(
         estado="pendiente",
@@ -25,12 +30,21 @@ def pending_orders_expiring(window_minutes=None, user=None):
     return qs
 
 
-def send_reminder_email(order):
-    """Envía (o simula) un email de recordatorio para un pedido."""
+def is_expiring(order, now=None, window_minutes=None):
+    """Lo mismo que pending_orders_expiring pero sobre una orden ya cargada (con su pack), sin query."""
+    if window_minutes is None:
+        window_minutes = getattr(settings, "REMINDER_WINDOW_MINUTES", 120)
+    now = now or timezone.now()
+    end = order.pack.pickup_end
+    return order.estado == "pendiente" and now < end <= now + timedelta(minutes=window_minutes)
+
+
+def build_reminder_message(order):
+    """Tupla (asunto, cuerpo, remitente, [email]) para send_mass_mail; None si el usuario no tiene email."""
     user = getattr(order, "user", None)
     email = getattr(user, "email", "") if user is not None else ""
     if not email:
-        return False
+        return None
     subj = f"Recordatorio: tu pedido #{order.id} vence pronto"
     end = order.pack.pickup_end.strftime("%d/%m %H:%M")
     body = (
@@ -43,9 +57,72 @@ def send_reminder_email(order):
         f"— ResQFood"
     )
     sender = getattr(settings, "REMINDER_EMAIL_SENDER", "notificaciones@resqfood.local")
+    return subj, body, sender, [email]
+
+
+def send_reminder_email(order):
+    """Envía (o simula) un email de recordatorio para un pedido."""
+    message = build_reminder_message(order)
+    if message is None:
+        return False
     try:
-        send_mail(subj, body, sender, [email], fail_silently=True)
+        send_mail(*message, fail_silently=True)
         return True
     except Exception:
         return False
 
+
+def orders_to_remind(now=None):
+    """Pedidos de la ventana que todavía no recibieron recordatorio."""
+    return pending_orders_expiring(now=now).filter(reminded_at__isnull=True).order_by("id")
+
+
+def _send_batch(messages):
+    """Un lote por conexión SMTP (abierta una vez para todo el lote)."""
+    connection = get_connection()
+    return send_mass_mail(messages, connection=connection)
+
+
+def send_due_reminders(limit=None, chunk_size=200, workers=4, now=None):
+    """
+    Envía los recordatorios pendientes de la ventana. Recorre los pedidos con
+    iterator() de a `chunk_size`; cada chunk se reparte en hasta `workers` lotes
+    que se mandan en paralelo, cada uno por su propia conexión. Marca
+    `reminded_at` solo en los lotes enviados, así la próxima corrida procesa
+    únicamente lo nuevo (y reintenta lo que falló). Devuelve (enviados, fallidos).
+    """
+    now = now or timezone.now()
+    qs = orders_to_remind(now=now)
+    if limit:
+        qs = qs[:limit]
+    sent = failed = 0
+    orders = qs.iterator(chunk_size=chunk_size)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reminders") as pool:
+        while True:
+            chunk = list(islice(orders, chunk_size))
+            if not chunk:
+                break
+            # Sin email no hay nada que mandar: se marca igual para no volver a leerlos
+            skipped = []
+            batches = [[] for _ in range(max(1, workers))]
+            for i, order in enumerate(chunk):
+                message = build_reminder_message(order)
+                if message is None:
+                    skipped.append(order.id)
+                else:
+                    batches[i % len(batches)].append((order.id, message))
+            batches = [b for b in batches if b]
+            futures = [pool.submit(_send_batch, [m for _, m in b]) for b in batches]
+            done = list(skipped)
+            for batch, future in zip(batches, futures):
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("Falló el envío de %s recordatorios", len(batch))
+                    failed += len(batch)
+                    continue
+                sent += len(batch)
+                done += [order_id for order_id, _ in batch]
+            # Los threads solo hablan con SMTP; la base se toca desde este hilo
+            Order.objects.filter(id__in=done).update(reminded_at=now)
+    return sent, failed
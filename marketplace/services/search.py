@@ -0,0 +1,336 @@
+"""
+Búsqueda de packs y comercios con ranking por relevancia.
+
+Cada backend mantiene su propio índice en tablas auxiliares (no son modelos):
+- PostgreSQL: tsvector con pesos (título > comercio > etiqueta) + GIN, unaccent y
+  fallback por trigramas (pg_trgm) cuando el texto no matchea (typos).
+- SQLite: tablas virtuales FTS5 con `remove_diacritics` y bm25 (dev/tests).
+- Cualquier otro motor (o SQLite sin FTS5): icontains, sin índice.
+
+El índice se actualiza en las señales de Pack/Partner; `rebuild_search_index`
+lo regenera completo (p.ej. después de cargas con bulk_create).
+"""
+import re
+import unicodedata
+
+from django.db import connection as default_connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+SEARCH_MAX_RESULTS = 500
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas y sin acentos ('Panadería Ñandú' -> 'panaderia nandu')."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def query_tokens(q: str) -> list:
+    """Tokens alfanuméricos normalizados; lo demás se descarta (no hay sintaxis que escapar)."""
+    return _TOKEN_RE.findall(normalize_text(q))[:8]
+
+
+def in_rank_order(qs, ids):
+    """Ordena `qs` según la posición de cada id en `ids` (ranking del backend)."""
+    if not ids:
+        return qs.none()
+    ranking = Case(*[When(pk=pk, then=Value(pos)) for pos, pk in enumerate(ids)], output_field=IntegerField())
+    return qs.filter(pk__in=ids).order_by(ranking)
+
+
+class LikeSearchBackend:
+    """Sin índice: el mismo icontains de antes, ordenado por fecha."""
+
+    vendor = "like"
+
+    def install(self, cursor):
+        pass
+
+    def uninstall(self, cursor):
+        pass
+
+    def index_packs(self, cursor, pack_ids=None, partner_ids=None):
+        pass
+
+    def index_partners(self, cursor, partner_ids=None):
+        pass
+
+    def remove_packs(self, cursor, pack_ids):
+        pass
+
+    def remove_partners(self, cursor, partner_ids):
+        pass
+
+    def pack_ids(self, cursor, q, limit=SEARCH_MAX_RESULTS):
+        from marketplace.models import Pack
+
+        cond = Q(titulo__icontains=q) | Q(etiqueta__icontains=q) | Q(partner__nombre__icontains=q)
+        return list(Pack.objects.filter(cond).order_by("-creado_at").values_list("id", flat=True)[:limit])
+
+    def partner_ids(self, cursor, q, limit=SEARCH_MAX_RESULTS):
+        from marketplace.models import Partner
+
+        return list(Partner.objects.filter(nombre__icontains=q).order_by("nombre").values_list("id", flat=True)[:limit])
+
+
+def _where_ids(column, ids):
+    """(sql, params) para `column IN (...)`; ids=None significa todas las filas."""
+    if ids is None:
+        return "1=1", []
+    ids = list(ids)
+    if not ids:
+        return "1=0", []
+    return f"{column} IN ({', '.join(['%s'] * len(ids))})", ids
+
+
+class SQLiteFTSBackend:
+    vendor = "sqlite"
+    TOKENIZE = "unicode61 remove_diacritics 2"
+
+    def install(self, cursor):
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_pack_fts "
+            f"USING fts5(titulo, partner, etiqueta, tokenize='{self.TOKENIZE}')"
+        )
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS marketplace_partner_fts "
+            f"USING fts5(nombre, descripcion, tokenize='{self.TOKENIZE}')"
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute("DROP TABLE IF EXISTS marketplace_pack_fts")
+        cursor.execute("DROP TABLE IF EXISTS marketplace_partner_fts")
+
+    def index_packs(self, cursor, pack_ids=None, partner_ids=None):
+        if partner_ids is not None:
+            where, params = _where_ids("p.partner_id", partner_ids)
+            cursor.execute(f"SELECT p.id FROM marketplace_pack p WHERE {where}", params)
+            pack_ids = [row[0] for row in cursor.fetchall()]
+        where, params = _where_ids("rowid", pack_ids)
+        cursor.execute(f"DELETE FROM marketplace_pack_fts WHERE {where}", params)
+        where, params = _where_ids("p.id", pack_ids)
+        cursor.execute(
+            "INSERT INTO marketplace_pack_fts(rowid, titulo, partner, etiqueta) "
+            "SELECT p.id, p.titulo, pa.nombre, replace(p.etiqueta, '_', ' ') "
+            "FROM marketplace_pack p JOIN marketplace_partner pa ON pa.id = p.partner_id "
+            f"WHERE {where}",
+            params,
+        )
+
+    def index_partners(self, cursor, partner_ids=None):
+        where, params = _where_ids("rowid", partner_ids)
+        cursor.execute(f"DELETE FROM marketplace_partner_fts WHERE {where}", params)
+        where, params = _where_ids("id", partner_ids)
+        cursor.execute(
+            "INSERT INTO marketplace_partner_fts(rowid, nombre, descripcion) "
+            f"SELECT id, nombre, short_description FROM marketplace_partner WHERE {where}",
+            params,
+        )
+
+    def remove_packs(self, cursor, pack_ids):
+        where, params = _where_ids("rowid", pack_ids)
+        cursor.execute(f"DELETE FROM marketplace_pack_fts WHERE {where}", params)
+
+    def remove_partners(self, cursor, partner_ids):
+        where, params = _where_ids("rowid", partner_ids)
+        cursor.execute(f"DELETE FROM marketplace_partner_fts WHERE {where}", params)
+
+    @staticmethod
+    def _match(q):
+        # Cada token como prefijo entre comillas: "pan"* AND "tri"*
+        return " AND ".join(f'"{t}"*' for t in query_tokens(q))
+
+    def pack_ids(self, cursor, q, limit=SEARCH_MAX_RESULTS):
+        match = self._match(q)
+        if not match:
+            return []
+        cursor.execute(
+            "SELECT rowid FROM marketplace_pack_fts WHERE marketplace_pack_fts MATCH %s "
+            "ORDER BY bm25(marketplace_pack_fts, 10.0, 4.0, 1.0) LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def partner_ids(self, cursor, q, limit=SEARCH_MAX_RESULTS):
+        match = self._match(q)
+        if not match:
+            return []
+        cursor.execute(
+            "SELECT rowid FROM marketplace_partner_fts WHERE marketplace_partner_fts MATCH %s "
+            "ORDER BY bm25(marketplace_partner_fts, 10.0, 2.0) LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    vendor = "postgresql"
+    CONFIG = "spanish"
+
+    def install(self, cursor):
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # unaccent() no es IMMUTABLE; el wrapper permite usarlo en índices
+        cursor.execute(
+            "CREATE OR REPLACE FUNCTION marketplace_unaccent(text) RETURNS text AS "
+            "$$ SELECT public.unaccent('public.unaccent', $1) $$ "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+        )
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS marketplace_pack_search ("
+            " pack_id bigint PRIMARY KEY REFERENCES marketplace_pack(id) ON DELETE CASCADE,"
+            " document tsvector NOT NULL,"
+            " plain text NOT NULL)"
+        )
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS marketplace_partner_search ("
+            " partner_id bigint PRIMARY KEY REFERENCES marketplace_partner(id) ON DELETE CASCADE,"
+            " document tsvector NOT NULL,"
+            " plain text NOT NULL)"
+        )
+        for table in ("marketplace_pack_search", "marketplace_partner_search"):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_doc_gin ON {table} USING GIN (document)")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_trgm_gin ON {table} USING GIN (plain gin_trgm_ops)")
+
+    def uninstall(self, cursor):
+        cursor.execute("DROP TABLE IF EXISTS marketplace_pack_search")
+        cursor.execute("DROP TABLE IF EXISTS marketplace_partner_search")
+        cursor.execute("DROP FUNCTION IF EXISTS marketplace_unaccent(text)")
+
+    def _vector(self, column, weight):
+        return f"setweight(to_tsvector('{self.CONFIG}', marketplace_unaccent(coalesce({column}, ''))), '{weight}')"
+
+    def index_packs(self, cursor, pack_ids=None, partner_ids=None):
+        if partner_ids is not None:
+            where, params = _where_ids("p.partner_id", partner_ids)
+        else:
+            where, params = _where_ids("p.id", pack_ids)
+        etiqueta = "replace(p.etiqueta, '_', ' ')"
+        cursor.execute(
+            "INSERT INTO marketplace_pack_search (pack_id, document, plain) "
+            f"SELECT p.id, {self._vector('p.titulo', 'A')} || {self._vector('pa.nombre', 'B')} "
+            f"|| {self._vector(etiqueta, 'C')}, "
+            "lower(marketplace_unaccent(p.titulo || ' ' || pa.nombre)) "
+            "FROM marketplace_pack p JOIN marketplace_partner pa ON pa.id = p.partner_id "
+            f"WHERE {where} "
+            "ON CONFLICT (pack_id) DO UPDATE SET document = EXCLUDED.document, plain = EXCLUDED.plain",
+            params,
+        )
+
+    def index_partners(self, cursor, partner_ids=None):
+        where, params = _where_ids("id", partner_ids)
+        cursor.execute(
+            "INSERT INTO marketplace_partner_search (partner_id, document, plain) "
+            f"SELECT id, {self._vector('nombre', 'A')} || {self._vector('short_description', 'B')}, "
+            "lower(marketplace_unaccent(nombre)) "
+            f"FROM marketplace_partner WHERE {where} "
+            "ON CONFLICT (partner_id) DO UPDATE SET document = EXCLUDED.document, plain = EXCLUDED.plain",
+            params,
+        )
+
+    def remove_packs(self, cursor, pack_ids):
+        where, params = _where_ids("pack_id", pack_ids)
+        cursor.execute(f"DELETE FROM marketplace_pack_search WHERE {where}", params)
+
+    def remove_partners(self, cursor, partner_ids):
+        where, params = _where_ids("partner_id", partner_ids)
+        cursor.execute(f"DELETE FROM marketplace_partner_search WHERE {where}", params)
+
+    def _ranked(self, cursor, table, id_col, q, limit):
+        tokens = query_tokens(q)
+        if not tokens:
+            return []
+        # Prefijos: 'pan:* & trigo:*' (tokens ya limpios, sin operadores)
+        tsquery = " & ".join(f"{t}:*" for t in tokens)
+        cursor.execute(
+            f"SELECT {id_col} FROM {table}, to_tsquery('{self.CONFIG}', %s) query "
+            "WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, "
+            f"{id_col} DESC LIMIT %s",
+            [tsquery, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if ids:
+            return ids
+        # Fallback por similitud de palabras (typos: "panaderai"); `<%` usa el índice
+        # trigram y respeta pg_trgm.word_similarity_threshold (0.6 por defecto)
+        plain = " ".join(tokens)
+        cursor.execute(
+            f"SELECT {id_col} FROM {table} WHERE %s <%% plain "
+            "ORDER BY word_similarity(%s, plain) DESC LIMIT %s",
+            [plain, plain, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def pack_ids(self, cursor, q, limit=SEARCH_MAX_RESULTS):
+        return self._ranked(cursor, "marketplace_pack_search", "pack_id", q, limit)
+
+    def partner_ids(self, cursor, q, limit=SEARCH_MAX_RESULTS):
+        return self._ranked(cursor, "marketplace_partner_search", "partner_id", q, limit)
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+_backends = {}
+
+
+def get_search_backend(connection=None):
+    connection = connection or default_connection
+    key = connection.alias
+    if key not in _backends:
+        if connection.vendor == "postgresql":
+            backend = PostgresSearchBackend()
+        elif connection.vendor == "sqlite" and _sqlite_has_fts5(connection):
+            backend = SQLiteFTSBackend()
+        else:
+            backend = LikeSearchBackend()
+        _backends[key] = backend
+    return _backends[key]
+
+
+def search_pack_ids(q, limit=SEARCH_MAX_RESULTS):
+    """Ids de packs que matchean `q`, del más relevante al menos relevante."""
+    with default_connection.cursor() as cursor:
+        return get_search_backend().pack_ids(cursor, q, limit)
+
+
+def search_partner_ids(q, limit=SEARCH_MAX_RESULTS):
+    with default_connection.cursor() as cursor:
+        return get_search_backend().partner_ids(cursor, q, limit)
+
+
+def reindex(pack_ids=None, partner_ids=None, packs_of_partners=None):
+    """Reindexa incrementalmente (ids dados) — lo llaman las señales de save."""
+    backend = get_search_backend()
+    with default_connection.cursor() as cursor:
+        if pack_ids:
+            backend.index_packs(cursor, pack_ids=pack_ids)
+        if partner_ids:
+            backend.index_partners(cursor, partner_ids=partner_ids)
+        if packs_of_partners:
+            backend.index_packs(cursor, partner_ids=packs_of_partners)
+
+
+def unindex(pack_ids=None, partner_ids=None):
+    backend = get_search_backend()
+    with default_connection.cursor() as cursor:
+        if pack_ids:
+            backend.remove_packs(cursor, pack_ids)
+        if partner_ids:
+            backend.remove_partners(cursor, partner_ids)
+
+
+def rebuild_search_index(connection=None):
+    """Vacía y regenera el índice completo. Devuelve el nombre del backend."""
+    connection = connection or default_connection
+    backend = get_search_backend(connection)
+    with connection.cursor() as cursor:
+        backend.install(cursor)
+        backend.index_partners(cursor)
+        backend.index_packs(cursor)
+    return backend.vendor
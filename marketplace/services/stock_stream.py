@@ -0,0 +1,221 @@
+"""
+Stock en vivo para las páginas de packs (Server-Sent Events, bajo ASGI).
+
+Un broker por proceso: cada conexión SSE se suscribe a sus pack ids y el broker
+reparte los cambios solo a quienes miran ese pack (índice pack_id -> suscriptores).
+Los cambios llegan por dos lados:
+  - stock_changed de este proceso (después del COMMIT), al instante;
+  - el registro de cambios del catálogo (CatalogChange), que un único poller por
+    proceso lee cada STOCK_STREAM_POLL_INTERVAL segundos mientras haya
+    suscriptores: así también se ven las escrituras del worker y de otros procesos.
+Una consulta por cambio y por proceso, sin importar cuántos navegadores miran.
+
+Los mensajes llevan el stock absoluto, así que repetidos o coalescidos no hacen
+daño: si un cliente lento no alcanzó a leer, solo recibe el último valor.
+
+Corre en un proceso ASGI aparte (Procfile "stream"); el resto del sitio sigue
+en WSGI. Las páginas lo encuentran por STOCK_STREAM_URL.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Milisegundos que espera el EventSource del navegador antes de reconectar
+RETRY_MS = 3000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def parse_pack_ids(raw):
+    """"1,2,3" -> [1, 2, 3] (sin repetidos, hasta STOCK_STREAM_MAX_PACKS). Ignora lo que no es número."""
+    ids = []
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if part.isdigit() and int(part) not in ids:
+            ids.append(int(part))
+    return ids[: _setting("STOCK_STREAM_MAX_PACKS", 100)]
+
+
+def stock_snapshot(pack_ids):
+    """{pack_id: stock} actual; los packs que ya no existen cuentan como 0."""
+    from marketplace.models import Pack
+
+    stocks = dict.fromkeys(pack_ids, 0)
+    stocks.update(Pack.objects.filter(pk__in=pack_ids).values_list("id", "stock"))
+    return stocks
+
+
+class Subscription:
+    """Una conexión: los cambios pendientes se coalescen por pack hasta que los lee."""
+
+    def __init__(self, pack_ids, loop):
+        self.pack_ids = frozenset(pack_ids)
+        self.loop = loop
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def offer(self, stocks):
+        """Puede llamarse desde cualquier hilo."""
+        with self._lock:
+            self._pending.update(stocks)
+        self.loop.call_soon_threadsafe(self._ready.set)
+
+    async def next(self, timeout):
+        """Cambios pendientes ({pack_id: stock}); {} si pasó `timeout` sin novedades."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._ready.clear()
+        with self._lock:
+            items, self._pending = self._pending, {}
+        return items
+
+
+class StockBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_pack = defaultdict(set)   # pack_id -> {Subscription}
+        self._last = {}                    # pack_id -> último stock publicado
+        self._poller = None
+        self.version = None                # última versión de CatalogChange leída
+        self._seen = set()                 # ids ya aplicados dentro de la ventana de relectura
+
+    # --- suscripciones -----------------------------------------------------
+    def subscribe(self, pack_ids):
+        loop = asyncio.get_running_loop()
+        sub = Subscription(pack_ids, loop)
+        with self._lock:
+            for pack_id in sub.pack_ids:
+                self._by_pack[pack_id].add(sub)
+            if self._poller is None or self._poller.done():
+                self._poller = loop.create_task(self._poll())
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for pack_id in sub.pack_ids:
+                subs = self._by_pack.get(pack_id)
+                if subs is None:
+                    continue
+                subs.discard(sub)
+                if not subs:
+                    del self._by_pack[pack_id]
+                    self._last.pop(pack_id, None)
+
+    def watching(self, pack_ids=None):
+        """Los ids de `pack_ids` que alguien mira (todos los mirados si es None)."""
+        with self._lock:
+            if pack_ids is None:
+                return set(self._by_pack)
+            return {p for p in pack_ids if p in self._by_pack}
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return len({s for subs in self._by_pack.values() for s in subs})
+
+    # --- publicación -------------------------------------------------------
+    def publish(self, stocks):
+        """Reparte {pack_id: stock} a los suscriptores de cada pack; ignora lo que no cambió."""
+        targets = defaultdict(dict)
+        with self._lock:
+            for pack_id, stock in stocks.items():
+                subs = self._by_pack.get(pack_id)
+                if not subs or self._last.get(pack_id) == stock:
+                    continue
+                self._last[pack_id] = stock
+                for sub in subs:
+                    targets[sub][pack_id] = stock
+        for sub, items in targets.items():
+            sub.offer(items)
+        return len(targets)
+
+    def publish_current(self, pack_ids):
+        """Lee el stock de los `pack_ids` mirados y lo publica. Sincrónico (usa el ORM)."""
+        ids = self.watching(pack_ids)
+        if ids:
+            self.publish(stock_snapshot(ids))
+
+    def poll_once(self):
+        """
+        Aplica los cambios del registro desde la última versión vista. Sincrónico.
+
+        Relee las últimas STOCK_STREAM_LOOKBACK filas: un id menor que commiteó
+        después de uno mayor todavía se ve, y los ya aplicados se saltean por id.
+        """
+        from marketplace.services.catalog_changes import catalog_version, changes_since
+
+        lookback = _setting("STOCK_STREAM_LOOKBACK", 200)
+        if self.version is None:
+            # Lo anterior ya está en el snapshot de cada conexión: se marca como visto
+            self.version = catalog_version()[0]
+            self._seen = set(changes_since(self.version, lookback=lookback)["ids"])
+            return
+        changes = changes_since(self.version, lookback=lookback, seen=self._seen)
+        self.version = changes["version"]
+        self._seen = {i for i in self._seen.union(changes["ids"]) if i > self.version - lookback}
+        if changes["reset"]:
+            self.publish_current(None)
+        else:
+            self.publish_current(set(changes["stock"]) | changes["packs"] | changes["deleted_packs"])
+
+    def _poll_fresh(self):
+        # El poller vive más que la request que lo creó: sin esto retendría su
+        # conexión para siempre (CONN_MAX_AGE y conexiones caídas no se revisan)
+        close_old_connections()
+        try:
+            self.poll_once()
+        finally:
+            close_old_connections()
+
+    async def _poll(self):
+        while self.watching():
+            try:
+                await sync_to_async(self._poll_fresh)()
+            except Exception:
+                logger.exception("stock_stream: error leyendo el registro de cambios")
+            await asyncio.sleep(_setting("STOCK_STREAM_POLL_INTERVAL", 2))
+        # Sin suscriptores: la próxima conexión arranca desde la versión de ese momento
+        self.version = None
+
+
+broker = StockBroker()
+
+
+def _event(stocks):
+    data = json.dumps({str(k): v for k, v in stocks.items()}, separators=(",", ":"))
+    return f"event: stock\ndata: {data}\n\n"
+
+
+async def stock_events(pack_ids):
+    """
+    Cuerpo de la respuesta SSE: stock actual de `pack_ids` y después cada cambio.
+    Manda un comentario cada STOCK_STREAM_HEARTBEAT segundos para que proxies no
+    corten la conexión y la cierra a los STOCK_STREAM_MAX_SECONDS (el navegador
+    reconecta solo y recibe un snapshot nuevo).
+    """
+    sub = broker.subscribe(pack_ids)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _setting("STOCK_STREAM_MAX_SECONDS", 300)
+    heartbeat = _setting("STOCK_STREAM_HEARTBEAT", 15)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        # Suscripto antes del snapshot: lo que cambie en el medio llega después
+        yield _event(await sync_to_async(stock_snapshot)(pack_ids))
+        while (remaining := deadline - loop.time()) > 0:
+            items = await sub.next(min(heartbeat, remaining))
+            yield _event(items) if items else ": ping\n\n"
+    finally:
+        broker.unsubscribe(sub)
@@ -0,0 +1,238 @@
+import bisect
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.services.search import normalize_text, query_tokens
+
+SUGGEST_LIMIT = 8
+MIN_TOKEN_LEN = 2
+# Claves (tipo, id): los comercios (0) quedan antes que los packs (1) dentro de cada token
+PARTNER, PACK = 0, 1
+# Candidatos que se juntan antes de ordenar; el rango de un prefijo ya viene ordenado
+# por token (palabras más cortas primero) y tipo, así que no hace falta recorrerlo entero
+CANDIDATES_PER_RESULT = 3
+# Tope duro de entradas recorridas (prefijos comunes + filtros que descartan mucho)
+SCAN_LIMIT = 5000
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestIndex:
+    """
+    Índice de prefijos en memoria (por proceso) para autocompletar títulos de
+    packs vigentes y nombres de comercios.
+
+    `_terms` es un array ordenado de (token, clave); un prefijo se resuelve con
+    dos bisect. Cada entrada guarda el label y, para packs, stock/pickup_end:
+    la vigencia se evalúa al consultar, así el índice no envejece con la hora.
+
+    Se construye en la primera consulta (un solo hilo; los demás esperan) y se
+    actualiza desde las señales de save/delete y stock_changed. Como otros
+    procesos no avisan de sus escrituras, se reconstruye completo cada
+    SUGGEST_INDEX_MAX_AGE segundos en un hilo aparte, mientras las consultas
+    siguen usando el índice anterior. Lo que llega por señales durante esa
+    reconstrucción se anota y se vuelve a aplicar sobre el índice nuevo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()  # una sola construcción a la vez
+        self._terms = []     # [(token, key)] ordenado
+        self._entries = {}   # key -> dict(label, kind, id, ...)
+        self._tokens = {}    # key -> tokens indexados (para poder quitarlos)
+        self._journal = None  # [(key, entry|None)] aplicados durante un build
+        self._built_at = None
+        self.builds = 0
+
+    # --- construcción ------------------------------------------------------
+    @staticmethod
+    def _pack_entry(pack_id, titulo, stock, pickup_end):
+        return {"kind": "pack", "id": pack_id, "label": titulo, "norm": normalize_text(titulo),
+                "stock": stock, "pickup_end": pickup_end}
+
+    @staticmethod
+    def _partner_entry(partner_id, nombre, slug):
+        return {"kind": "partner", "id": partner_id, "label": nombre, "norm": normalize_text(nombre), "slug": slug}
+
+    def build(self):
+        from marketplace.models import Partner, Pack
+
+        with self._lock:
+            # Desde acá las actualizaciones incrementales también se anotan
+            self._journal = []
+        now = timezone.now()
+        entries = {}
+        for pid, nombre, slug in Partner.objects.values_list("id", "nombre", "slug").iterator():
+            entries[(PARTNER, pid)] = self._partner_entry(pid, nombre, slug)
+        live = Pack.objects.filter(stock__gt=0, pickup_end__gte=now)
+        for pid, titulo, stock, end in live.values_list("id", "titulo", "stock", "pickup_end").iterator():
+            entries[(PACK, pid)] = self._pack_entry(pid, titulo, stock, end)
+
+        tokens = {key: self._tokenize(e["label"]) for key, e in entries.items()}
+        terms = sorted((tok, key) for key, toks in tokens.items() for tok in toks)
+        with self._lock:
+            journal, self._journal = self._journal or [], None
+            self._entries, self._tokens, self._terms = entries, tokens, terms
+            # La foto se leyó antes de que terminaran estos commits: se reaplican en orden
+            for key, entry in journal:
+                self._apply(key, entry)
+            self._built_at = time.monotonic()
+            self.builds += 1
+
+    def ensure_built(self):
+        if self._built_at is None:
+            with self._build_lock:
+                if self._built_at is None:
+                    self.build()
+            return
+        max_age = getattr(settings, "SUGGEST_INDEX_MAX_AGE", 300)
+        if max_age and time.monotonic() - self._built_at > max_age and self._build_lock.acquire(blocking=False):
+            threading.Thread(target=self._rebuild_in_background, name="suggest-rebuild", daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("suggest: no se pudo reconstruir el índice")
+            with self._lock:
+                self._journal = None
+        finally:
+            # Hilo propio: su conexión no la cierra ninguna request
+            close_old_connections()
+            self._build_lock.release()
+
+    @property
+    def built(self):
+        return self._built_at is not None
+
+    def reset(self):
+        with self._lock:
+            self._terms, self._entries, self._tokens = [], {}, {}
+            self._journal = None
+            self._built_at = None
+
+    @staticmethod
+    def _tokenize(label):
+        return sorted({t for t in query_tokens(label) if len(t) >= MIN_TOKEN_LEN})
+
+    # --- actualización incremental ------------------------------------------
+    def _remove(self, key):
+        for tok in self._tokens.pop(key, ()):
+            i = bisect.bisect_left(self._terms, (tok, key))
+            if i < len(self._terms) and self._terms[i] == (tok, key):
+                del self._terms[i]
+        self._entries.pop(key, None)
+
+    def _put(self, key, entry):
+        self._remove(key)
+        toks = self._tokenize(entry["label"])
+        for tok in toks:
+            bisect.insort(self._terms, (tok, key))
+        self._tokens[key] = toks
+        self._entries[key] = entry
+
+    def _apply(self, key, entry):
+        """Alta/edición (`entry`) o baja (None); con `_lock` tomado."""
+        if entry is None:
+            self._remove(key)
+        else:
+            self._put(key, entry)
+        if self._journal is not None:
+            self._journal.append((key, entry))
+
+    def update_pack(self, pack_id, titulo, stock, pickup_end):
+        if not self.built:
+            return
+        live = stock > 0 and pickup_end >= timezone.now()
+        with self._lock:
+            self._apply((PACK, pack_id), self._pack_entry(pack_id, titulo, stock, pickup_end) if live else None)
+
+    def refresh_packs(self, pack_ids):
+        """Relee packs cuyo stock cambió vía UPDATE (stock_changed)."""
+        if not self.built:
+            return
+        from marketplace.models import Pack
+
+        rows = Pack.objects.filter(id__in=pack_ids).values_list("id", "titulo", "stock", "pickup_end")
+        seen = set()
+        for pid, titulo, stock, end in rows:
+            seen.add(pid)
+            self.update_pack(pid, titulo, stock, end)
+        for pid in set(pack_ids) - seen:
+            self.remove_pack(pid)
+
+    def remove_pack(self, pack_id):
+        with self._lock:
+            self._apply((PACK, pack_id), None)
+
+    def update_partner(self, partner_id, nombre, slug):
+        if not self.built:
+            return
+        with self._lock:
+            self._apply((PARTNER, partner_id), self._partner_entry(partner_id, nombre, slug))
+
+    def remove_partner(self, partner_id):
+        with self._lock:
+            self._apply((PARTNER, partner_id), None)
+
+    # --- consulta -----------------------------------------------------------
+    def _prefix_range(self, prefix):
+        lo = bisect.bisect_left(self._terms, (prefix,))
+        hi = bisect.bisect_left(self._terms, (prefix + "\uffff",))
+        return lo, hi
+
+    def suggest(self, q, limit=SUGGEST_LIMIT):
+        """Comercios y packs vigentes cuyas palabras empiezan con cada token de `q`."""
+        tokens = query_tokens(q)
+        if not tokens:
+            return []
+        self.ensure_built()
+        now = timezone.now()
+        with self._lock:
+            # Se recorre el rango del token más selectivo; el resto se verifica
+            # contra los tokens de cada candidato
+            ranges = sorted(((self._prefix_range(tok), tok) for tok in tokens), key=lambda r: r[0][1] - r[0][0])
+            (lo, hi), _ = ranges[0]
+            others = [tok for _, tok in ranges[1:]]
+            entries, seen = [], set()
+            wanted = limit * CANDIDATES_PER_RESULT
+            for i in range(lo, min(hi, lo + SCAN_LIMIT)):
+                key = self._terms[i][1]
+                if key in seen:
+                    continue
+                seen.add(key)
+                e = self._entries[key]
+                if e["kind"] == "pack" and not (e["stock"] > 0 and e["pickup_end"] >= now):
+                    continue
+                toks = self._tokens[key]
+                if all(any(t.startswith(o) for t in toks) for o in others):
+                    entries.append(e)
+                    if len(entries) >= wanted:
+                        break
+        # Comercios primero; dentro de cada grupo, labels que empiezan con la query y más cortos
+        first = tokens[0]
+        entries.sort(key=lambda e: (
+            e["kind"] != "partner", not e["norm"].startswith(first), len(e["label"]), e["id"],
+        ))
+        return [self._as_result(e) for e in entries[:limit]]
+
+    @staticmethod
+    def _as_result(entry):
+        url = entry.get("url")
+        if url is None:
+            # reverse() cuesta más que toda la búsqueda: se resuelve una vez por entrada
+            if entry["kind"] == "partner":
+                url = reverse("partner_detail", args=[entry["slug"] or entry["id"]])
+            else:
+                url = reverse("packs:detail", args=[entry["id"]])
+            entry["url"] = url
+        return {"type": entry["kind"], "id": entry["id"], "label": entry["label"], "url": url}
+
+
+suggest_index = SuggestIndex()
@@ -1,6 +1,12 @@
 from django.conf import settings
-from django.db.models.signals import post_migrate
-from django.dispatch import receiver
+from django.db import transaction
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+# Se emite cada vez que cambia Pack.stock vía Pack.adjust_stock (QuerySet.update
+# no dispara post_save). kwargs: pack_ids (lista de ids afectados) y deltas
+# ({pack_id: unidades sumadas}).
+stock_changed = Signal()
 
 
 @receiver(post_migrate)
@@ -17,3 +23,186 @@ def create_demo_packs(sender, app_config, **kwargs):
         if settings.DEBUG:
             raise
         # En producción ignoramos errores silenciosamente
+
+
+def _bump_catalog(**kwargs):
+    from .services.catalog_cache import bump_catalog_generation
+
+    bump_catalog_generation()
+
+
+@receiver(stock_changed)
+def catalog_on_stock_changed(sender, **kwargs):
+    # Después del COMMIT: nada de la caché dentro del lock de la fila
+    transaction.on_commit(_bump_catalog)
+
+
+@receiver(post_save, sender="marketplace.Pack")
+@receiver(post_delete, sender="marketplace.Pack")
+@receiver(post_save, sender="marketplace.Partner")
+@receiver(post_delete, sender="marketplace.Partner")
+def catalog_on_catalog_write(sender, **kwargs):
+    _bump_catalog()
+
+
+@receiver(post_save, sender="marketplace.Order")
+def catalog_on_order_created(sender, instance, created, **kwargs):
+    # Nuevas órdenes cambian "mas-comprado" aunque no toquen stock (checkout)
+    if created:
+        _bump_catalog()
+
+
+@receiver(stock_changed)
+def changelog_on_stock_changed(sender, deltas=None, **kwargs):
+    # Dentro de la transacción a propósito: el cambio de stock y su registro son atómicos
+    from .services.catalog_changes import record_stock_changes
+
+    record_stock_changes(deltas)
+
+
+@receiver(stock_changed)
+def stream_on_stock_changed(sender, pack_ids=(), **kwargs):
+    from .services.stock_stream import broker
+
+    # Solo si alguien en este proceso mira esos packs (el worker nunca tiene suscriptores)
+    if broker.watching(pack_ids):
+        transaction.on_commit(lambda: broker.publish_current(pack_ids))
+
+
+@receiver(post_save, sender="marketplace.Pack")
+def changelog_on_pack_save(sender, instance, **kwargs):
+    from .models import CatalogChange
+    from .services.catalog_changes import record_change
+
+    record_change(CatalogChange.Tipo.PACK, pack_id=instance.pk, partner_id=instance.partner_id)
+
+
+@receiver(post_save, sender="marketplace.Partner")
+def changelog_on_partner_save(sender, instance, **kwargs):
+    from .models import CatalogChange
+    from .services.catalog_changes import record_change
+
+    record_change(CatalogChange.Tipo.PARTNER, partner_id=instance.pk)
+
+
+@receiver(post_delete, sender="marketplace.Pack")
+def changelog_on_pack_delete(sender, instance, **kwargs):
+    from .models import CatalogChange
+    from .services.catalog_changes import record_change
+
+    record_change(CatalogChange.Tipo.BORRADO, pack_id=instance.pk, partner_id=instance.partner_id)
+
+
+@receiver(post_delete, sender="marketplace.Partner")
+def changelog_on_partner_delete(sender, instance, **kwargs):
+    from .models import CatalogChange
+    from .services.catalog_changes import record_change
+
+    record_change(CatalogChange.Tipo.BORRADO, partner_id=instance.pk)
+
+
+@receiver(post_save, sender="marketplace.CartItem")
+@receiver(post_delete, sender="marketplace.CartItem")
+def badges_on_cart_change(sender, instance, **kwargs):
+    from .services.badges import invalidate_cart_badge_on_commit
+
+    # Vaciar el carrito manda un post_delete por item: se junta todo en un solo on_commit
+    if sender.cart.is_cached(instance):
+        invalidate_cart_badge_on_commit(user_id=instance.cart.user_id)
+    else:
+        invalidate_cart_badge_on_commit(cart_id=instance.cart_id)
+
+
+@receiver(post_save, sender="marketplace.Order")
+def badges_on_order_change(sender, instance, **kwargs):
+    from .services.badges import invalidate_reminders_badge
+
+    invalidate_reminders_badge(instance.user_id)
+
+
+# Campos que forman parte del documento de búsqueda (ver services/search.py)
+PACK_SEARCH_FIELDS = {"titulo", "etiqueta", "partner"}
+PARTNER_SEARCH_FIELDS = {"nombre", "short_description"}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_save, sender="marketplace.Pack")
+def search_on_pack_save(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, PACK_SEARCH_FIELDS):
+        from .services.search import reindex
+
+        reindex(pack_ids=[instance.pk])
+
+
+@receiver(post_save, sender="marketplace.Partner")
+def search_on_partner_save(sender, instance, created, update_fields=None, **kwargs):
+    if _touches(update_fields, PARTNER_SEARCH_FIELDS):
+        from .services.search import reindex
+
+        # El nombre del comercio también está en el documento de cada pack
+        reindex(partner_ids=[instance.pk], packs_of_partners=None if created else [instance.pk])
+
+
+@receiver(post_delete, sender="marketplace.Pack")
+def search_on_pack_delete(sender, instance, **kwargs):
+    from .services.search import unindex
+
+    unindex(pack_ids=[instance.pk])
+
+
+@receiver(post_delete, sender="marketplace.Partner")
+def search_on_partner_delete(sender, instance, **kwargs):
+    from .services.search import unindex
+
+    unindex(partner_ids=[instance.pk])
+
+
+# El índice de sugerencias vive en memoria: se toca recién después del COMMIT,
+# así un rollback no deja entradas de cambios que nunca existieron.
+@receiver(post_save, sender="marketplace.Pack")
+def suggest_on_pack_save(sender, instance, **kwargs):
+    from .services.suggest import suggest_index
+
+    pack_id = instance.pk
+    if {"titulo", "stock", "pickup_end"} & instance.get_deferred_fields():
+        transaction.on_commit(lambda: suggest_index.refresh_packs([pack_id]))
+    else:
+        values = (instance.titulo, instance.stock, instance.pickup_end)
+        transaction.on_commit(lambda: suggest_index.update_pack(pack_id, *values))
+
+
+@receiver(post_delete, sender="marketplace.Pack")
+def suggest_on_pack_delete(sender, instance, **kwargs):
+    from .services.suggest import suggest_index
+
+    pack_id = instance.pk
+    transaction.on_commit(lambda: suggest_index.remove_pack(pack_id))
+
+
+@receiver(stock_changed)
+def suggest_on_stock_changed(sender, pack_ids=(), **kwargs):
+    from .services.suggest import suggest_index
+
+    # Fuera de la transacción de la reserva: el SELECT no alarga el lock de la fila
+    if suggest_index.built:
+        pack_ids = list(pack_ids)
+        transaction.on_commit(lambda: suggest_index.refresh_packs(pack_ids))
+
+
+@receiver(post_save, sender="marketplace.Partner")
+def suggest_on_partner_save(sender, instance, **kwargs):
+    from .services.suggest import suggest_index
+
+    values = (instance.pk, instance.nombre, instance.slug)
+    transaction.on_commit(lambda: suggest_index.update_partner(*values))
+
+
+@receiver(post_delete, sender="marketplace.Partner")
+def suggest_on_partner_delete(sender, instance, **kwargs):
+    from .services.suggest import suggest_index
+
+    partner_id = instance.pk
+    transaction.on_commit(lambda: suggest_index.remove_partner(partner_id))
@@ -0,0 +1,43 @@
+"""
+Tareas de fondo del marketplace (las corre `manage.py runworker`).
+Reemplazan al cron: cada una se reprograma sola `every` segundos después de terminar.
+"""
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+
+from jobs.registry import task
+from marketplace.services import catalog_changes, expiry, inventory, reminders
+
+
+# Tope de tandas por corrida: con backlog grande sigue en la siguiente, sin acaparar el worker
+@task("marketplace.expire_orders", every=60, max_attempts=3, concurrency=1)
+def expire_orders(batch_size=1000, max_batches=20):
+    return expiry.expire_orders(batch_size=batch_size, max_batches=max_batches)
+
+
+@task("marketplace.send_reminders", every=300, max_attempts=3, concurrency=1)
+def send_reminders(limit=None):
+    if not getattr(settings, "REMINDER_ENABLED", True):
+        return {"skipped": True}
+    sent, failed = reminders.send_due_reminders(limit=limit)
+    return {"sent": sent, "failed": failed}
+
+
+@task("marketplace.reap_stock_holds", every=60, max_attempts=3, concurrency=1)
+def reap_stock_holds():
+    cancelled, deleted = inventory.reap_expired_holds()
+    return {"cancelled": cancelled, "deleted": deleted}
+
+
+@task("marketplace.sync_image_markers", every=6 * 3600, max_attempts=2, concurrency=1, timeout=3600)
+def sync_image_markers():
+    out = StringIO()
+    call_command("sync_image_markers", stdout=out)
+    return out.getvalue().strip().splitlines()[-1:]
+
+
+@task("marketplace.prune_catalog_changes", every=3600, max_attempts=2, concurrency=1)
+def prune_catalog_changes():
+    return {"deleted": catalog_changes.prune_changes()}
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.context_processors import reminders_cp
+from marketplace.context_processors import cart_badge
+from marketplace.models import Partner, Pack, Order
+from marketplace.models_cart import Cart, CartItem
+from marketplace.services.badges import cart_count, reminders_count
+
+User = get_user_model()
+
+
+class BadgeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("u1", password="pass")
+        owner = User.objects.create_user("owner", password="pass")
+        partner = Partner.objects.create(owner=owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        kw = dict(partner=partner, etiqueta=Pack.Etiqueta.EXCEDENTE, precio_original=1000, precio_oferta=500,
+                  stock=5, pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(minutes=30))
+        self.p1 = Pack.objects.create(titulo="P1", **kw)
+        self.p2 = Pack.objects.create(titulo="P2", **kw)
+        self.cart = Cart.objects.create(user=self.user)
+        self.client.login(username="u1", password="pass")
+
+    def _cart_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        return [q for q in ctx.captured_queries if "marketplace_cartitem" in q["sql"]]
+
+    def test_processors_are_lazy(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        with self.assertNumQueries(0):
+            ctx = {**cart_badge(request), **reminders_cp(request)}
+        with self.assertNumQueries(2):
+            self.assertEqual((int(str(ctx["cart_count"])), int(str(ctx["reminders_count"]))), (0, 0))
+
+    def test_cart_count_cached_and_invalidated_by_cart_changes(self):
+        self.assertEqual(cart_count(self.user.id), 0)
+        # Se invalida al COMMIT
+        with self.captureOnCommitCallbacks(execute=True):
+            item = CartItem.objects.create(cart=self.cart, pack=self.p1)
+        self.assertEqual(cart_count(self.user.id), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(cart_count(self.user.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.filter(pk=item.pk).delete()
+        self.assertEqual(cart_count(self.user.id), 0)
+
+    def test_clearing_cart_invalidates_once(self):
+        for i in range(5):
+            CartItem.objects.create(cart=self.cart, pack=Pack.objects.create(
+                titulo=f"X{i}", partner=self.p1.partner, etiqueta=Pack.Etiqueta.EXCEDENTE, precio_original=1000,
+                precio_oferta=500, stock=5, pickup_start=self.p1.pickup_start, pickup_end=self.p1.pickup_end))
+        self.assertEqual(cart_count(self.user.id), 5)
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                CartItem.objects.filter(cart=self.cart).delete()
+        self.assertEqual(len(callbacks), 1)
+        cart_lookups = [q for q in ctx.captured_queries if 'FROM "marketplace_cart" ' in q["sql"]]
+        self.assertEqual(len(cart_lookups), 1, cart_lookups)
+        self.assertEqual(cart_count(self.user.id), 0)
+
+    def test_reminders_count_invalidated_by_order_changes(self):
+        self.assertEqual(reminders_count(self.user.id), 0)
+        order = Order.objects.create(user=self.user, pack=self.p1, precio_pagado=500)
+        self.assertEqual(reminders_count(self.user.id), 1)
+        with self.assertNumQueries(0):
+            reminders_count(self.user.id)
+        order.cancel()
+        self.assertEqual(reminders_count(self.user.id), 0)
+
+    def test_navbar_badge_reads_cache_on_second_render(self):
+        CartItem.objects.create(cart=self.cart, pack=self.p1)
+        CartItem.objects.create(cart=self.cart, pack=self.p2)
+        res = self.client.get(reverse("home"))
+        self.assertContains(res, ">2</span>")
+        self.assertEqual(self._cart_queries(reverse("home")), [])
+        self.assertEqual(self._cart_queries("/no-existe/"), [])
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from marketplace.models import Pack, Order
+from marketplace.services.bench import DEFAULT_BUDGETS, DEFAULT_TARGETS, check_budgets, run_benchmarks
+from marketplace.services.demo_seed import seed_scaled
+
+
+class BenchHarnessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_scaled(partners=12, packs=60, orders=300, users=10, batch_size=50)
+
+    def test_seed_builds_dataset_with_counters(self):
+        self.assertEqual(Pack.objects.filter(partner__slug__startswith="bench-").count(), 60)
+        self.assertEqual(Order.objects.count(), 300)
+        self.assertTrue(Order.objects.filter(user=self.user).exists())
+        pack = Pack.objects.order_by("-orders_count").first()
+        self.assertEqual(pack.orders_count, pack.orders.exclude(estado="cancelado").count())
+
+    def test_bench_cart_is_single_merchant(self):
+        partners = set(self.user.cart.cart_items.values_list("pack__partner_id", flat=True))
+        self.assertEqual(len(partners), 1)
+        self.assertEqual(self.user.cart.cart_items.count(), 3)
+
+    def test_every_target_within_default_query_budget(self):
+        results = run_benchmarks(self.user, "bench-0", runs=2)
+        self.assertEqual(set(results), set(DEFAULT_TARGETS))
+        # Solo queries: la latencia en CI no es estable
+        budgets = {name: {"queries": DEFAULT_BUDGETS[name]["queries"]} for name in results}
+        self.assertEqual(check_budgets(results, budgets), [])
+
+    def test_command_fails_when_budget_exceeded(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as fh:
+            json.dump({"api_packs": {"queries": 0}}, fh)
+        self.addCleanup(os.unlink, fh.name)
+        with self.assertRaises(CommandError):
+            call_command("bench_views", "--runs", "1", "--only", "api_packs", "--budgets", fh.name, stdout=StringIO())
@@ -72,4 +72,33 @@ class CartCheckoutTests(TestCase):
         res = self.client.post(reverse('cart-checkout'))
         self.assertEqual(res.status_code, 200)
         after = Pack.objects.get(id=self.p1.id).stock
-        self.assertEqual(after, before)
+        # el checkout aparta el stock (StockHold) hasta el pago o el vencimiento
+        self.assertEqual(after, before - 1)
+
+    def test_checkout_bulk_creates_grouped_orders(self):
+        self.login_and_add([self.p1, self.p2])
+        res = self.client.post(reverse('cart-checkout'))
+        self.assertEqual(res.status_code, 200, res.content)
+        orders = list(Order.objects.filter(user=self.user))
+        self.assertEqual(len(orders), 2)
+        self.assertEqual({str(o.checkout_group) for o in orders}, {res.json()['checkout_group']})
+        self.assertTrue(all(o.stock_decremented for o in orders))
+        for p in (self.p1, self.p2):
+            p.refresh_from_db()
+            self.assertEqual((p.stock, p.orders_count), (2, 1))
+
+    def test_checkout_queries_do_not_grow_with_items(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        User.objects.create_user('u2', password='pass')
+        counts = []
+        for username, packs in (('u1', [self.p1]), ('u2', [self.p1, self.p2])):
+            self.client.login(username=username, password='pass')
+            for p in packs:
+                self.client.post(reverse('cart-add'), {"pack_id": p.id}, format='json')
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(reverse('cart-checkout'))
+            self.assertEqual(res.status_code, 200, res.content)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from marketplace.models import Partner, Pack
+from marketplace.models_cart import Cart, CartItem, CartSnapshot
+
+User = get_user_model()
+
+
+class CartSnapshotTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user("u1", password="pass")
+        owner = User.objects.create_user("owner", password="pass")
+        self.partner = Partner.objects.create(owner=owner, categoria=Partner.Categoria.CAFE, nombre="A", direccion="x")
+        self.now = timezone.now()
+        kw = dict(partner=self.partner, etiqueta=Pack.Etiqueta.EXCEDENTE, precio_original=1000, stock=5)
+        self.p1 = Pack.objects.create(titulo="P1", precio_oferta=500, pickup_start=self.now - timedelta(hours=2),
+                                      pickup_end=self.now + timedelta(hours=3), **kw)
+        self.p2 = Pack.objects.create(titulo="P2", precio_oferta=300, pickup_start=self.now - timedelta(hours=1),
+                                      pickup_end=self.now + timedelta(hours=2), **kw)
+        self.p3 = Pack.objects.create(titulo="P3", precio_oferta=250, pickup_start=self.now - timedelta(hours=1),
+                                      pickup_end=self.now + timedelta(hours=4), **kw)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, pack=self.p1, quantity=2)
+        CartItem.objects.create(cart=self.cart, pack=self.p2, quantity=1)
+
+    def test_snapshot_is_one_query_and_matches_aggregates(self):
+        with self.assertNumQueries(1):
+            snap = self.cart.snapshot()
+            data = snap.to_dict()
+        self.assertEqual(snap.merchant, self.partner)
+        self.assertEqual(snap.total, Decimal("1300.00"))
+        self.assertEqual(data["item_count"], 2)
+        self.assertEqual(snap.window_start, self.p2.pickup_start)
+        self.assertEqual(snap.window_end, self.p2.pickup_end)
+        self.assertEqual([i["pack_id"] for i in data["items"]], [self.p1.id, self.p2.id])
+
+    def test_empty_snapshot(self):
+        data = CartSnapshot([]).to_dict()
+        self.assertEqual((data["merchant"], data["item_count"], data["total"]), (None, 0, "0.00"))
+        self.assertIsNone(data["window_start"])
+
+    def test_api_reads_cart_items_once(self):
+        self.client.login(username="u1", password="pass")
+        for method, url, body in (
+            ("get", reverse("cart-list"), None),
+            ("post", reverse("cart-add"), {"pack_id": self.p3.id}),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                res = getattr(self.client, method)(url, body, format="json")
+            self.assertEqual(res.status_code, 200)
+            item_reads = [q for q in ctx.captured_queries
+                          if "marketplace_cartitem" in q["sql"] and q["sql"].startswith("SELECT")]
+            self.assertEqual(len(item_reads), 1, url)
+        self.assertEqual(res.json()["item_count"], 3)
+
+    def test_cart_page_renders_snapshot(self):
+        self.client.login(username="u1", password="pass")
+        res = self.client.get(reverse("cart"))
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, "P1")
+        self.assertContains(res, "1300")
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import CatalogChange, Order, Pack, Partner
+from marketplace.services.catalog_changes import catalog_version, changes_since, prune_changes
+from marketplace.services.expiry import expire_orders
+
+User = get_user_model()
+
+
+class CatalogChangesTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user("buyer", password="pass")
+        owner = User.objects.create_user("owner", password="pass")
+        self.partner = Partner.objects.create(owner=owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        self.pack = Pack.objects.create(
+            partner=self.partner, titulo="Pack", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=5,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+
+    def test_stock_paths_are_logged(self):
+        version, _ = catalog_version()
+        order = Order.objects.create(user=self.buyer, pack=self.pack, precio_pagado=500)
+        order.refresh_from_db()
+        order.cancel()
+        checkout = Order.objects.create(user=self.buyer, pack=self.pack, precio_pagado=500)
+        Order.objects.filter(pk=checkout.pk).update(stock_decremented=False)
+        checkout.refresh_from_db()
+        checkout.mark_paid()
+
+        changes = changes_since(version)
+        # -1 (reserva) +1 (cancelación) -1 (reserva) -1 (pago sin descuento previo)
+        self.assertEqual(changes["stock"], {self.pack.id: -2})
+        self.assertEqual(CatalogChange.objects.filter(id__gt=version, tipo="stock").count(), 4)
+        self.assertGreater(changes["version"], version)
+        self.assertEqual(changes_since(changes["version"])["stock"], {})
+
+    def test_expiry_returns_stock_in_log(self):
+        Order.objects.create(user=self.buyer, pack=self.pack, precio_pagado=500)
+        Pack.objects.filter(pk=self.pack.pk).update(pickup_end=timezone.now() - timedelta(minutes=1))
+        version, _ = catalog_version()
+        expire_orders()
+        self.assertEqual(changes_since(version)["stock"], {self.pack.id: 1})
+
+    def test_pack_and_partner_writes(self):
+        version, _ = catalog_version()
+        self.pack.titulo = "Otro"
+        self.pack.save()
+        self.partner.nombre = "Cafe 2"
+        self.partner.save()
+        pack_id = self.pack.id
+        Pack.objects.get(pk=pack_id).delete()
+        changes = changes_since(version)
+        self.assertEqual(changes["packs"], {pack_id})
+        self.assertEqual(changes["partners"], {self.partner.id})
+        self.assertEqual(changes["deleted_packs"], {pack_id})
+
+    def test_limit_and_prune(self):
+        version, _ = catalog_version()
+        for delta in (1, 1, 1):
+            Pack.adjust_stock(self.pack.id, delta)
+        first = changes_since(version, limit=2)
+        self.assertTrue(first["more"])
+        self.assertEqual(first["stock"], {self.pack.id: 2})
+        self.assertEqual(changes_since(first["version"])["stock"], {self.pack.id: 1})
+
+        last, _ = catalog_version()
+        prune_changes(keep_hours=0, now=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(list(CatalogChange.objects.values_list("id", flat=True)), [last])
+        self.assertEqual(catalog_version()[0], last)
+        self.assertTrue(changes_since(version)["reset"])
+        self.assertFalse(changes_since(last)["reset"])
+
+    def test_http_validators_follow_version(self):
+        url = reverse("packs:detail", args=[self.pack.id])
+        res = self.client.get(url)
+        self.assertTrue(res.has_header("Last-Modified"))
+        etag = res["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Un cambio de stock hecho "en otro proceso" (sin pasar por la caché local)
+        cache.clear()
+        Pack.adjust_stock(self.pack.id, -1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
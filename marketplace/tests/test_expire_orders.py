@@ -4,7 +4,8 @@ from datetime import timedelta
 from django.core.management import call_command
 from django.contrib.auth import get_user_model
 
-from marketplace.models import Partner, Pack, Order
+from marketplace.models import Checkpoint, Partner, Pack, Order
+from marketplace.services.expiry import CHECKPOINT_NAME, expire_orders
 
 User = get_user_model()
 
@@ -58,3 +59,40 @@ class ExpirarOrdenesTests(TestCase):
         self.order_vigente.refresh_from_db()
         self.assertEqual(self.order_expirada.estado, Order.Estado.EXPIRADO)
         self.assertEqual(self.order_vigente.estado, Order.Estado.PENDIENTE)
+
+    def test_returns_stock_of_pending_only(self):
+        Order.objects.create(
+            user=User.objects.create_user(username="u2", password="pass123"), pack=self.pack_vigente,
+            precio_pagado=500, estado=Order.Estado.PAGADO,
+        )
+        Pack.objects.filter(pk=self.pack_vigente.pk).update(pickup_end=timezone.now() - timedelta(minutes=1))
+
+        stats = expire_orders()
+        self.assertEqual((stats["expired"], stats["stock_returned"], stats["done"]), (3, 2, True))
+        self.pack_expirada.refresh_from_db()
+        self.pack_vigente.refresh_from_db()
+        self.assertEqual(self.pack_expirada.stock, 5)
+        self.assertEqual(self.pack_vigente.stock, 4)  # la pagada no devuelve stock
+        self.assertEqual(expire_orders()["expired"], 0)
+
+    def test_batches_resume_from_checkpoint(self):
+        Pack.objects.filter(pk=self.pack_vigente.pk).update(stock=20)
+        self.pack_vigente.refresh_from_db()
+        for i in range(4):
+            Order.objects.create(
+                user=User.objects.create_user(username=f"b{i}", password="pass123"), pack=self.pack_vigente,
+                precio_pagado=500, estado=Order.Estado.PENDIENTE,
+            )
+        later = timezone.now() + timedelta(hours=4)
+
+        first = expire_orders(now=later, batch_size=2, max_batches=2)
+        self.assertEqual((first["expired"], first["batches"], first["done"]), (4, 2, False))
+        # En la base: la próxima corrida puede ser otro proceso
+        self.assertEqual(Checkpoint.objects.get(name=CHECKPOINT_NAME).last_id, Order.objects.filter(estado=Order.Estado.EXPIRADO).order_by("id").values_list("id", flat=True)[3])
+
+        rest = expire_orders(now=later, batch_size=2, max_batches=2)
+        self.assertEqual((rest["expired"], rest["done"]), (2, True))
+        self.assertFalse(Checkpoint.objects.filter(name=CHECKPOINT_NAME).exists())
+        self.assertFalse(Order.objects.filter(estado__in=[Order.Estado.PENDIENTE, Order.Estado.PAGADO]).exists())
+        self.pack_vigente.refresh_from_db()
+        self.assertEqual(self.pack_vigente.stock, 21)  # 20 + la orden vigente del setUp
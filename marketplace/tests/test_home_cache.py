@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from marketplace.services.catalog_cache import (
+    catalog_generation, home_sections_key, normalize_home_params,
+)
+
+User = get_user_model()
+
+
+class HomeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner", password="pass")
+        self.buyer = User.objects.create_user("buyer", password="pass")
+        self.partner = Partner.objects.create(owner=self.owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        self.pack = Pack.objects.create(
+            partner=self.partner, titulo="Primero", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=3,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+
+    def _pack_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("home"))
+        self.assertEqual(res.status_code, 200)
+        return res, [q for q in ctx.captured_queries if "marketplace_pack" in q["sql"]]
+
+    def test_second_anonymous_hit_is_served_from_cache(self):
+        _, first = self._pack_queries()
+        self.assertGreaterEqual(len(first), 3)
+        res, second = self._pack_queries()
+        self.assertEqual(second, [])
+        self.assertContains(res, "Primero")
+
+    def test_pack_save_invalidates(self):
+        self._pack_queries()
+        now = timezone.now()
+        Pack.objects.create(
+            partner=self.partner, titulo="Segundo", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=400, stock=1,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+        res, queries = self._pack_queries()
+        self.assertTrue(queries)
+        self.assertContains(res, "Segundo")
+
+    def test_stock_update_and_order_creation_bump_generation(self):
+        gen = catalog_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            Pack.adjust_stock(self.pack.id, -1)
+            # Recién después del COMMIT
+            self.assertEqual(catalog_generation(), gen)
+        self.assertGreater(catalog_generation(), gen)
+
+        gen = catalog_generation()
+        o = Order(user=self.buyer, pack=self.pack, precio_pagado=500)
+        o._skip_stock = True
+        o.save()
+        self.assertGreater(catalog_generation(), gen)
+
+    def test_key_ignores_param_order_and_unrelated_params(self):
+        a = normalize_home_params({"oferta": "1", "orden": "nuevo", "utm": "x"})
+        b = normalize_home_params({"orden": "nuevo", "oferta": "1"})
+        self.assertEqual(a, b)
+        self.assertEqual(home_sections_key({"oferta": "1"}), home_sections_key({"oferta": "1", "page": "2"}))
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack
+
+User = get_user_model()
+
+
+class CatalogHttpCacheTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("owner", password="pass")
+        self.partner = Partner.objects.create(owner=owner, categoria="cafe", nombre="Cafe Etag", direccion="x")
+        now = timezone.now()
+        self.pack = Pack.objects.create(
+            partner=self.partner, titulo="Pack Etag", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=3,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+
+    def _get(self, url, **extra):
+        res = self.client.get(url, **extra)
+        self.assertIn("Cookie", res.get("Vary", ""))
+        return res
+
+    def assertPublicIsShareable(self, res, url):
+        # Nada del visitante en lo que un proxy/CDN puede guardar
+        self.assertNotIn("Set-Cookie", str(res.serialize_headers()), url)
+        self.assertFalse(res.cookies, url)
+        self.assertNotIn(b"csrfmiddlewaretoken", res.content, url)
+
+    def test_anonymous_pages_revalidate(self):
+        for url in (reverse("home"), reverse("packs:list"), reverse("packs:detail", args=[self.pack.id]),
+                    reverse("categoria_list", args=["cafes"]), reverse("pack-list")):
+            first = self._get(url)
+            self.assertEqual(first.status_code, 200, url)
+            etag = first["ETag"]
+            self.assertIn("public", first["Cache-Control"], url)
+            self.assertIn("stale-while-revalidate", first["Cache-Control"], url)
+            self.assertPublicIsShareable(first, url)
+            again = self._get(url)
+            self.assertIn("public", again["Cache-Control"], url)
+            self.assertPublicIsShareable(again, url)
+            self.assertEqual(self._get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304, url)
+
+    def test_catalog_write_changes_etag(self):
+        url = reverse("packs:detail", args=[self.pack.id])
+        etag = self._get(url)["ETag"]
+        self.pack.titulo = "Pack Etag 2"
+        self.pack.save(update_fields=["titulo"])
+        res = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_csrf_token_makes_response_private(self):
+        from django.http import HttpResponse
+        from django.middleware.csrf import get_token
+        from django.test import RequestFactory
+
+        from marketplace.services.catalog_cache import catalog_http_cache
+
+        @catalog_http_cache
+        def view(request):
+            return HttpResponse(get_token(request))
+
+        request = RequestFactory().get("/x/")
+        request.user = None
+        res = view(request)
+        self.assertIn("private", res["Cache-Control"])
+        self.assertNotIn("public", res["Cache-Control"])
+
+    def test_logged_in_not_cached(self):
+        User.objects.create_user("u1", password="pass")
+        self.client.login(username="u1", password="pass")
+        res = self._get(reverse("packs:list"))
+        self.assertFalse(res.has_header("ETag"))
+        self.assertNotIn("public", res.get("Cache-Control", ""))
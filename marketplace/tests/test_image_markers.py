@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack
+from marketplace.serializers import PackSerializer
+
+User = get_user_model()
+
+
+class ImageMarkerTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media, USE_STOCK_IMAGES_FORCE_STOCK=False)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        owner = User.objects.create_user("owner", password="pass")
+        self.partner = Partner.objects.create(owner=owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        self.pack = Pack.objects.create(
+            partner=self.partner, titulo="Box", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=3,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+
+    def _upload(self):
+        self.pack.imagen.save("box.png", SimpleUploadedFile("box.png", b"img"), save=True)
+
+    def test_flag_follows_save_and_delete(self):
+        self.assertFalse(self.pack.imagen_presente)
+        self._upload()
+        self.pack.refresh_from_db()
+        self.assertTrue(self.pack.imagen_presente)
+
+        self.pack.imagen.delete(save=True)
+        self.pack.refresh_from_db()
+        self.assertFalse(self.pack.imagen_presente)
+
+    def test_update_fields_without_imagen_keeps_flag(self):
+        self._upload()
+        self.pack.titulo = "Otro"
+        self.pack.save(update_fields=["titulo"])
+        self.pack.refresh_from_db()
+        self.assertTrue(self.pack.imagen_presente)
+
+    def test_full_save_checks_storage_only_when_imagen_changes(self):
+        self._upload()
+        pack = Pack.objects.get(pk=self.pack.pk)
+        with mock.patch.object(FileSystemStorage, "exists", side_effect=AssertionError("HEAD sin cambio de imagen")):
+            pack.titulo = "Otro"
+            pack.save()
+            pack.save()
+        pack.imagen.name = "packs/no-existe.png"
+        with mock.patch.object(FileSystemStorage, "exists", return_value=False) as exists:
+            pack.save()
+        exists.assert_called_once_with("packs/no-existe.png")
+        pack.refresh_from_db()
+        self.assertFalse(pack.imagen_presente)
+
+    def test_read_path_never_hits_storage(self):
+        self._upload()
+        pack = Pack.objects.select_related("partner").get(pk=self.pack.pk)
+        with mock.patch.object(FileSystemStorage, "exists", side_effect=AssertionError("storage.exists en lectura")):
+            self.assertIn("/media/packs/", pack.image_or_stock_url)
+            self.assertTrue(pack.partner.image_or_stock_url)
+            data = PackSerializer(pack).data
+        self.assertIn("/media/packs/", data["imagen_url"])
+
+    def test_sync_command_clears_stale_markers(self):
+        self._upload()
+        self.pack.refresh_from_db()
+        self.pack.imagen.storage.delete(self.pack.imagen.name)
+        call_command("sync_image_markers")
+        self.pack.refresh_from_db()
+        self.assertFalse(self.pack.imagen_presente)
+        self.assertNotIn("/media/", self.pack.image_or_stock_url)
@@ -0,0 +1,29 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from marketplace.models import Pack, Order
+
+
+class HotQueryIndexTests(TestCase):
+    def _db_indexes(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return {name for name, info in constraints.items() if info["index"]}
+
+    def test_meta_indexes_exist_in_db(self):
+        for model in (Pack, Order):
+            expected = {idx.name for idx in model._meta.indexes}
+            self.assertTrue(expected)
+            self.assertLessEqual(expected, self._db_indexes(model), model.__name__)
+
+    def test_explain_compare_restores_indexes(self):
+        out = StringIO()
+        call_command("explain_queries", "--compare", "--only", "mis-pedidos", stdout=out)
+        text = out.getvalue()
+        self.assertIn("[sin índices] /mis-pedidos/", text)
+        self.assertIn("[con índices] /mis-pedidos/", text)
+        self.assertNotIn("No se pudo quitar", text)
+        self.assertLessEqual({idx.name for idx in Order._meta.indexes}, self._db_indexes(Order))
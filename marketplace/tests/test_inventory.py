@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order, StockHold
+from marketplace.services import inventory
+from marketplace.services.bench import reservation_contention
+
+User = get_user_model()
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pass")
+        self.u1 = User.objects.create_user("u1", password="pass")
+        self.u2 = User.objects.create_user("u2", password="pass")
+        self.partner = Partner.objects.create(owner=self.owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        self.pack = Pack.objects.create(
+            partner=self.partner, titulo="Ultimo", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=1,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+
+    def _stock(self):
+        self.pack.refresh_from_db(fields=["stock", "orders_count"])
+        return self.pack.stock
+
+    def test_take_stock_is_conditional(self):
+        self.assertFalse(inventory.take_stock(self.pack.id, quantity=2))
+        self.assertFalse(inventory.take_stock(self.pack.id, now=self.pack.pickup_end + timedelta(minutes=1)))
+        self.assertTrue(inventory.take_stock(self.pack.id))
+        self.assertFalse(inventory.take_stock(self.pack.id))
+        self.assertEqual(self._stock(), 0)
+
+    def test_reservar_last_unit(self):
+        url = reverse("pack-reservar", args=[self.pack.id])
+        self.client.login(username="u1", password="pass")
+        res = self.client.post(url)
+        self.assertEqual(res.status_code, 201, res.content)
+        self.assertEqual(res.json()["nuevo_stock"], 0)
+        self.assertTrue(Order.objects.get(pk=res.json()["order_id"]).stock_decremented)
+
+        self.client.login(username="u2", password="pass")
+        self.assertEqual(self.client.post(url).status_code, 409)
+        self.assertEqual(self._stock(), 0)
+        self.assertEqual(self.pack.orders_count, 1)
+
+    def test_lost_race_rolls_back_order(self):
+        # Otro comprador se llevó la unidad entre la lectura y el UPDATE
+        stale = Pack.objects.get(pk=self.pack.pk)
+        Pack.objects.filter(pk=self.pack.pk).update(stock=0)
+        with self.assertRaises(ValidationError):
+            inventory.reserve(self.u1, stale)
+        self.assertFalse(Order.objects.filter(pack=self.pack).exists())
+        self.assertEqual(self._stock(), 0)
+        self.assertEqual(self.pack.orders_count, 0)
+
+    @override_settings(STOCK_HOLD_TTL=60)
+    def test_reserve_touches_pack_row_once(self):
+        Pack.objects.filter(pk=self.pack.pk).update(stock=2)
+        with CaptureQueriesContext(connection) as ctx:
+            inventory.reserve(self.u1, Pack.objects.get(pk=self.pack.pk))
+        pack_updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "marketplace_pack"')]
+        # Stock y orders_count en el mismo UPDATE: el lock de la fila empieza ahí
+        self.assertEqual(len(pack_updates), 1, pack_updates)
+        self.assertIn("orders_count", pack_updates[0])
+        self.assertEqual((self._stock(), self.pack.orders_count), (1, 1))
+
+        with self.assertRaisesMessage(ValidationError, "Ya reservaste"):
+            inventory.reserve(self.u1, Pack.objects.get(pk=self.pack.pk))
+        self.assertEqual((self._stock(), self.pack.orders_count), (1, 1))
+
+    def test_checkout_hold_and_reaper(self):
+        Pack.objects.filter(pk=self.pack.pk).update(stock=3)
+        self.client.login(username="u1", password="pass")
+        self.client.post(reverse("cart-add"), {"pack_id": self.pack.id}, content_type="application/json")
+        res = self.client.post(reverse("cart-checkout"), content_type="application/json")
+        self.assertEqual(res.status_code, 200, res.content)
+        order = Order.objects.get(pk=res.json()["order_id"])
+        hold = StockHold.objects.get(order=order)
+        self.assertEqual(self._stock(), 2)
+
+        # Antes del vencimiento no se toca
+        self.assertEqual(inventory.reap_expired_holds(), (0, 0))
+        later = hold.expires_at + timedelta(seconds=1)
+        self.assertEqual(inventory.reap_expired_holds(now=later), (1, 1))
+        order.refresh_from_db()
+        self.assertEqual(order.estado, Order.Estado.CANCELADO)
+        self.assertEqual(self._stock(), 3)
+
+    def _checkout(self):
+        self.client.login(username="u1", password="pass")
+        self.client.post(reverse("cart-add"), {"pack_id": self.pack.id}, content_type="application/json")
+        res = self.client.post(reverse("cart-checkout"), content_type="application/json")
+        self.assertEqual(res.status_code, 200, res.content)
+        return Order.objects.get(pk=res.json()["order_id"])
+
+    def test_offline_payment_is_not_reaped(self):
+        Pack.objects.filter(pk=self.pack.pk).update(stock=3)
+        order = self._checkout()
+        Order.objects.filter(pk=order.pk).update(metodo_pago="efectivo")
+        res = self.client.post(reverse("payments_cash_start", args=[order.id]))
+        self.assertEqual(res.status_code, 200, res.content)
+        self.assertFalse(StockHold.objects.filter(order=order).exists())
+
+        later = timezone.now() + timedelta(days=1)
+        self.assertEqual(inventory.reap_expired_holds(now=later), (0, 0))
+        order.refresh_from_db()
+        self.assertEqual(order.estado, Order.Estado.PENDIENTE)
+        self.assertEqual(self._stock(), 2)
+
+    def test_reaper_skips_offline_orders_with_stale_hold(self):
+        Pack.objects.filter(pk=self.pack.pk).update(stock=3)
+        order = self._checkout()
+        Order.objects.filter(pk=order.pk).update(metodo_pago="transferencia")
+        later = timezone.now() + timedelta(days=1)
+        self.assertEqual(inventory.reap_expired_holds(now=later), (0, 1))
+        order.refresh_from_db()
+        self.assertEqual(order.estado, Order.Estado.PENDIENTE)
+        self.assertEqual(self._stock(), 2)
+
+    def test_late_payment_of_reaped_order_needs_stock(self):
+        order = self._checkout()
+        self.assertEqual(self._stock(), 0)
+        inventory.reap_expired_holds(now=timezone.now() + timedelta(days=1))
+        self.assertEqual(self._stock(), 1)
+        # Otro cliente se lleva la unidad devuelta
+        self.assertTrue(inventory.take_stock(self.pack.id))
+
+        order.refresh_from_db()
+        self.assertFalse(order.mark_paid())
+        order.refresh_from_db()
+        self.assertEqual(order.estado, Order.Estado.CANCELADO)
+        self.assertEqual(self._stock(), 0)
+
+        Pack.adjust_stock(self.pack.id, +1)
+        self.assertTrue(order.mark_paid())
+        order.refresh_from_db()
+        self.assertEqual(order.estado, Order.Estado.PAGADO)
+        self.assertTrue(order.stock_decremented)
+        self.assertEqual(self._stock(), 0)
+
+    def test_paid_order_keeps_stock_after_reap(self):
+        Pack.objects.filter(pk=self.pack.pk).update(stock=2)
+        order = Order(user=self.u1, pack=self.pack, precio_pagado=500)
+        order._stock_reserved = True
+        order.save()
+        inventory.hold_orders([order])
+        order.mark_paid()
+        self.assertEqual(self._stock(), 1)  # el pago no descuenta de nuevo
+
+        later = timezone.now() + timedelta(days=1)
+        self.assertEqual(inventory.reap_expired_holds(now=later), (0, 1))
+        self.assertEqual(self._stock(), 1)
+
+    def test_contention_bench_never_oversells(self):
+        for mode in ("lock", "conditional"):
+            result = reservation_contention(buyers=15, stock=5, workers=1, mode=mode)
+            self.assertEqual(result["sold"], 5, mode)
+            self.assertEqual(result["rejected"], 10, mode)
+            self.assertFalse(result["oversold"], mode)
+            self.assertIsNotNone(result["lock_hold_p95_ms"], mode)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from marketplace.services.keyset import KeysetPaginator
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Los packs demo del post_migrate ensucian los listados
+        Pack.objects.all().delete()
+        self.owner = User.objects.create_user("owner", password="pass")
+        self.user = User.objects.create_user("u1", password="pass")
+        self.partner = Partner.objects.create(
+            owner=self.owner, categoria=Partner.Categoria.CAFE, nombre="Cafe Keyset", direccion="x",
+        )
+        now = timezone.now()
+        self.packs = []
+        for i in range(30):
+            # precios repetidos para forzar el desempate por id
+            self.packs.append(Pack.objects.create(
+                partner=self.partner, titulo=f"Pack {i}", etiqueta=Pack.Etiqueta.EXCEDENTE,
+                precio_original=1000, precio_oferta=100 + (i % 4), stock=5,
+                pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+            ))
+
+    def _walk(self, paginator):
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = paginator.page(cursor)
+            ids += [p.id for p in page]
+            pages += 1
+            if not page.has_next():
+                return ids, pages
+            cursor = page.next_cursor
+
+    def test_walk_matches_offset_ordering(self):
+        for keys in (("-creado_at", "-id"), ("precio_oferta", "id"), ("-precio_oferta", "-id")):
+            ids, pages = self._walk(KeysetPaginator(Pack.objects.all(), keys, 7))
+            self.assertEqual(ids, list(Pack.objects.order_by(*keys).values_list("id", flat=True)), keys)
+            self.assertEqual(pages, 5)
+
+    def test_previous_cursor_returns_same_page(self):
+        paginator = KeysetPaginator(Pack.objects.all(), ("precio_oferta", "id"), 7)
+        first = paginator.page()
+        self.assertFalse(first.has_previous())
+        second = paginator.page(first.next_cursor)
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual([p.id for p in back], [p.id for p in first])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_bad_or_foreign_cursor_is_first_page(self):
+        paginator = KeysetPaginator(Pack.objects.all(), ("-creado_at", "-id"), 7)
+        first_ids = [p.id for p in paginator.page()]
+        self.assertEqual([p.id for p in paginator.page("basura")], first_ids)
+        other = KeysetPaginator(Pack.objects.all(), ("-precio_oferta", "-id"), 7).page()
+        self.assertEqual([p.id for p in paginator.page(other.next_cursor)], first_ids)
+
+    def test_page_query_does_not_count(self):
+        paginator = KeysetPaginator(Pack.objects.all(), ("-creado_at", "-id"), 7)
+        cursor = paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.page(cursor)
+        self.assertEqual(len(page), 7)
+        self.assertEqual(paginator.count(exact=True), 30)
+
+    def test_categoria_listing_and_partial(self):
+        url = reverse("categoria_list", args=["cafes"])
+        res = self.client.get(url + "?orden=precio-asc")
+        page = res.context["page"]
+        self.assertEqual(len(page), 24)
+        self.assertContains(res, 'rel="next"')
+
+        part = self.client.get(url, {"orden": "precio-asc", "cursor": page.next_cursor, "partial": "1"})
+        self.assertEqual(part.status_code, 200)
+        self.assertEqual(part["X-Next-Cursor"], "")
+        self.assertNotContains(part, "<html")
+        self.assertEqual(part.content.decode().count('class="card link"'), 6)
+
+    def test_packs_api_cursor_envelope(self):
+        url = reverse("pack-list")
+        data = self.client.get(url, {"ordering": "precio_oferta"}).json()
+        self.assertEqual(len(data["results"]), 12)
+        self.assertIsNone(data["previous"])
+        seen = [r["id"] for r in data["results"]]
+        while data["next"]:
+            data = self.client.get(data["next"]).json()
+            seen += [r["id"] for r in data["results"]]
+        self.assertEqual(seen, list(Pack.objects.order_by("precio_oferta", "id").values_list("id", flat=True)))
+        self.assertIsNotNone(data["previous"])
+
+        exact = self.client.get(url, {"count": "exact"}).json()
+        self.assertEqual(exact["count"], 30)
+        legacy = self.client.get(url, {"page": 3}).json()
+        self.assertEqual(len(legacy["results"]), 6)
+
+    def test_my_orders_cursor(self):
+        for pack in self.packs[:26]:
+            Order.objects.create(user=self.user, pack=pack, precio_pagado=pack.precio_oferta)
+        self.client.login(username="u1", password="pass")
+        res = self.client.get(reverse("my_orders"), {"orden": "monto-desc"})
+        page = res.context["page"]
+        self.assertEqual(len(page), 24)
+        rest = self.client.get(reverse("my_orders"), {"orden": "monto-desc", "cursor": page.next_cursor}).context["page"]
+        self.assertEqual(len(rest), 2)
+        self.assertFalse({o.id for o in rest} & {o.id for o in page})
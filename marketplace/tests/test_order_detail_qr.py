@@ -3,7 +3,13 @@ from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from marketplace.models import Partner, Pack, Order
+from marketplace.services.qr import render_qr
+from payments.models import Payment
 
 User = get_user_model()
 
@@ -46,3 +52,41 @@ class OrderDetailAndQRTests(TestCase):
         self.client.login(username="other", password="pass")
         res = self.client.get(reverse("order_qr", args=[self.order.id]))
         self.assertIn(res.status_code, (404, 403))  # según tu implementación
+
+    def test_order_qr_cached_and_revalidated(self):
+        cache.clear()
+        self.client.login(username="u1", password="pass")
+        url = reverse("order_qr", args=[self.order.id])
+        with patch("marketplace.services.qr.render_qr", wraps=render_qr) as render:
+            first = self.client.get(url)
+            again = self.client.get(url)
+            self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, again.content)
+        self.assertTrue(first["ETag"])
+        self.assertIn("private", first["Cache-Control"])
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 304)
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_order_qr_svg(self):
+        self.client.login(username="u1", password="pass")
+        res = self.client.get(reverse("order_qr_svg", args=[self.order.id]))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "image/svg+xml")
+        self.assertIn(b"<svg", res.content)
+
+    def test_order_detail_queries(self):
+        Payment.objects.create(order=self.order, provider="mp", status="pending")
+        self.client.login(username="u1", password="pass")
+        url = reverse("order_detail", args=[self.order.id])
+        self.client.get(url)  # calienta badges/caché
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.context["is_expiring"])
+        self.assertEqual(res.context["payment_summary"]["status"], "pending")
+        own = [q for q in ctx.captured_queries
+               if "marketplace_order" in q["sql"] or "payments_payment" in q["sql"]]
+        self.assertLessEqual(len(own), 2, [q["sql"] for q in own])
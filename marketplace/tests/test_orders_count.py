@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from marketplace.services.filters import apply_pack_filters
+
+User = get_user_model()
+
+
+class OrdersCountTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pass")
+        self.u1 = User.objects.create_user("u1", password="pass")
+        self.u2 = User.objects.create_user("u2", password="pass")
+        partner = Partner.objects.create(owner=self.owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        kw = dict(partner=partner, etiqueta=Pack.Etiqueta.EXCEDENTE, precio_original=1000, precio_oferta=500,
+                  stock=5, pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2))
+        self.popular = Pack.objects.create(titulo="Popular", **kw)
+        self.nuevo = Pack.objects.create(titulo="Nuevo", **kw)
+
+    def _count(self, pack):
+        pack.refresh_from_db(fields=["orders_count"])
+        return pack.orders_count
+
+    def test_create_cancel_and_late_payment(self):
+        o1 = Order.objects.create(user=self.u1, pack=self.popular, precio_pagado=500)
+        Order.objects.create(user=self.u2, pack=self.popular, precio_pagado=500)
+        self.assertEqual(self._count(self.popular), 2)
+
+        o1.cancel()
+        self.assertEqual(self._count(self.popular), 1)
+        o1.cancel()  # idempotente
+        self.assertEqual(self._count(self.popular), 1)
+
+        o1.mark_paid()
+        self.assertEqual(self._count(self.popular), 2)
+
+    def test_mas_comprado_uses_counter_without_join(self):
+        Order.objects.create(user=self.u1, pack=self.popular, precio_pagado=500)
+        qs = apply_pack_filters(Pack.objects.all(), {"orden": "mas-comprado"})
+        self.assertNotIn("marketplace_order", str(qs.query))
+        self.assertEqual(list(qs.values_list("id", flat=True))[0], self.popular.id)
+
+    def test_rebuild_command_fixes_drift(self):
+        Order.objects.create(user=self.u1, pack=self.popular, precio_pagado=500)
+        cancelled = Order.objects.create(user=self.u2, pack=self.popular, precio_pagado=500)
+        Order.objects.filter(pk=cancelled.pk).update(estado=Order.Estado.CANCELADO)
+        Pack.objects.update(orders_count=99)
+
+        call_command("rebuild_orders_count")
+        self.assertEqual(self._count(self.popular), 1)
+        self.assertEqual(self._count(self.nuevo), 0)
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from marketplace.services.cards import PackCard, pack_card_values, pack_cards
+from marketplace.services.filters import apply_pack_filters
+
+User = get_user_model()
+
+
+class PackCardsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pass")
+        self.buyer = User.objects.create_user("buyer", password="pass")
+        self.partner = Partner.objects.create(
+            owner=self.owner, categoria=Partner.Categoria.CAFE, nombre="Cafe Uno", direccion="x", slug="cafe-uno"
+        )
+        now = timezone.now()
+        self.open_pack = Pack.objects.create(
+            partner=self.partner, titulo="Abierto", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=750, stock=4,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+        self.later_pack = Pack.objects.create(
+            partner=self.partner, titulo="Mas tarde", etiqueta=Pack.Etiqueta.POR_VENCER,
+            precio_original=800, precio_oferta=800, stock=2,
+            pickup_start=now + timedelta(hours=3), pickup_end=now + timedelta(hours=5),
+        )
+
+    def test_projection_precomputes_image(self):
+        cards = {c.id: c for c in pack_cards(Pack.objects.order_by("id"))}
+        card = cards[self.open_pack.id]
+        self.assertIsInstance(card, PackCard)
+        self.assertEqual(card.partner.nombre, "Cafe Uno")
+        # Misma imagen que resolvería el modelo completo
+        self.assertEqual(card.image_or_stock_url, Pack.objects.get(pk=self.open_pack.pk).image_or_stock_url)
+
+    def test_projection_is_a_single_query_and_keeps_ordering(self):
+        Order.objects.create(user=self.buyer, pack=self.later_pack, precio_pagado=800)
+        qs = apply_pack_filters(Pack.objects.all(), {"orden": "mas-comprado"})
+        with self.assertNumQueries(1):
+            cards = pack_cards(qs, limit=12)
+        self.assertEqual([c.id for c in cards][:1], [self.later_pack.id])
+
+    def test_values_rows_are_plain_dicts(self):
+        row = pack_card_values(Pack.objects.filter(pk=self.open_pack.pk)).get()
+        self.assertIsInstance(row, dict)
+        for key in ("image_key", "partner__nombre"):
+            self.assertIn(key, row)
+
+    def test_listing_views_render_cards(self):
+        for url in (
+            reverse("categoria_list", args=["cafes"]),
+            reverse("partner_detail", args=[self.partner.slug]),
+            reverse("packs:list"),
+        ):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, url)
+            page = res.context["page"]
+            self.assertTrue(all(isinstance(c, PackCard) for c in page.object_list), url)
+
+        res = self.client.get(reverse("categoria_list", args=["cafes"]))
+        self.assertContains(res, "Abierto")
+        self.assertContains(res, "Cafe Uno")
@@ -46,7 +46,8 @@ class PacksPaginationTests(TestCase):
     def test_pagination_shape_and_size(self):
         self._create_packs(total=15, vigente=True)
         url = reverse("pack-list")
-        res = self.client.get(url)
+        # count exacto es opt-in (por defecto es estimado / null)
+        res = self.client.get(url + "?count=exact")
         self.assertEqual(res.status_code, 200)
         data = res.json()
         # pagination envelope
@@ -84,7 +85,7 @@ class PacksPaginationTests(TestCase):
         # 10 vigentes + 5 expirados
         self._create_packs(total=10, vigente=True)
         self._create_packs(total=5, vigente=False)
-        url = reverse("pack-list") + "?vigentes=1&ordering=precio_oferta"
+        url = reverse("pack-list") + "?vigentes=1&ordering=precio_oferta&count=exact"
         res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
         data = res.json()
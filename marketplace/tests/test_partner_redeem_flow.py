@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -82,3 +84,47 @@ class PartnerRedeemFlowTests(TestCase):
         self.assertEqual(res.status_code, 400)
         self.assertIn("franja", res.json()["detail"].lower())
 
+
+    def test_redeem_qr_single_round_trip(self):
+        token = signing.dumps({"order_id": self.order_id, "pack_id": self.pack.id})
+        self.client.login(username="own", password="pass123")
+        url = reverse("order-redeem-qr")
+        res = self.client.post(url, {"token": token}, format="json")
+        self.assertEqual(res.status_code, 200, res.content)
+        self.assertTrue(res.json()["ok"])
+        o = Order.objects.get(id=self.order_id)
+        self.assertEqual(o.estado, Order.Estado.RETIRADO)
+        self.assertIsNotNone(o.retirado_at)
+
+        again = self.client.post(url, {"token": token}, format="json")
+        self.assertEqual(again.status_code, 400)
+        self.assertIn("retirado", again.json()["detail"])
+
+    def test_redeem_qr_not_owner_and_invalid(self):
+        token = signing.dumps({"order_id": self.order_id, "pack_id": self.pack.id})
+        self.client.login(username="oth", password="pass123")
+        url = reverse("order-redeem-qr")
+        self.assertEqual(self.client.post(url, {"token": token}, format="json").status_code, 403)
+        self.assertEqual(self.client.post(url, {"token": "basura"}, format="json").status_code, 400)
+        self.assertEqual(Order.objects.get(id=self.order_id).estado, Order.Estado.PENDIENTE)
+
+    def test_redeem_qr_batch(self):
+        Pack.objects.filter(pk=self.pack.pk).update(stock=5)
+        others = []
+        for i in range(3):
+            buyer = User.objects.create_user(username=f"b{i}", password="pass123")
+            others.append(Order.objects.create(user=buyer, pack=self.pack, precio_pagado=500).id)
+        Order.objects.filter(pk=others[2]).update(estado=Order.Estado.CANCELADO)
+        tokens = [signing.dumps({"order_id": oid, "pack_id": self.pack.id}) for oid in [self.order_id] + others]
+        tokens += [str(others[0]), "basura"]
+
+        self.client.login(username="own", password="pass123")
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(reverse("order-redeem-qr"), {"tokens": tokens}, format="json")
+        self.assertEqual(res.status_code, 200, res.content)
+        data = res.json()
+        self.assertEqual(data["redeemed"], 3)
+        self.assertEqual([r["ok"] for r in data["results"]], [True, True, True, False, False, False])
+        self.assertEqual([r["status"] for r in data["results"][3:]], [400, 400, 400])
+        # Sobre órdenes: un UPDATE y un SELECT, sin importar cuántos códigos
+        self.assertEqual(sum(1 for q in ctx.captured_queries if "marketplace_order" in q["sql"]), 2)
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from marketplace.services.reminders import send_due_reminders
+
+User = get_user_model()
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("owner", password="pass")
+        partner = Partner.objects.create(owner=owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        pack = Pack.objects.create(
+            partner=partner, titulo="Medialunas", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=50,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(minutes=30),
+        )
+        self.orders = []
+        for i in range(7):
+            user = User.objects.create_user(f"u{i}", email=f"u{i}@example.com", password="pass")
+            self.orders.append(Order.objects.create(user=user, pack=pack, precio_pagado=500))
+        no_mail = User.objects.create_user("nomail", password="pass")
+        self.no_mail_order = Order.objects.create(user=no_mail, pack=pack, precio_pagado=500)
+
+    def test_sends_once_per_order(self):
+        self.assertEqual(send_due_reminders(chunk_size=3, workers=2), (7, 0))
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(f"u{i}@example.com" for i in range(7)))
+        self.assertFalse(Order.objects.filter(reminded_at__isnull=True).exists())
+
+        # Segunda corrida: nada nuevo
+        self.assertEqual(send_due_reminders(chunk_size=3, workers=2), (0, 0))
+        self.assertEqual(len(mail.outbox), 7)
+
+    def test_failed_batch_is_retried(self):
+        with patch("marketplace.services.reminders._send_batch", side_effect=OSError("smtp caído")):
+            self.assertEqual(send_due_reminders(workers=1), (0, 7))
+        self.assertEqual(Order.objects.filter(reminded_at__isnull=True).count(), 7)
+        self.assertEqual(send_due_reminders(), (7, 0))
+
+    def test_command(self):
+        call_command("send_reminders", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 7)
+        self.no_mail_order.refresh_from_db()
+        self.assertIsNotNone(self.no_mail_order.reminded_at)
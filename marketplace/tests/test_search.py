@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack
+from marketplace.services.search import PostgresSearchBackend, search_pack_ids, search_partner_ids
+
+User = get_user_model()
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("owner", password="pass")
+        self.panaderia = Partner.objects.create(owner=owner, categoria="panaderia", nombre="Panadería Ñandú", direccion="x")
+        self.cafe = Partner.objects.create(owner=owner, categoria="cafe", nombre="Café Central", direccion="y")
+        now = timezone.now()
+        kw = dict(etiqueta=Pack.Etiqueta.EXCEDENTE, precio_original=1000, precio_oferta=500, stock=3,
+                  pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2))
+        self.medialunas = Pack.objects.create(partner=self.panaderia, titulo="Medialunas y facturas", **kw)
+        self.brunch = Pack.objects.create(partner=self.cafe, titulo="Brunch con medialunas de panadería", **kw)
+        self.cookies = Pack.objects.create(partner=self.cafe, titulo="Box de cookies", **kw)
+
+    def _packs(self, q):
+        # La base de tests trae los packs demo de post_migrate: solo miramos los nuestros
+        mine = {self.medialunas.id, self.brunch.id, self.cookies.id}
+        return [i for i in search_pack_ids(q) if i in mine]
+
+    def _partners(self, q):
+        return [i for i in search_partner_ids(q) if i in (self.panaderia.id, self.cafe.id)]
+
+    def test_accent_insensitive_and_prefix(self):
+        self.assertIn(self.panaderia.id, self._partners("panaderia nandu"))
+        self.assertIn(self.cafe.id, self._partners("CAFE"))
+        self.assertEqual(set(self._packs("medial")), {self.medialunas.id, self.brunch.id})
+
+    def test_title_match_ranks_above_partner_name_match(self):
+        # "panaderia": título del brunch (peso A) vs solo nombre del comercio (peso B)
+        ids = self._packs("panadería")
+        self.assertEqual(ids[:2], [self.brunch.id, self.medialunas.id])
+
+    def test_incremental_reindex_on_save_and_delete(self):
+        self.cookies.titulo = "Budín de limón"
+        self.cookies.save()
+        self.assertEqual(self._packs("budin"), [self.cookies.id])
+        self.assertEqual(self._packs("cookies"), [])
+
+        self.cafe.nombre = "Tostadero Norte"
+        self.cafe.save()
+        self.assertEqual(set(self._packs("tostadero")), {self.brunch.id, self.cookies.id})
+
+        self.cookies.delete()
+        self.assertEqual(self._packs("budin"), [])
+
+    def test_stock_updates_skip_reindex(self):
+        # El UPDATE del pack + su fila en el registro de cambios; nada del índice
+        with self.assertNumQueries(2) as ctx:
+            self.cookies.save(update_fields=["stock"])
+        self.assertFalse([q for q in ctx.captured_queries if "_fts" in q["sql"]])
+
+    def test_search_view_orders_by_relevance(self):
+        res = self.client.get(reverse("search"), {"q": "panaderia"})
+        self.assertEqual(res.status_code, 200)
+        packs = [p.id for p in res.context["page_packs"].object_list]
+        self.assertLess(packs.index(self.brunch.id), packs.index(self.medialunas.id))
+        self.assertNotIn(self.cookies.id, packs)
+        self.assertIn(self.panaderia.id, [p.id for p in res.context["page_partners"].object_list])
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn(f"{Pack.objects.count()} packs", out.getvalue())
+        self.assertEqual(set(self._packs("medialunas")), {self.medialunas.id, self.brunch.id})
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector/pg_trgm solo en PostgreSQL")
+    def test_postgres_typo_falls_back_to_trigrams(self):
+        self.assertIn(self.panaderia.id, self._partners("panaderai"))
+
+
+class RecordingCursor:
+    def __init__(self, rows=()):
+        self.executed, self._rows = [], list(rows)
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self._rows.pop(0) if self._rows else []
+
+
+class PostgresSearchSqlTests(SimpleTestCase):
+    """El SQL del backend de PostgreSQL, sin base (los tests corren en SQLite)."""
+
+    def setUp(self):
+        self.backend = PostgresSearchBackend()
+
+    def test_install_creates_gin_indexes(self):
+        cursor = RecordingCursor()
+        self.backend.install(cursor)
+        sql = "\n".join(s for s, _ in cursor.executed)
+        self.assertIn("marketplace_unaccent(text)", sql)
+        for table in ("marketplace_pack_search", "marketplace_partner_search"):
+            self.assertIn(f"ON {table} USING GIN (document)", sql)
+            self.assertIn(f"ON {table} USING GIN (plain gin_trgm_ops)", sql)
+
+    def test_index_packs_weights_and_upsert(self):
+        cursor = RecordingCursor()
+        self.backend.index_packs(cursor, pack_ids=[3, 5])
+        (sql, params), = cursor.executed
+        for column, weight in (("p.titulo", "A"), ("pa.nombre", "B"), ("replace(p.etiqueta, '_', ' ')", "C")):
+            self.assertIn(f"marketplace_unaccent(coalesce({column}, ''))), '{weight}')", sql)
+        self.assertIn("WHERE p.id IN (%s, %s)", sql)
+        self.assertIn("ON CONFLICT (pack_id) DO UPDATE", sql)
+        self.assertEqual(params, [3, 5])
+
+    def test_ranked_query_and_trigram_fallback(self):
+        cursor = RecordingCursor(rows=[[(7,), (2,)]])
+        self.assertEqual(self.backend.pack_ids(cursor, "Medialunas Fáct", limit=10), [7, 2])
+        (sql, params), = cursor.executed
+        self.assertIn("to_tsquery('spanish', %s)", sql)
+        self.assertEqual(params, ["medialunas:* & fact:*", 10])
+
+        # Sin matches del tsvector: similitud por trigramas (typos)
+        cursor = RecordingCursor(rows=[[], [(4,)]])
+        self.assertEqual(self.backend.partner_ids(cursor, "panaderai", limit=5), [4])
+        sql, params = cursor.executed[1]
+        self.assertIn("WHERE %s <%% plain", sql)
+        self.assertEqual(params, ["panaderai", "panaderai", 5])
+
+    def test_no_tokens_no_query(self):
+        cursor = RecordingCursor()
+        self.assertEqual(self.backend.pack_ids(cursor, "¿?"), [])
+        self.assertEqual(cursor.executed, [])
@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from marketplace.utils.images import StockImageIndex, stock_index, stock_image_url
+
+
+User = get_user_model()
+
+PLAIN_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=PLAIN_STORAGES)
+class StockImageIndexTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        root = Path(self.tmp) / "static" / "img" / "stock" / "cafes"
+        root.mkdir(parents=True)
+        for name in ("b.jpg", "a.png", "notes.txt"):
+            (root / name).write_bytes(b"x")
+        self.root = root
+
+    def _index(self):
+        idx = StockImageIndex()
+        idx.build()
+        return idx
+
+    def test_resolves_supported_files_only_and_is_stable(self):
+        with override_settings(BASE_DIR=self.tmp, STOCK_IMAGE_INDEX_CHECK_SECONDS=3600):
+            idx = self._index()
+            url = idx.resolve("cafe", "pack-1")
+            self.assertRegex(url, r"img/stock/cafes/(a\.png|b\.jpg)$")
+            self.assertEqual(idx.resolve("cafes", "pack-1"), url)
+            self.assertEqual(idx.stats()["files"], 2)
+
+    def test_memo_counts_hits_and_misses(self):
+        with override_settings(BASE_DIR=self.tmp, STOCK_IMAGE_INDEX_CHECK_SECONDS=3600):
+            idx = self._index()
+            idx.resolve("cafe", "k")
+            idx.resolve("cafe", "k")
+            idx.resolve("cafe", "otra")
+            stats = idx.stats()
+            self.assertEqual(stats["misses"], 2)
+            self.assertEqual(stats["hits"], 1)
+
+    def test_unknown_folder_falls_back_to_placeholder(self):
+        with override_settings(BASE_DIR=self.tmp, STOCK_IMAGE_INDEX_CHECK_SECONDS=3600):
+            idx = self._index()
+            self.assertTrue(idx.resolve("pescaderia", "x").endswith("placeholder-pack.svg"))
+
+    def test_rebuilds_when_folder_mtime_changes(self):
+        with override_settings(BASE_DIR=self.tmp, STOCK_IMAGE_INDEX_CHECK_SECONDS=0):
+            idx = self._index()
+            self.assertEqual(idx.stats()["files"], 2)
+            (self.root / "c.webp").write_bytes(b"x")
+            # Forzar un mtime distinto aunque el filesystem tenga baja resolución
+            st = os.stat(self.root)
+            os.utime(self.root, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+            idx.resolve("cafe", "k")
+            self.assertEqual(idx.stats()["builds"], 2)
+            self.assertEqual(idx.stats()["files"], 3)
+
+    def test_missing_manifest_is_logged_and_retried(self):
+        static_root = Path(self.tmp) / "collected"
+        static_root.mkdir()
+        storages = {**PLAIN_STORAGES, "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"}}
+        with override_settings(BASE_DIR=self.tmp, STATIC_ROOT=static_root, STORAGES=storages,
+                               STOCK_IMAGE_INDEX_CHECK_SECONDS=0):
+            with self.assertLogs("marketplace.utils.images", "WARNING") as logs:
+                idx = self._index()
+            self.assertIn("2 imagenes sin entrada", logs.output[0])
+            self.assertEqual(idx.stats()["files"], 0)
+            self.assertTrue(idx.is_stale())
+
+            # collectstatic escribe el manifest: la próxima consulta reconstruye
+            paths = {f"img/stock/cafes/{n}": f"img/stock/cafes/{n}".replace(".", ".abc123.") for n in ("a.png", "b.jpg")}
+            (static_root / "staticfiles.json").write_text(json.dumps({"paths": paths, "version": "1.1"}))
+            self.assertRegex(idx.resolve("cafe", "k"), r"\.abc123\.(png|jpg)$")
+            self.assertEqual(idx.stats()["files"], 2)
+            self.assertFalse(idx.is_stale())
+
+
+class StockImageStatsEndpointTests(TestCase):
+    def test_requires_staff(self):
+        res = self.client.get(reverse("stock_images_stats"))
+        self.assertEqual(res.status_code, 302)
+
+    def test_staff_sees_counters(self):
+        User.objects.create_user("admin", password="pass", is_staff=True)
+        self.client.login(username="admin", password="pass")
+        stock_index.reset_stats()
+        stock_image_url("cafes", "home-cafes")
+        stock_image_url("cafes", "home-cafes")
+        data = self.client.get(reverse("stock_images_stats")).json()
+        self.assertGreaterEqual(data["hits"], 1)
+        for k in ("hits", "misses", "builds", "files"):
+            self.assertIn(k, data)
+
+    def test_reset_is_post_only(self):
+        User.objects.create_user("admin", password="pass", is_staff=True)
+        self.client.login(username="admin", password="pass")
+        stock_image_url("cafes", "home-cafes")
+        self.client.get(reverse("stock_images_stats"), {"reset": "1"})
+        self.assertGreaterEqual(stock_index.stats()["hits"] + stock_index.stats()["misses"], 1)
+        res = self.client.post(reverse("stock_images_stats"))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(stock_index.stats()["hits"] + stock_index.stats()["misses"], 0)
@@ -0,0 +1,173 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import CatalogChange, Pack, Partner
+from marketplace.services.stock_stream import StockBroker, broker, parse_pack_ids
+
+User = get_user_model()
+
+
+@override_settings(STOCK_STREAM_POLL_INTERVAL=60, STOCK_STREAM_HEARTBEAT=1)
+class StockStreamTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user("owner", password="pass")
+        partner = Partner.objects.create(owner=owner, categoria="cafe", nombre="Cafe", direccion="x")
+        now = timezone.now()
+        self.packs = [
+            Pack.objects.create(
+                partner=partner, titulo=f"Pack {i}", etiqueta=Pack.Etiqueta.EXCEDENTE,
+                precio_original=1000, precio_oferta=500, stock=5,
+                pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+            )
+            for i in range(2)
+        ]
+        # Cerrar conexiones dentro de la transacción del test la rompería
+        patcher = mock.patch("marketplace.services.stock_stream.close_old_connections")
+        self.close_old_connections = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parse_pack_ids(self):
+        self.assertEqual(parse_pack_ids("3, 1,x,3,,2"), [3, 1, 2])
+        with override_settings(STOCK_STREAM_MAX_PACKS=2):
+            self.assertEqual(parse_pack_ids("1,2,3"), [1, 2])
+
+    async def test_fan_out_only_to_watchers(self):
+        b = StockBroker()
+        a, c = self.packs[0].id, self.packs[1].id
+        sub_a, sub_both = b.subscribe([a]), b.subscribe([a, c])
+        try:
+            self.assertEqual(b.publish({c: 3}), 1)
+            self.assertEqual(await sub_both.next(1), {c: 3})
+            self.assertEqual(await sub_a.next(0.05), {})
+            # Repetidos no se reenvían; ráfagas se coalescen al último valor
+            b.publish({c: 3})
+            b.publish({a: 4})
+            b.publish({a: 2})
+            self.assertEqual(await sub_both.next(1), {a: 2})
+            self.assertEqual(await sub_a.next(1), {a: 2})
+        finally:
+            b.unsubscribe(sub_a)
+            b.unsubscribe(sub_both)
+            b._poller.cancel()
+        self.assertEqual(b.watching(), set())
+
+    def _sell(self, pack_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            Pack.adjust_stock(pack_id, -1)
+
+    async def test_local_stock_change_is_pushed_after_commit(self):
+        pack_id = self.packs[0].id
+        sub = broker.subscribe([pack_id])
+        try:
+            await sync_to_async(self._sell)(pack_id)
+            self.assertEqual(await sub.next(1), {pack_id: 4})
+        finally:
+            broker.unsubscribe(sub)
+            broker._poller.cancel()
+            broker.version = None
+
+    def _write_elsewhere(self, pack_id):
+        # Escritura de otro proceso: no llega la señal, solo queda en el registro
+        Pack.objects.filter(pk=pack_id).update(stock=2)
+        CatalogChange.objects.create(tipo=CatalogChange.Tipo.STOCK, pack_id=pack_id, delta=-3)
+
+    async def test_poller_reads_change_log(self):
+        b = StockBroker()
+        pack_id = self.packs[1].id
+        sub = b.subscribe([pack_id])
+        try:
+            await sync_to_async(b.poll_once)()
+            await sync_to_async(self._write_elsewhere)(pack_id)
+            await sync_to_async(b.poll_once)()
+            self.assertEqual(await sub.next(1), {pack_id: 2})
+        finally:
+            b.unsubscribe(sub)
+            b._poller.cancel()
+
+    def _commit_with_id(self, pack_id, stock, change_id):
+        # Como _write_elsewhere, pero con el id que la transacción tomó al insertar
+        Pack.objects.filter(pk=pack_id).update(stock=stock)
+        CatalogChange.objects.create(id=change_id, tipo=CatalogChange.Tipo.STOCK, pack_id=pack_id, delta=stock - 5)
+
+    async def test_poller_sees_lower_id_committed_late(self):
+        b = StockBroker()
+        early, late = self.packs[0].id, self.packs[1].id
+        sub = b.subscribe([early, late])
+        try:
+            await sync_to_async(b.poll_once)()
+            start = b.version
+            await sync_to_async(self._commit_with_id)(early, 2, start + 5)
+            await sync_to_async(b.poll_once)()
+            self.assertEqual(await sub.next(1), {early: 2})
+            self.assertEqual(b.version, start + 5)
+
+            # Una transacción con id menor commitea después
+            await sync_to_async(self._commit_with_id)(late, 1, start + 2)
+            await sync_to_async(b.poll_once)()
+            self.assertEqual(await sub.next(1), {late: 1})
+            # Releer la ventana no vuelve a aplicar lo ya visto
+            self.assertLessEqual({start + 2, start + 5}, b._seen)
+            await sync_to_async(b.poll_once)()
+            self.assertEqual(await sub.next(0.05), {})
+        finally:
+            b.unsubscribe(sub)
+            b._poller.cancel()
+
+    @override_settings(STOCK_STREAM_MAX_SECONDS=1.5)
+    async def test_sse_endpoint_streams_snapshot_and_changes(self):
+        pack_id = self.packs[0].id
+        res = await self.async_client.get(reverse("packs:stock_stream"), {"ids": f"{pack_id},999999"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        chunks = aiter(res.streaming_content)
+        try:
+            self.assertTrue((await anext(chunks)).startswith(b"retry:"))
+            snapshot = (await anext(chunks)).decode()
+            self.assertIn("event: stock", snapshot)
+            data = json.loads(snapshot.split("data: ", 1)[1])
+            self.assertEqual(data, {str(pack_id): 5, "999999": 0})
+            broker.publish({pack_id: 1})
+            self.assertIn(f'"{pack_id}":1'.encode(), await anext(chunks))
+            self.assertEqual(await anext(chunks), b": ping\n\n")
+            # Al llegar a STOCK_STREAM_MAX_SECONDS cierra y se desuscribe
+            rest = [c async for c in chunks]
+            self.assertTrue(all(c == b": ping\n\n" for c in rest))
+        finally:
+            broker._poller.cancel()
+            broker.version = None
+        self.assertEqual(broker.watching(), set())
+
+    def test_poller_closes_connections_around_each_poll(self):
+        b = StockBroker()
+        with mock.patch.object(b, "poll_once", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                b._poll_fresh()
+        # Antes y después, aunque la lectura falle
+        self.assertEqual(self.close_old_connections.call_count, 2)
+
+    def test_pages_use_stream_service_url(self):
+        url = reverse("packs:detail", args=[self.packs[0].id])
+        self.assertContains(self.client.get(url), f"new EventSource('{reverse('packs:stock_stream')}?ids=")
+        with override_settings(STOCK_STREAM_URL="https://stream.example.com/packs/stock/stream/"):
+            res = self.client.get(url)
+        self.assertContains(res, "new EventSource('https://stream.example.com/packs/stock/stream/?ids=")
+
+    def test_deploy_check_warns_without_stream_url(self):
+        from marketplace.checks import stock_stream_url_check
+
+        with override_settings(STOCK_STREAM_URL=""):
+            self.assertEqual([w.id for w in stock_stream_url_check()], ["marketplace.W001"])
+        with override_settings(STOCK_STREAM_URL="https://stream.example.com/packs/stock/stream/"):
+            self.assertEqual(stock_stream_url_check(), [])
+
+    def test_wsgi_and_bad_requests(self):
+        url = reverse("packs:stock_stream")
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"ids": self.packs[0].id}).status_code, 204)
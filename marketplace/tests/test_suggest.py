@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack
+from marketplace.services.suggest import PACK, SuggestIndex, suggest_index
+
+User = get_user_model()
+
+
+class SuggestIndexTests(TestCase):
+    def setUp(self):
+        suggest_index.reset()
+        self.addCleanup(suggest_index.reset)
+        Pack.objects.all().delete()  # packs demo de post_migrate
+        owner = User.objects.create_user("owner", password="pass")
+        self.partner = Partner.objects.create(owner=owner, categoria="panaderia", nombre="Panadería Zorzal",
+                                              direccion="x", slug="zorzal")
+        now = timezone.now()
+        self.kw = dict(partner=self.partner, etiqueta=Pack.Etiqueta.EXCEDENTE, precio_original=1000,
+                       precio_oferta=500, pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2))
+        self.live = Pack.objects.create(titulo="Zapallitos rellenos", stock=2, **self.kw)
+        self.sold_out = Pack.objects.create(titulo="Zapallo asado", stock=0, **self.kw)
+
+    def _labels(self, q):
+        return [r["label"] for r in suggest_index.suggest(q)]
+
+    def test_prefix_match_accents_and_live_only(self):
+        self.assertEqual(self._labels("zapal"), ["Zapallitos rellenos"])
+        self.assertEqual(self._labels("zorz"), ["Panadería Zorzal"])
+        self.assertEqual(self._labels("panaderia zor"), ["Panadería Zorzal"])
+        self.assertEqual(self._labels("zapal relle"), ["Zapallitos rellenos"])
+        self.assertEqual(self._labels("zapal xyz"), [])
+
+    def test_answers_without_queries_once_built(self):
+        suggest_index.suggest("zap")
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse("search_suggest"), {"q": "zapal"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["results"], [
+            {"type": "pack", "id": self.live.id, "label": "Zapallitos rellenos",
+             "url": reverse("packs:detail", args=[self.live.id])},
+        ])
+
+    def test_incremental_updates_from_signals(self):
+        suggest_index.suggest("zap")
+        builds = suggest_index.builds
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pack.adjust_stock(self.sold_out.id, +3)
+        self.assertIn("Zapallo asado", self._labels("zapallo"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Pack.adjust_stock(self.live.id, -2)
+        self.assertNotIn("Zapallitos rellenos", self._labels("zapal"))
+
+        self.sold_out.titulo = "Calabaza asada"
+        self.sold_out.stock = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sold_out.save()
+        self.assertEqual(self._labels("calab"), ["Calabaza asada"])
+        self.assertEqual(self._labels("zapallo"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pack.objects.create(titulo="Zanahorias glaseadas", stock=1, **self.kw)
+        self.assertEqual(self._labels("zanah"), ["Zanahorias glaseadas"])
+
+        self.partner.nombre = "Panadería Hornero"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.partner.save()
+        self.assertEqual(self._labels("horn"), ["Panadería Hornero"])
+        self.assertEqual(self._labels("zorz"), [])
+        self.assertEqual(suggest_index.builds, builds)
+
+    def test_rolled_back_changes_never_reach_the_index(self):
+        suggest_index.suggest("zap")
+        try:
+            with transaction.atomic():
+                Pack.adjust_stock(self.sold_out.id, +3)
+                Pack.objects.create(titulo="Zanahorias glaseadas", stock=1, **self.kw)
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+        self.assertEqual(self._labels("zapallo"), [])
+        self.assertEqual(self._labels("zanah"), [])
+
+    def test_expired_pack_is_filtered_at_query_time(self):
+        suggest_index.suggest("zap")
+        entry = suggest_index._entries[(PACK, self.live.id)]
+        entry["pickup_end"] = timezone.now() - timedelta(minutes=1)
+        self.assertEqual(self._labels("zapal"), [])
+
+    def test_stale_index_rebuilds_once_in_background(self):
+        suggest_index.suggest("zap")
+        builds = suggest_index.builds
+        suggest_index._built_at -= 10_000
+        with mock.patch("marketplace.services.suggest.threading.Thread") as thread:
+            # Mientras se reconstruye, las consultas siguen con el índice anterior
+            self.assertEqual(self._labels("zapal"), ["Zapallitos rellenos"])
+            self.assertEqual(self._labels("zorz"), ["Panadería Zorzal"])
+        thread.assert_called_once()
+        self.assertEqual(suggest_index.builds, builds)
+        with mock.patch("marketplace.services.suggest.close_old_connections"):
+            thread.call_args.kwargs["target"]()
+        self.assertEqual(suggest_index.builds, builds + 1)
+        self.assertFalse(suggest_index._build_lock.locked())
+
+    def test_updates_during_rebuild_are_not_lost(self):
+        suggest_index.suggest("zap")
+        pack_entry, fired = SuggestIndex._pack_entry, []
+
+        def scan_entry(*args):
+            if not fired:
+                # Un on_commit (baja del pack) llega en medio de la lectura
+                fired.append(True)
+                suggest_index.remove_pack(self.live.id)
+            return pack_entry(*args)
+
+        with mock.patch.object(SuggestIndex, "_pack_entry", staticmethod(scan_entry)):
+            suggest_index.build()
+        self.assertTrue(fired)
+        self.assertEqual(self._labels("zapal"), [])
+        self.assertIsNone(suggest_index._journal)
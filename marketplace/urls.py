@@ -1,7 +1,7 @@
 # marketplace/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PartnerViewSet, PackViewSet, OrderViewSet, MisReservasView,OrderDetailView, order_qr_view, partner_redeem_page, CartViewSet, cart_page, merchant_detail, my_orders, partner_detail, categoria_list
+from .views import PartnerViewSet, PackViewSet, OrderViewSet, MisReservasView,OrderDetailView, order_qr_view, partner_redeem_page, CartViewSet, cart_page, merchant_detail, my_orders, partner_detail, categoria_list, stock_images_stats, search_suggest
 
 
 router = DefaultRouter()
@@ -21,5 +21,8 @@ urlpatterns = [
     path('categoria/<slug:slug>/', categoria_list, name='categoria_list'),
     path('mis-reservas/<int:pk>/', OrderDetailView.as_view(), name='order_detail'),   
     path('mis-reservas/<int:pk>/qr.png', order_qr_view, name='order_qr'),   
+    path('mis-reservas/<int:pk>/qr.svg', order_qr_view, {"fmt": "svg"}, name='order_qr_svg'),
     path('partner/redeem/', partner_redeem_page, name='partner_redeem'),
+    path('api/stock-images/stats/', stock_images_stats, name='stock_images_stats'),
+    path('api/search/suggest/', search_suggest, name='search_suggest'),
 ]
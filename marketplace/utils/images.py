@@ -1,5 +1,8 @@
 import hashlib
+import logging
 import os
+import threading
+import time
 from pathlib import Path
 from django.templatetags.static import static
 from django.conf import settings
@@ -26,54 +29,195 @@ CATEGORY_DIR_MAP = {
     "otros": "restaurantes",
 }
 
+STOCK_EXTS = ("jpg", "jpeg", "png", "webp")
+PLACEHOLDER = "img/placeholder-pack.svg"
+
+logger = logging.getLogger(__name__)
+
+
 def _hash_to_index(text, max_n):
     h = hashlib.md5((text or "x").encode("utf-8")).hexdigest()
     return (int(h[:8], 16) % max_n) if max_n > 0 else 0
 
-def _static_exists(rel_path: str) -> bool:
+
+def _stock_root() -> Path:
+    base = getattr(settings, "STOCK_IMAGE_ROOT", "img/stock")
+    return Path(getattr(settings, "BASE_DIR", os.getcwd())) / "static" / base
+
+
+def _mtime(path: Path):
     try:
-        root = Path(getattr(settings, "BASE_DIR", os.getcwd())) / "static"
-        return (root / Path(rel_path)).exists()
-    except Exception:
-        return False
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _manifest_path():
+    """
+    staticfiles.json del storage con manifest (None si el storage no usa uno).
+    Lo relee si cambió desde que el storage lo cargó (collectstatic posterior).
+    """
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    name = getattr(staticfiles_storage, "manifest_name", None)
+    if not name:
+        return None
+    try:
+        path = Path(staticfiles_storage.path(name))
+    except NotImplementedError:
+        return None
+    mtime = _mtime(path)
+    if mtime is not None and getattr(staticfiles_storage, "_stock_index_manifest_mtime", None) != mtime:
+        staticfiles_storage.hashed_files, staticfiles_storage.manifest_hash = staticfiles_storage.load_manifest()
+        staticfiles_storage._stock_index_manifest_mtime = mtime
+    return path
+
+
+class StockImageIndex:
+    """
+    Indice en memoria de static/<STOCK_IMAGE_ROOT>/<folder>.
+
+    Se construye una sola vez (AppConfig.ready) y guarda, por carpeta, la lista
+    ordenada de archivos soportados con su URL estatica ya resuelta. Resolver
+    (categoria, key) es un lookup de dict + un hash, sin syscalls.
+
+    La invalidacion compara el mtime de la raiz, de cada carpeta y del manifest
+    de staticfiles, como mucho una vez cada STOCK_IMAGE_INDEX_CHECK_SECONDS
+    (0 = revisar en cada llamada). Si faltaron entradas en el manifest el indice
+    queda incompleto y se reconstruye en la proxima revision.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._folders = {}   # folder -> tuple de URLs (orden alfabetico de archivo)
+        self._mtimes = {}    # path -> mtime_ns al construir
+        self._memo = {}      # (folder, key) -> url
+        self._built = False
+        self._incomplete = False  # faltaron archivos en el manifest
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    # --- construccion / invalidacion -------------------------------------
+    def build(self):
+        root = _stock_root()
+        base = getattr(settings, "STOCK_IMAGE_ROOT", "img/stock")
+        folders = {}
+        mtimes = {str(root): _mtime(root)}
+        manifest = _manifest_path()
+        if manifest is not None:
+            # collectstatic reescribe el manifest: un indice viejo se entera
+            mtimes[str(manifest)] = _mtime(manifest)
+        missing = []
+        try:
+            entries = sorted(p for p in root.iterdir() if p.is_dir()) if root.is_dir() else []
+        except OSError:
+            entries = []
+        for folder in entries:
+            mtimes[str(folder)] = _mtime(folder)
+            try:
+                files = sorted(p for p in folder.iterdir() if p.suffix.lower().lstrip(".") in STOCK_EXTS)
+            except OSError:
+                files = []
+            urls = []
+            for p in files:
+                try:
+                    urls.append(static(f"{base}/{folder.name}/{p.name}"))
+                except ValueError:
+                    # Falta la entrada en el manifest de staticfiles (sin collectstatic o viejo)
+                    missing.append(f"{folder.name}/{p.name}")
+            folders[folder.name] = tuple(urls)
+        if missing:
+            logger.warning("stock_index: %s imagenes sin entrada en el manifest de staticfiles (p.ej. %s)",
+                           len(missing), missing[0])
+        with self._lock:
+            self._folders = folders
+            self._mtimes = mtimes
+            self._memo = {}
+            self._incomplete = bool(missing)
+            self._built = True
+            self._checked_at = time.monotonic()
+            self.builds += 1
+
+    def is_stale(self) -> bool:
+        return self._incomplete or any(_mtime(Path(p)) != m for p, m in self._mtimes.items())
+
+    def _ensure_fresh(self):
+        if not self._built:
+            self.build()
+            return
+        interval = getattr(settings, "STOCK_IMAGE_INDEX_CHECK_SECONDS", 5)
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return
+        self._checked_at = now
+        if self.is_stale():
+            self.build()
+
+    # --- API --------------------------------------------------------------
+    def folder_for(self, category_slug) -> str:
+        slug = (category_slug or "").lower()
+        return CATEGORY_DIR_MAP.get(slug, slug or "otros")
+
+    def resolve(self, category_slug, key_text="") -> str:
+        self._ensure_fresh()
+        folder = self.folder_for(category_slug)
+        memo_key = (folder, key_text or "")
+        url = self._memo.get(memo_key)
+        if url is not None:
+            self.hits += 1
+            return url
+        self.misses += 1
+        urls = self._folders.get(folder) or ()
+        if urls:
+            url = urls[_hash_to_index(key_text or folder, len(urls))]
+        else:
+            url = static(PLACEHOLDER)
+        if len(self._memo) >= getattr(settings, "STOCK_IMAGE_MEMO_MAX", 50000):
+            self._memo = {}
+        self._memo[memo_key] = url
+        return url
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "builds": self.builds,
+            "folders": len(self._folders),
+            "files": sum(len(v) for v in self._folders.values()),
+            "memo_size": len(self._memo),
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+stock_index = StockImageIndex()
 
 
 def stock_image_url(category_slug, key_text=""):
-    base = getattr(settings, "STOCK_IMAGE_ROOT", "img/stock")
-    slug = (category_slug or "").lower()
-    folder = CATEGORY_DIR_MAP.get(slug, slug or "otros")
-    count_guess = 10
-    idx = _hash_to_index(key_text or folder, count_guess) + 1
+    """URL de una imagen de stock estable para (categoria, key). Ver StockImageIndex."""
+    return stock_index.resolve(category_slug, key_text)
 
-    exts = ("jpg", "jpeg", "png", "webp")
 
-    # 0) Si hay archivos en el folder, elegir uno por hash para tener variedad
-    try:
-        root = Path(getattr(settings, "BASE_DIR", os.getcwd())) / "static" / base / folder
-        if root.exists() and root.is_dir():
-            files = sorted([p for p in root.iterdir() if p.suffix.lower().lstrip(".") in exts])
-            if files:
-                idx_files = _hash_to_index(key_text or folder, len(files))
-                rel = f"{base}/{folder}/{files[idx_files].name}"
-                return static(rel)
-    except Exception:
-        pass
-
-    # 1) Try hashed index with common extensions
-    for ext in exts:
-        candidate = f"{base}/{folder}/{idx}.{ext}"
-        if _static_exists(candidate):
-            return static(candidate)
-
-    # 2) Fallback: scan 1..count_guess for any available ext
-    for j in range(1, count_guess + 1):
-        for ext in exts:
-            candidate = f"{base}/{folder}/{j}.{ext}"
-            if _static_exists(candidate):
-                return static(candidate)
-
-    # 2b) No numeric files: pick any file with a supported extension from the folder
-    # (ya cubierto por el paso 0)
-
-    # 3) Ultimate fallback: placeholder
-    return static("img/placeholder-pack.svg")
+def stock_image_stats():
+    return stock_index.stats()
+
+
+def media_or_stock_url(imagen_name, imagen_presente, storage, category_slug, key_text):
+    """
+    Regla común de Pack/Partner.image_or_stock_url y de las pack cards:
+    media real si el marcador dice que existe, si no imagen de stock.
+    """
+    if getattr(settings, "USE_STOCK_IMAGES_FORCE_STOCK", False):
+        return stock_image_url(category_slug, key_text)
+    if imagen_presente and imagen_name:
+        try:
+            return storage.url(imagen_name)
+        except Exception:
+            pass
+    if getattr(settings, "USE_STOCK_IMAGES_FOR_EMPTY", True):
+        return stock_image_url(category_slug, key_text)
+    return ""
@@ -1,8 +1,9 @@
 ﻿from rest_framework import viewsets, permissions, decorators, response, status, filters
 from .models import Partner, Pack, Order
 from .serializers import PartnerSerializer, PackSerializer, OrderSerializer
-from .models_cart import Cart, CartItem
+from .models_cart import Cart, CartItem, CartSnapshot
 from .permissions import IsPartner
+from .pagination import PackCursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from rest_framework.decorators import action
@@ -17,24 +18,33 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.db.models import F
 from django.views.generic import DetailView
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, JsonResponse
 from django.core import signing
-from io import BytesIO
-import qrcode
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.urls import reverse
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q, Max
+from django.contrib.admin.views.decorators import staff_member_required
 from django.http import Http404
 from django.db.models import F, Count
-from marketplace.services.reminders import pending_orders_expiring
+from marketplace.services.reminders import is_expiring
+from marketplace.services.cards import pack_cards_page
+from marketplace.services.keyset import KeysetPaginator, cards_fragment
+from marketplace.services import inventory
+from marketplace.services.catalog_cache import catalog_http_cache
+from marketplace.services import qr as qr_service
+from marketplace.services import redeem as redeem_service
+from marketplace.services.suggest import suggest_index
+from marketplace.utils.images import stock_index, stock_image_stats
 
 class PartnerViewSet(viewsets.ModelViewSet):
     queryset = Partner.objects.all()
     serializer_class = PartnerSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+# list/retrieve anónimos con ETag y Cache-Control público (POST/PUT pasan de largo)
+@method_decorator(catalog_http_cache, name="dispatch")
 class PackViewSet(viewsets.ModelViewSet):
     queryset = Pack.objects.select_related("partner").all()
     serializer_class = PackSerializer
@@ -43,6 +53,7 @@ class PackViewSet(viewsets.ModelViewSet):
     search_fields = ["titulo", "etiqueta", "partner__nombre"]
     ordering_fields = ["precio_oferta", "creado_at"]
     filterset_fields = ["etiqueta", "partner"]
+    pagination_class = PackCursorPagination
 
     def get_queryset(self):
         qs = Pack.objects.select_related("partner").order_by("-creado_at")
@@ -54,44 +65,18 @@ class PackViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def reservar(self, request, pk=None):
-        user = request.user
-        now = timezone.now()
-
-        with transaction.atomic():
-            # Lock de fila para evitar reservas simultÃ¡neas
-            pack = Pack.objects.select_for_update().get(pk=pk)
-
-            # Ventana de retiro y disponibilidad
-            if pack.stock <= 0:
-                return Response({"detail": "Sin stock disponible."}, status=status.HTTP_409_CONFLICT)
-           # Permitimos reservar antes; solo bloqueamos si ya pasÃ³ la ventana
-            if now > pack.pickup_end:
-                return Response({"detail": "La franja de retiro ya expirÃ³."}, status=status.HTTP_409_CONFLICT)
-
-
-            # Evitar duplicadas
-            if Order.objects.filter(user=user, pack=pack, estado__in=[Order.Estado.PENDIENTE, Order.Estado.PAGADO]).exists():
-                return Response({"detail": "Ya reservaste este pack."}, status=status.HTTP_409_CONFLICT)
-
-            # Crear la orden (Order.save() validarÃ¡ y descontarÃ¡ stock atÃ³micamente)
-            try:
-                order = Order.objects.create(
-                    user=user,
-                    pack=pack,
-                    precio_pagado=pack.precio_oferta,
-                    estado=Order.Estado.PENDIENTE,
-                )
-            except ValidationError as e:
-                # Si fallan las validaciones de clean() (p.ej. stock/ventana), devolver 409/400
-                return Response({"detail": e.message}, status=status.HTTP_409_CONFLICT)
-
-            # Refrescar pack para conocer el stock actualizado
-            pack.refresh_from_db(fields=["stock"])
-
-            return Response(
-                {"detail": "Pack reservado âœ…", "order_id": order.id, "nuevo_stock": pack.stock},
-                status=status.HTTP_201_CREATED,
-            )
+        pack = get_object_or_404(Pack, pk=pk)
+        # Sin lock de fila: el stock se toma con un UPDATE condicional (services.inventory)
+        try:
+            order = inventory.reserve(request.user, pack)
+        except ValidationError as e:
+            return Response({"detail": e.message}, status=status.HTTP_409_CONFLICT)
+
+        nuevo_stock = Pack.objects.filter(pk=pack.pk).values_list("stock", flat=True).first()
+        return Response(
+            {"detail": "Pack reservado âœ…", "order_id": order.id, "nuevo_stock": nuevo_stock},
+            status=status.HTTP_201_CREATED,
+        )
 
 
 class OrderViewSet(viewsets.ModelViewSet):
@@ -148,7 +133,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             return response.Response({"detail": f"No se puede canjear una orden en estado {order.estado}."}, status=status.HTTP_400_BAD_REQUEST)
 
         order.estado = Order.Estado.RETIRADO
-        order.save(update_fields=["estado"])
+        order.retirado_at = now
+        order.save(update_fields=["estado", "retirado_at"])
         return response.Response({"detail": "Orden marcada como RETIRADA âœ…"}, status=status.HTTP_200_OK)
 
     @decorators.action(detail=False, methods=["post"], url_path="verify-qr", permission_classes=[permissions.IsAuthenticated])
@@ -173,6 +159,31 @@ class OrderViewSet(viewsets.ModelViewSet):
             "partner_nombre": order.pack.partner.nombre,
         }
         return response.Response(data, status=status.HTTP_200_OK)
+
+    @decorators.action(detail=False, methods=["post"], url_path="redeem-qr", permission_classes=[permissions.IsAuthenticated])
+    def redeem_qr(self, request):
+        """
+        Verifica y canjea en un solo request (services.redeem).
+        {"token": "..."} responde con el status del resultado; {"tokens": [...]}
+        canjea en lote y devuelve un resultado por código.
+        """
+        tokens = request.data.get("tokens")
+        if tokens is None:
+            token = request.data.get("token")
+            if not token:
+                return response.Response({"detail": "Falta token."}, status=status.HTTP_400_BAD_REQUEST)
+            result = redeem_service.redeem_codes(request.user, [token])[0]
+            return response.Response(result, status=result["status"])
+
+        if not isinstance(tokens, list) or not tokens:
+            return response.Response({"detail": "tokens debe ser una lista."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(tokens) > redeem_service.MAX_BATCH:
+            return response.Response({"detail": f"Máximo {redeem_service.MAX_BATCH} códigos por lote."},
+                                     status=status.HTTP_400_BAD_REQUEST)
+        results = redeem_service.redeem_codes(request.user, tokens)
+        return response.Response(
+            {"redeemed": sum(r["ok"] for r in results), "results": results}, status=status.HTTP_200_OK,
+        )
     
     @action(
         detail=True,
@@ -194,11 +205,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             return response.Response({"detail": "La franja ya expirÃ³, no se puede cancelar."}, status=status.HTTP_409_CONFLICT)
 
         with transaction.atomic():
-            # Cambiar estado
-            order.estado = Order.Estado.CANCELADO
-            order.save(update_fields=["estado"])
-            # Devolver stock
-            type(order.pack).objects.filter(pk=order.pack_id).update(stock=F("stock") + 1)
+            # Cambiar estado y devolver stock
+            order.cancel()
 
         return response.Response({"detail": "Orden cancelada y stock devuelto âœ…"}, status=status.HTTP_200_OK)
     
@@ -230,36 +238,21 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
 
     def get_queryset(self):
         # Solo dejo ver Ã³rdenes del usuario autenticado
+        # Orden + pack + partner en un JOIN y el último pago prefetcheado: 2 queries
+        from payments.models import latest_payment_prefetch
         return (Order.objects
                 .select_related("pack", "pack__partner")
+                .prefetch_related(latest_payment_prefetch())
                 .filter(user=self.request.user))
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         from_q = (self.request.GET.get("from") or "").lower()
         ctx["from_cart"] = from_q == "cart"
-        try:
-            from payments.models import Payment
-            ctx["payment_summary"] = Payment.summary_for_order(self.object)
-        except Exception:
-            ctx["payment_summary"] = {
-                "exists": False,
-                "provider": None,
-                "status": None,
-                "preference_id": None,
-                "payment_id": None,
-                "paid_at": None,
-                "created_at": None,
-            }
-        # Reminder banner: show if pending and expiring in window
-        try:
-            o = self.object
-            is_exp = False
-            if o.estado == "pendiente" and self.request.user.is_authenticated:
-                is_exp = pending_orders_expiring(user=self.request.user).filter(id=o.id).exists()
-            ctx["is_expiring"] = bool(is_exp)
-        except Exception:
-            ctx["is_expiring"] = False
+        from payments.models import Payment
+        ctx["payment_summary"] = Payment.summary_for_order(self.object)
+        # Reminder banner: show if pending and expiring in window (con el pack ya cargado)
+        ctx["is_expiring"] = is_expiring(self.object)
         return ctx
 
 
@@ -279,29 +272,16 @@ def my_orders(request):
         qs = qs.filter(metodo_pago=metodo)
 
     if orden == "monto-asc":
-        qs = qs.order_by("precio_pagado", "-creado_at")
+        keys = ("precio_pagado", "-creado_at", "-id")
     elif orden == "monto-desc":
-        qs = qs.order_by("-precio_pagado", "-creado_at")
+        keys = ("-precio_pagado", "-creado_at", "-id")
     else:
-        qs = qs.order_by("-creado_at")
+        keys = ("-creado_at", "-id")
 
-    page = Paginator(qs, 24).get_page(request.GET.get("page"))
+    page = KeysetPaginator(qs, keys, 24).page(request.GET.get("cursor"))
 
-    order_ids = [o.id for o in page.object_list]
-    last_map = {}
-    if order_ids:
-        from payments.models import Payment
-        latest = (Payment.objects
-                  .filter(order_id__in=order_ids)
-                  .values("order_id")
-                  .annotate(last_created=Max("created_at")))
-        keys = {(x["order_id"], x["last_created"]) for x in latest}
-        if keys:
-            pays = Payment.objects.filter(
-                Q(order_id__in=order_ids) & Q(created_at__in=[t[1] for t in keys])
-            )
-            for p in pays:
-                last_map[p.order_id] = p
+    from payments.models import Payment
+    last_map = Payment.objects.latest_by_order([o.id for o in page.object_list])
     for o in page.object_list:
         o.last_payment = last_map.get(o.id)
 
@@ -354,6 +334,7 @@ _CAT_VALUE = {
 }
 
 
+@catalog_http_cache
 def categoria_list(request, slug: str):
     slug = (slug or "").strip().lower()
     titulo = CATEGORY_LABELS.get(slug)
@@ -365,7 +346,7 @@ def categoria_list(request, slug: str):
         raise Http404("Categoría no disponible")
 
     now = timezone.now()
-    qs = Pack.objects.select_related("partner").filter(partner__categoria=cat_value)
+    qs = Pack.objects.filter(partner__categoria=cat_value)
 
     oferta = request.GET.get("oferta") == "1"
     stock = request.GET.get("stock") == "1"
@@ -379,27 +360,9 @@ def categoria_list(request, slug: str):
         qs = qs.filter(pickup_start__lte=now, pickup_end__gte=now)
 
     orden = (request.GET.get("orden") or "nuevo").strip()
-    if orden == "precio-asc":
-        qs = qs.order_by(
-            F("precio_oferta").asc(nulls_last=True),
-            F("precio_original").asc(nulls_last=True),
-            "-creado_at",
-        )
-    elif orden == "precio-desc":
-        qs = qs.order_by(
-            F("precio_oferta").desc(nulls_last=True),
-            F("precio_original").desc(nulls_last=True),
-            "-creado_at",
-        )
-    elif orden == "mas-comprado":
-        try:
-            qs = qs.annotate(n=Count("orders")).order_by("-n", "-creado_at")
-        except Exception:
-            qs = qs.order_by("-creado_at")
-    else:
-        qs = qs.order_by("-creado_at")
-
-    page = Paginator(qs, 24).get_page(request.GET.get("page"))
+    page = pack_cards_page(qs, orden, request.GET.get("cursor"), per_page=24)
+    if request.GET.get("partial") == "1":
+        return cards_fragment(request, "partials/pack_cards.html", page)
     ctx = {
         "slug": slug,
         "titulo": titulo,
@@ -414,6 +377,7 @@ def categoria_list(request, slug: str):
     return render(request, "marketplace/categoria_list.html", ctx)
 
 
+@catalog_http_cache
 def partner_detail(request, slug_or_id):
     now = timezone.now()
     partner = None
@@ -439,16 +403,9 @@ def partner_detail(request, slug_or_id):
         qs = qs.filter(pickup_start__lte=now, pickup_end__gte=now)
 
     orden = (request.GET.get("orden") or "nuevo").strip()
-    if orden == "precio-asc":
-        qs = qs.order_by(F("precio_oferta").asc(nulls_last=True), F("precio_original").asc(nulls_last=True), "-creado_at")
-    elif orden == "precio-desc":
-        qs = qs.order_by(F("precio_oferta").desc(nulls_last=True), F("precio_original").desc(nulls_last=True), "-creado_at")
-    elif orden == "mas-comprado":
-        qs = qs.annotate(n=Count("orders")).order_by("-n", "-creado_at")
-    else:
-        qs = qs.order_by("-creado_at")
-
-    page = Paginator(qs, 24).get_page(request.GET.get("page"))
+    page = pack_cards_page(qs, orden, request.GET.get("cursor"), per_page=24)
+    if request.GET.get("partial") == "1":
+        return cards_fragment(request, "partials/partner_pack_cards.html", page)
 
     is_open = qs.filter(pickup_start__lte=now, pickup_end__gte=now).exists()
     meta_title = f"{partner.nombre} — ResQFood"
@@ -469,29 +426,29 @@ def partner_detail(request, slug_or_id):
 
 # --- endpoint que devuelve el PNG del QR (solo dueÃ±o) ---
 from django.utils.decorators import method_decorator
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_http_methods
 from django.contrib.auth.decorators import login_required
 
 @login_required
 @require_GET
-def order_qr_view(request, pk: int):
-    try:
-        order = (Order.objects
-                 .select_related("pack", "pack__partner")
-                 .get(pk=pk, user=request.user))
-    except Order.DoesNotExist:
+def order_qr_view(request, pk: int, fmt: str = "png"):
+    pack_id = (Order.objects
+               .filter(pk=pk, user=request.user)
+               .values_list("pack_id", flat=True)
+               .first())
+    if pack_id is None:
         raise Http404("Orden no encontrada")
 
-    # Payload firmado (para evitar manipulaciones)
-    # PodÃ©s incluir mÃ¡s campos si querÃ©s
-    payload = {"order_id": order.id, "pack_id": order.pack_id}
-    signed = signing.dumps(payload)  # incluye firma y timestamp
-
-    # Generar QR como PNG
-    img = qrcode.make(signed, box_size=8, border=2)
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return HttpResponse(buf.getvalue(), content_type="image/png")
+    # Imagen cacheada por (orden, versión de payload): las recargas no vuelven a firmar ni dibujar
+    qr = qr_service.order_qr(pk, pack_id, fmt)
+    res = get_conditional_response(request, etag=qr["etag"], last_modified=qr["last_modified"].timestamp())
+    if res is None:
+        res = HttpResponse(qr["content"], content_type=qr_service.CONTENT_TYPES[fmt])
+    res["ETag"] = qr["etag"]
+    res["Last-Modified"] = http_date(qr["last_modified"].timestamp())
+    # Privado (es del usuario) y siempre revalidado: el navegador recibe 304 si no cambió
+    patch_cache_control(res, private=True, max_age=0, must_revalidate=True)
+    return res
 
 
 @login_required
@@ -499,6 +456,27 @@ def partner_redeem_page(request):
     return render(request, "partner/redeem.html")
 
 
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def stock_images_stats(request):
+    """Contadores del índice de imágenes stock (hits/misses/builds). POST los pone en cero."""
+    data = stock_image_stats()
+    if request.method == "POST":
+        stock_index.reset_stats()
+    resp = JsonResponse(data)
+    resp["Cache-Control"] = "no-store"
+    return resp
+
+
+@require_GET
+def search_suggest(request):
+    """Autocompletar: índice de prefijos en memoria, sin consultas a la base."""
+    q = (request.GET.get("q") or "").strip()[:64]
+    resp = JsonResponse({"q": q, "results": suggest_index.suggest(q)})
+    resp["Cache-Control"] = "public, max-age=30"
+    return resp
+
+
 class CartViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -508,7 +486,7 @@ class CartViewSet(viewsets.ViewSet):
 
     def list(self, request):
         cart = self._get_or_create_cart(request)
-        return response.Response(cart.to_dict())
+        return response.Response(cart.snapshot().to_dict())
 
     @decorators.action(detail=False, methods=["post"], url_path="add")
     def add(self, request):
@@ -525,11 +503,12 @@ class CartViewSet(viewsets.ViewSet):
             return response.Response({"detail": "El pack no est1 disponible"}, status=status.HTTP_400_BAD_REQUEST)
 
         cart = self._get_or_create_cart(request)
-        existing_merchant = cart.merchant()
+        snap = cart.snapshot()
+        existing_merchant = snap.merchant
         if existing_merchant and existing_merchant.id != pack.partner_id:
             return response.Response({"detail": "El carrito admite solo packs del mismo comercio."}, status=status.HTTP_400_BAD_REQUEST)
 
-        start_max, end_min = cart.window_intersection()
+        start_max, end_min = snap.window_start, snap.window_end
         if start_max and end_min:
             new_start = max(start_max, pack.pickup_start)
             new_end = min(end_min, pack.pickup_end)
@@ -537,10 +516,10 @@ class CartViewSet(viewsets.ViewSet):
                 return response.Response({"detail": "La ventana de retiro no es compatible con el carrito."}, status=status.HTTP_400_BAD_REQUEST)
 
         created = False
-        if not CartItem.objects.filter(cart=cart, pack=pack).exists():
-            CartItem.objects.create(cart=cart, pack=pack, quantity=1)
+        if not any(it.pack_id == pack.id for it in snap.items):
+            snap = snap.with_item(CartItem.objects.create(cart=cart, pack=pack, quantity=1))
             created = True
-        data = cart.to_dict()
+        data = snap.to_dict()
         if not created:
             data["detail"] = "Ya estÃ¡ en el carrito"
         return response.Response(data)
@@ -552,13 +531,13 @@ class CartViewSet(viewsets.ViewSet):
             return response.Response({"detail": "Falta pack_id"}, status=status.HTTP_400_BAD_REQUEST)
         cart = self._get_or_create_cart(request)
         CartItem.objects.filter(cart=cart, pack_id=pack_id).delete()
-        return response.Response(cart.to_dict())
+        return response.Response(cart.snapshot().to_dict())
 
     @decorators.action(detail=False, methods=["post"], url_path="clear")
     def clear(self, request):
         cart = self._get_or_create_cart(request)
         CartItem.objects.filter(cart=cart).delete()
-        return response.Response(cart.to_dict())
+        return response.Response(CartSnapshot([]).to_dict())
 
     @decorators.action(detail=False, methods=["post"], url_path="checkout")
     def checkout(self, request):
@@ -568,71 +547,66 @@ class CartViewSet(viewsets.ViewSet):
             return response.Response({"detail": "El carrito estÃ¡ vacÃ­o"}, status=status.HTTP_400_BAD_REQUEST)
 
         pack_ids = [it.pack_id for it in items]
-        with transaction.atomic():
-            # lock packs for availability re-check
-            packs_qs = (Pack.objects
-                        .select_for_update()
-                        .select_related("partner")
-                        .filter(id__in=pack_ids))
-            packs_by_id = {p.id: p for p in packs_qs}
-
-            # validate single merchant
-            partner_ids = {packs_by_id[pid].partner_id for pid in pack_ids}
-            if len(partner_ids) != 1:
-                return response.Response({"detail": "El carrito admite solo packs del mismo comercio."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # validate vigente and stock, and window intersection
-            now = timezone.now()
-            starts = []
-            ends = []
-            for it in items:
-                p = packs_by_id.get(it.pack_id)
-                if not p:
-                    return response.Response({"detail": f"Pack {it.pack_id} inexistente"}, status=status.HTTP_400_BAD_REQUEST)
-                if not (p.stock > 0 and p.pickup_start <= now <= p.pickup_end):
-                    return response.Response({"detail": f"{p.titulo} ya no estÃ¡ disponible"}, status=status.HTTP_400_BAD_REQUEST)
-                starts.append(p.pickup_start)
-                ends.append(p.pickup_end)
-            start_max = max(starts)
-            end_min = min(ends)
-            if start_max > end_min:
-                return response.Response({"detail": "La ventana de retiro no es compatible entre los packs del carrito."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Idempotency: if there are pending orders for this user that match current cart packs, reuse
-            existing_qs = (Order.objects
-                           .filter(user=request.user, estado=Order.Estado.PENDIENTE, pack_id__in=pack_ids))
-            existing_pack_ids = set(existing_qs.values_list('pack_id', flat=True))
-            if existing_pack_ids == set(pack_ids):
-                first_id = existing_qs.order_by('id').values_list('id', flat=True).first()
-                redirect_url = reverse('order_detail_public', args=[first_id]) + "?from=cart"
-                return response.Response({"order_id": first_id, "detail_url": redirect_url}, status=status.HTTP_200_OK)
-
-            # create one Order per cart item, but skip stock decrement until payment
-            order_ids = []
-            for it in items:
-                p = packs_by_id[it.pack_id]
-                o = Order(user=request.user, pack=p, precio_pagado=p.precio_oferta, estado=Order.Estado.PENDIENTE)
-                o._skip_stock = True
-                try:
-                    o.save()
-                except ValidationError as e:
-                    transaction.set_rollback(True)
-                    return response.Response({"detail": f"No se pudo crear la orden para {p.titulo}: {e.message}"}, status=status.HTTP_409_CONFLICT)
-                order_ids.append(o.id)
+        # Validaciones sobre una lectura sin lock; el stock se aparta al final con
+        # UPDATE condicionales + StockHold (services.inventory)
+        packs_by_id = {p.id: p for p in Pack.objects.select_related("partner").filter(id__in=pack_ids)}
+
+        # validate single merchant
+        if any(pid not in packs_by_id for pid in pack_ids):
+            missing = next(pid for pid in pack_ids if pid not in packs_by_id)
+            return response.Response({"detail": f"Pack {missing} inexistente"}, status=status.HTTP_400_BAD_REQUEST)
+        partner_ids = {packs_by_id[pid].partner_id for pid in pack_ids}
+        if len(partner_ids) != 1:
+            return response.Response({"detail": "El carrito admite solo packs del mismo comercio."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # validate vigente and stock, and window intersection
+        now = timezone.now()
+        starts = []
+        ends = []
+        for it in items:
+            p = packs_by_id[it.pack_id]
+            if not (p.stock > 0 and p.pickup_start <= now <= p.pickup_end):
+                return response.Response({"detail": f"{p.titulo} ya no estÃ¡ disponible"}, status=status.HTTP_400_BAD_REQUEST)
+            starts.append(p.pickup_start)
+            ends.append(p.pickup_end)
+        start_max = max(starts)
+        end_min = min(ends)
+        if start_max > end_min:
+            return response.Response({"detail": "La ventana de retiro no es compatible entre los packs del carrito."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Idempotency: if there are pending orders for this user that match current cart packs, reuse
+        existing_qs = (Order.objects
+                       .filter(user=request.user, estado=Order.Estado.PENDIENTE, pack_id__in=pack_ids))
+        existing_pack_ids = set(existing_qs.values_list('pack_id', flat=True))
+        if existing_pack_ids == set(pack_ids):
+            first_id = existing_qs.order_by('id').values_list('id', flat=True).first()
+            redirect_url = reverse('order_detail_public', args=[first_id]) + "?from=cart"
+            return response.Response({"order_id": first_id, "detail_url": redirect_url}, status=status.HTTP_200_OK)
+
+        # one Order per cart item in a single bulk insert; stock is held until payment or STOCK_HOLD_TTL
+        try:
+            orders = inventory.create_checkout_orders(request.user, [packs_by_id[it.pack_id] for it in items], now=now)
+        except ValidationError as e:
+            return response.Response({"detail": e.message}, status=status.HTTP_409_CONFLICT)
+        order_ids = [o.id for o in orders]
 
         first = order_ids[0]
         try:
             redirect_url = reverse('order_detail_public', args=[first]) + "?from=cart"
         except Exception:
             redirect_url = reverse('order_detail', args=[first])
-        return response.Response({"order_id": first, "detail_url": redirect_url}, status=status.HTTP_200_OK)
+        return response.Response(
+            {"order_id": first, "detail_url": redirect_url, "checkout_group": str(orders[0].checkout_group)},
+            status=status.HTTP_200_OK,
+        )
 
 
 @login_required
 def cart_page(request):
     cart, _ = Cart.objects.get_or_create(user=request.user)
+    snap = cart.snapshot()
     pending_order_id = None
-    partner = cart.merchant()
+    partner = snap.merchant
     if partner:
         po = (Order.objects
               .filter(user=request.user, estado=Order.Estado.PENDIENTE, pack__partner=partner)
@@ -641,8 +615,9 @@ def cart_page(request):
               .first())
         if po:
             pending_order_id = po.id
-    return render(request, "marketplace/cart.html", {"cart": cart, "pending_order_id": pending_order_id})
+    return render(request, "marketplace/cart.html", {"cart": snap, "pending_order_id": pending_order_id})
 
+@catalog_http_cache
 def merchant_detail(request, slug):
     now = timezone.now()
     partner = get_object_or_404(Partner, slug=slug)
@@ -6,4 +6,5 @@ app_name = "packs"
 urlpatterns = [
     path("", views.pack_list, name="list"),
     path("<int:pk>/", views.pack_detail, name="detail"),
+    path("stock/stream/", views.pack_stock_stream, name="stock_stream"),
 ]
@@ -1,14 +1,20 @@
-﻿from django.shortcuts import render, get_object_or_404
+﻿from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
-from django.core.paginator import Paginator
-from django.db.models import F, Count
+from django.db.models import F
 from marketplace.models import Pack, Order
 from payments.models import Payment
 from marketplace.utils.images import stock_image_url
+from marketplace.services.cards import pack_cards_page
+from marketplace.services.keyset import cards_fragment
+from marketplace.services.catalog_cache import catalog_http_cache
+from marketplace.services.stock_stream import parse_pack_ids, stock_events
 
+@catalog_http_cache
 def pack_list(request):
     now = timezone.now()
-    qs = Pack.objects.select_related("partner").all()
+    qs = Pack.objects.all()
 
     oferta = request.GET.get("oferta") == "1"
     stock = request.GET.get("stock") == "1"
@@ -21,28 +27,11 @@ def pack_list(request):
     if abierto:
         qs = qs.filter(pickup_start__lte=now, pickup_end__gte=now)
 
+    # Orden y paginación por cursor (keyset); ver services.keyset.PACK_ORDERINGS
     orden = (request.GET.get("orden") or "nuevo").strip()
-    if orden == "precio-asc":
-        qs = qs.order_by(
-            F("precio_oferta").asc(nulls_last=True),
-            F("precio_original").asc(nulls_last=True),
-            "-creado_at",
-        )
-    elif orden == "precio-desc":
-        qs = qs.order_by(
-            F("precio_oferta").desc(nulls_last=True),
-            F("precio_original").desc(nulls_last=True),
-            "-creado_at",
-        )
-    elif orden == "mas-comprado":
-        try:
-            qs = qs.annotate(n=Count("orders")).order_by("-n", "-creado_at")
-        except Exception:
-            qs = qs.order_by("-creado_at")
-    else:
-        qs = qs.order_by("-creado_at")
-
-    page = Paginator(qs, 24).get_page(request.GET.get("page"))
+    page = pack_cards_page(qs, orden, request.GET.get("cursor"), per_page=24)
+    if request.GET.get("partial") == "1":
+        return cards_fragment(request, "partials/pack_cards.html", page)
 
     return render(
         request,
@@ -56,6 +45,7 @@ def pack_list(request):
         },
     )
 
+@catalog_http_cache
 def pack_detail(request, pk):
     pack = get_object_or_404(Pack.objects.select_related("partner"), pk=pk)
     now = timezone.now()
@@ -86,7 +76,7 @@ def pack_detail(request, pk):
 
     last_payment = None
     if pending_order:
-        last_payment = Payment.objects.filter(order=pending_order).order_by("-created_at").first()
+        last_payment = Payment.objects.latest_for(pending_order)
 
     related = (
         Pack.objects.filter(partner=pack.partner).exclude(id=pack.id).order_by("-creado_at")[:8]
@@ -124,9 +114,17 @@ def pack_detail(request, pk):
     return render(request, "marketplace/pack_detail.html", ctx)
 
 
-
-
-
-
-
-
+async def pack_stock_stream(request):
+    """SSE con el stock de ?ids=1,2,3 (ver services/stock_stream.py). Solo bajo ASGI."""
+    ids = parse_pack_ids(request.GET.get("ids"))
+    if not ids:
+        return HttpResponseBadRequest("ids requerido")
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI la respuesta se bufferearía entera: 204 le dice al EventSource que no reconecte
+        return HttpResponse(status=204)
+    res = StreamingHttpResponse(stock_events(ids), content_type="text/event-stream")
+    res["Cache-Control"] = "no-cache"
+    res["X-Accel-Buffering"] = "no"  # nginx: no bufferear el stream
+    # Stock público y sin cookies: las páginas lo piden desde el origen del sitio (STOCK_STREAM_URL)
+    res["Access-Control-Allow-Origin"] = "*"
+    return res
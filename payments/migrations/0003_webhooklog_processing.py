@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+def mark_existing_processed(apps, schema_editor):
+    # Los eventos previos ya se procesaron dentro del request
+    WebhookLog = apps.get_model("payments", "WebhookLog")
+    WebhookLog.objects.filter(processed_at__isnull=True).update(
+        processed_at=models.F("created_at"), result="legacy",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_webhooklog_payment_payment_id_payment_raw_event_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhooklog',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='webhooklog',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='webhooklog',
+            name='result',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.RunPython(mark_existing_processed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='webhooklog',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='webhooklog_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_webhooklog_processing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['order', '-created_at'], name='payment_order_created_idx'),
+        ),
+    ]
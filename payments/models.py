@@ -1,9 +1,37 @@
 from django.db import models
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.conf import settings
 from django.utils import timezone
 from typing import Optional, Dict
 
 
+class PaymentQuerySet(models.QuerySet):
+    """
+    "Último pago" de una orden = el más nuevo por created_at (id desempata).
+    Usar estos métodos en vez de armar el order_by().first() en cada vista.
+    """
+
+    def newest_first(self):
+        return self.order_by("-created_at", "-id")
+
+    def latest_for(self, order):
+        return self.filter(order=order).newest_first().first()
+
+    def latest_by_order(self, order_ids):
+        """{order_id: último Payment} para N órdenes en una sola query (ROW_NUMBER por orden)."""
+        rows = (self.filter(order_id__in=order_ids)
+                .annotate(_row=Window(RowNumber(), partition_by=F("order_id"),
+                                      order_by=[F("created_at").desc(), F("id").desc()]))
+                .filter(_row=1))
+        return {p.order_id: p for p in rows}
+
+
+def latest_payment_prefetch(to_attr="latest_payments"):
+    """Prefetch del último pago de cada orden (lista de 0 o 1 elementos en `to_attr`)."""
+    return Prefetch("payments", queryset=Payment.objects.newest_first()[:1], to_attr=to_attr)
+
+
 class Payment(models.Model):
     PROVIDERS = (
         ("mp", "MercadoPago"),
@@ -29,12 +57,20 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
 
+    objects = PaymentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Último pago por orden (PaymentQuerySet)
+            models.Index(fields=["order", "-created_at"], name="payment_order_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.provider}:{self.status} for {self.order_id}"
 
     @staticmethod
     def last_for_order(order):
-        return Payment.objects.filter(order=order).order_by('-created_at').first()
+        return Payment.objects.latest_for(order)
 
     def apply_status(self, new_status: str):
         terminal_priority = {
@@ -67,8 +103,12 @@ class Payment(models.Model):
     def summary_for_order(cls, order) -> Dict:
         """
         Devuelve un resumen amigable del último pago para un pedido.
+        Si la orden vino con latest_payment_prefetch() no hace query.
         """
-        pay = cls.objects.filter(order=order).order_by('-created_at').first()
+        if hasattr(order, "latest_payments"):
+            pay = order.latest_payments[0] if order.latest_payments else None
+        else:
+            pay = cls.objects.latest_for(order)
         if not pay:
             return {
                 "exists": False,
@@ -91,7 +131,18 @@ class Payment(models.Model):
 
 
 class WebhookLog(models.Model):
+    """Evento recibido por webhook. Se guarda al llegar y lo procesa payments.reconcile."""
     request_id = models.CharField(max_length=128, unique=True)
     headers = models.JSONField()
     body = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Completados por el reconciliador
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    result = models.CharField(max_length=20, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], name="webhooklog_pending_idx",
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
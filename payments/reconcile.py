@@ -0,0 +1,203 @@
+"""
+Reconciliación de pagos de Mercado Pago, fuera del request.
+
+El webhook solo verifica la firma y guarda el evento (WebhookLog). Acá se
+consulta la API de MP y los eventos se aplican agrupados por orden, con un
+único lock de la orden por lote. Payment.apply_status no baja de estado y
+Order.mark_paid no descuenta dos veces: reprocesar un evento no cambia nada.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from marketplace.models import Order
+
+from .models import Payment, WebhookLog
+
+logger = logging.getLogger(__name__)
+
+try:
+    import mercadopago  # type: ignore
+except Exception:  # pragma: no cover
+    mercadopago = None
+
+# Eventos cuya consulta a MP falla se reintentan hasta esta cantidad de veces
+MAX_ATTEMPTS = 5
+
+
+class ProviderUnavailable(RuntimeError):
+    """No hay SDK de MP (no instalado o mal configurado): los eventos siguen pendientes."""
+
+
+def _map_status(mp_status: str) -> str:
+    s = (mp_status or "").lower()
+    if s in ("approved",):
+        return "approved"
+    if s in ("pending", "in_process", "authorized"):
+        return "pending"
+    if s in ("rejected",):
+        return "rejected"
+    if s in ("cancelled", "canceled"):
+        return "cancelled"
+    if s in ("refunded",):
+        return "refunded"
+    if s in ("charged_back", "chargeback"):
+        return "chargeback"
+    return "pending"
+
+
+def _sdk():
+    if mercadopago is None:
+        return None
+    try:
+        return mercadopago.SDK(settings.MP_ACCESS_TOKEN)
+    except Exception:
+        return None
+
+
+def fetch_event(sdk, mp_id, topic):
+    """Consulta MP. Devuelve (external_reference, status); status None si no es un pago."""
+    if topic in ("payment", "payments", ""):
+        resp = sdk.payment().get(mp_id)
+        data = resp.get("response", {}) if isinstance(resp, dict) else {}
+        return data.get("external_reference"), data.get("status")
+    if topic in ("merchant_order", "merchant_orders"):
+        resp = sdk.merchant_order().get(mp_id)
+        mo = resp.get("response", {}) if isinstance(resp, dict) else {}
+        return mo.get("external_reference"), None
+    return None, None
+
+
+def apply_order_events(order_ref, events):
+    """
+    Aplica a una orden los eventos [(mp_id, mp_status, log|None), ...] en orden de
+    llegada y marca sus logs como procesados, todo en una transacción.
+    Devuelve False si la orden no existe.
+    """
+    logs = [log.pk for _, _, log in events if log is not None]
+    with transaction.atomic():
+        try:
+            order = Order.objects.select_for_update().get(pk=order_ref)
+        except (Order.DoesNotExist, ValueError, TypeError):
+            _mark_processed(logs, "sin_orden")
+            return False
+
+        pay = Payment.objects.filter(provider="mp").latest_for(order)
+        if not pay:
+            pay = Payment.objects.create(order=order, provider="mp", status="pending")
+
+        mp_id, _, log = events[-1]
+        pay.payment_id = str(mp_id)
+        if log is not None:
+            pay.raw_event = log.body
+            if not log.request_id.startswith("no-id-"):
+                pay.request_id = log.request_id
+        pay.save(update_fields=["payment_id", "raw_event", "request_id"])
+
+        approved = False
+        for _, mp_status, _ in events:
+            new_status = _map_status(mp_status)
+            pay.apply_status(new_status)
+            approved = approved or new_status == "approved"
+        result = "aplicado"
+        if approved and not order.mark_paid():
+            # Pago aprobado de una orden cancelada/expirada sin stock: queda para devolver
+            logger.warning("Pago aprobado sin stock para la orden %s (estado %s)", order.pk, order.estado)
+            result = "sin_stock"
+        _mark_processed(logs, result)
+    return True
+
+
+def _mark_processed(log_ids, result):
+    if log_ids:
+        WebhookLog.objects.filter(pk__in=log_ids).update(processed_at=timezone.now(), result=result)
+
+
+def process_webhook_batch(after_id=0, limit=200):
+    """
+    Procesa hasta `limit` eventos pendientes con id > after_id.
+    Devuelve (procesados, con_error, último_id_visto).
+    """
+    logs = list(WebhookLog.objects
+                .filter(processed_at__isnull=True, pk__gt=after_id)
+                .order_by("id")[:limit])
+    if not logs:
+        return 0, 0, after_id
+    last_id = logs[-1].pk
+    sdk = _sdk()
+    if sdk is None:
+        # Sin marcar nada: el job falla y el worker reintenta con backoff
+        raise ProviderUnavailable("SDK de Mercado Pago no disponible")
+
+    by_order = defaultdict(list)
+    ignored, failed = [], []
+    for log in logs:
+        data = log.body.get("data") or {}
+        mp_id = data.get("id") or log.body.get("id")
+        topic = (log.body.get("type") or log.body.get("topic") or "").lower()
+        if not mp_id:
+            ignored.append(log.pk)
+            continue
+        try:
+            ref, status = fetch_event(sdk, mp_id, topic)
+        except Exception:
+            failed.append(log.pk)
+            continue
+        if not ref:
+            ignored.append(log.pk)
+            continue
+        by_order[str(ref)].append((mp_id, status, log))
+
+    _mark_processed(ignored, "ignorado")
+    for ref, events in by_order.items():
+        apply_order_events(ref, events)
+    if failed:
+        # Quedan pendientes para la próxima corrida, salvo que agoten los intentos
+        WebhookLog.objects.filter(pk__in=failed).update(attempts=F("attempts") + 1)
+        WebhookLog.objects.filter(pk__in=failed, attempts__gte=MAX_ATTEMPTS).update(
+            processed_at=timezone.now(), result="error",
+        )
+    return len(logs) - len(failed), len(failed), last_id
+
+
+def process_pending_webhooks(limit=200):
+    """Procesa lotes hasta agotar los pendientes (los que fallan esperan a la próxima corrida)."""
+    processed = failed = 0
+    last_id = 0
+    while True:
+        ok, bad, last_id_seen = process_webhook_batch(after_id=last_id, limit=limit)
+        if not ok and not bad:
+            return processed, failed
+        processed, failed, last_id = processed + ok, failed + bad, last_id_seen
+
+
+def refresh_pending_payments(max_age_hours=72, limit=200):
+    """
+    Vuelve a consultar los pagos MP que siguen pendientes (webhooks perdidos).
+    Devuelve (consultados, actualizados, errores).
+    """
+    sdk = _sdk()
+    if sdk is None or not settings.MP_ACCESS_TOKEN:
+        return 0, 0, 0
+    since = timezone.now() - timedelta(hours=max_age_hours)
+    pending = (Payment.objects
+               .filter(provider="mp", status="pending", payment_id__isnull=False, created_at__gte=since)
+               .exclude(payment_id="")
+               .order_by("created_at")[:limit])
+    checked = updated = errors = 0
+    for pay in pending:
+        checked += 1
+        try:
+            _, status = fetch_event(sdk, pay.payment_id, "payment")
+        except Exception:
+            errors += 1
+            continue
+        if _map_status(status) != "pending":
+            apply_order_events(pay.order_id, [(pay.payment_id, status, None)])
+            updated += 1
+    return checked, updated, errors
@@ -0,0 +1,22 @@
+"""
+Tareas de fondo de pagos (ver payments/reconcile.py).
+
+`process_webhooks` la encola el webhook al guardar cada evento; además corre
+periódicamente por si algún evento quedó sin procesar. `reconcile_mp_payments`
+vuelve a consultar los pagos pendientes: cubre webhooks que nunca llegaron.
+"""
+from jobs.registry import task
+
+from . import reconcile
+
+
+@task("payments.process_webhooks", every=60, max_attempts=5, retry_backoff=10, concurrency=1)
+def process_webhooks(limit=200):
+    processed, failed = reconcile.process_pending_webhooks(limit=limit)
+    return {"processed": processed, "failed": failed}
+
+
+@task("payments.reconcile_mp_payments", every=600, max_attempts=3, concurrency=1)
+def reconcile_mp_payments(max_age_hours=72, limit=200):
+    checked, updated, errors = reconcile.refresh_pending_payments(max_age_hours=max_age_hours, limit=limit)
+    return {"checked": checked, "updated": updated, "errors": errors}
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from marketplace.models import Partner, Pack, Order
+from payments.models import Payment, latest_payment_prefetch
+
+User = get_user_model()
+
+
+class LatestPaymentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("u1", password="pass")
+        owner = User.objects.create_user("owner", password="pass")
+        partner = Partner.objects.create(owner=owner, categoria=Partner.Categoria.CAFE, nombre="Cafe", direccion="x")
+        now = timezone.now()
+        pack = Pack.objects.create(
+            partner=partner, titulo="Pack", etiqueta=Pack.Etiqueta.EXCEDENTE,
+            precio_original=1000, precio_oferta=500, stock=10,
+            pickup_start=now - timedelta(hours=1), pickup_end=now + timedelta(hours=2),
+        )
+        self.orders = [Order.objects.create(user=self.user, pack=pack, precio_pagado=500) for _ in range(3)]
+        a, b, _ = self.orders
+        Payment.objects.create(order=a, provider="mp", status="rejected")
+        self.latest_a = Payment.objects.create(order=a, provider="mp", status="approved")
+        first_b = Payment.objects.create(order=b, provider="efectivo", status="pending")
+        self.latest_b = Payment.objects.create(order=b, provider="transferencia", status="pending")
+        # Mismo created_at: desempata el id (antes devolvía los dos)
+        Payment.objects.filter(order=b).update(created_at=first_b.created_at)
+
+    def test_latest_by_order_single_query(self):
+        with self.assertNumQueries(1):
+            latest = Payment.objects.latest_by_order([o.id for o in self.orders])
+        self.assertEqual(latest, {self.orders[0].id: self.latest_a, self.orders[1].id: self.latest_b})
+        self.assertEqual(Payment.objects.latest_by_order([]), {})
+
+    def test_latest_for_and_summary(self):
+        a, b, c = self.orders
+        self.assertEqual(Payment.objects.latest_for(b), self.latest_b)
+        self.assertEqual(Payment.objects.filter(provider="efectivo").latest_for(b).provider, "efectivo")
+        self.assertIsNone(Payment.objects.latest_for(c))
+        self.assertEqual(Payment.summary_for_order(a)["status"], "approved")
+
+    def test_prefetch(self):
+        with self.assertNumQueries(2):
+            orders = list(Order.objects.filter(user=self.user).order_by("id").prefetch_related(latest_payment_prefetch()))
+            summaries = [Payment.summary_for_order(o) for o in orders]
+        self.assertEqual([s["exists"] for s in summaries], [True, True, False])
+        self.assertEqual(orders[1].latest_payments, [self.latest_b])
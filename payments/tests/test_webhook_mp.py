@@ -6,8 +6,10 @@ from datetime import timedelta
 
 from django.contrib.auth import get_user_model
 
+from jobs.models import Job
+from jobs.worker import Worker
 from marketplace.models import Partner, Pack, Order
-from payments.models import Payment
+from payments.models import Payment, WebhookLog
 
 
 User = get_user_model()
@@ -25,8 +27,14 @@ class MPWebhookTests(TestCase):
         self.order = Order.objects.create(user=self.user, pack=self.pack, precio_pagado=self.pack.precio_oferta, estado=Order.Estado.PENDIENTE)
         self.url = '/webhooks/mercadopago/'
 
+    def _post(self, body, **extra):
+        # El webhook solo guarda el evento; el worker lo aplica
+        r = self.client.post(self.url, data=body, content_type='application/json', **extra)
+        Worker(only=["payments.process_webhooks"]).run_pending()
+        return r
+
     @override_settings(MP_WEBHOOK_SECRET="")
-    @patch('payments.views_webhooks.mercadopago')
+    @patch('payments.reconcile.mercadopago')
     def test_webhook_approved_marks_paid_once(self, mock_mp):
         Payment.objects.create(order=self.order, provider='mp', status='pending')
 
@@ -41,8 +49,7 @@ class MPWebhookTests(TestCase):
         mock_mp.SDK = SDK
 
         body = {"type": "payment", "data": {"id": "999"}}
-        r = self.client.post(self.url, data=body, content_type='application/json',
-                             **{"HTTP_X_REQUEST_ID": "abc123"})
+        r = self._post(body, **{"HTTP_X_REQUEST_ID": "abc123"})
         self.assertEqual(r.status_code, 200)
         self.order.refresh_from_db()
         self.assertEqual(self.order.estado, Order.Estado.PAGADO)
@@ -51,12 +58,11 @@ class MPWebhookTests(TestCase):
         self.assertGreaterEqual(self.pack.stock, 1)
 
         # Send duplicate (same request id) -> no change but still 200
-        r2 = self.client.post(self.url, data=body, content_type='application/json',
-                              **{"HTTP_X_REQUEST_ID": "abc123"})
+        r2 = self._post(body, **{"HTTP_X_REQUEST_ID": "abc123"})
         self.assertEqual(r2.status_code, 200)
 
     @override_settings(MP_WEBHOOK_SECRET="")
-    @patch('payments.views_webhooks.mercadopago')
+    @patch('payments.reconcile.mercadopago')
     def test_webhook_idempotent_by_request_id(self, mock_mp):
         order_id = str(self.order.id)
         class Pay:
@@ -68,10 +74,8 @@ class MPWebhookTests(TestCase):
         mock_mp.SDK = SDK
 
         body = {"type": "payment", "data": {"id": "999"}}
-        r1 = self.client.post(self.url, data=body, content_type='application/json',
-                              **{"HTTP_X_REQUEST_ID": "same-id"})
-        r2 = self.client.post(self.url, data=body, content_type='application/json',
-                              **{"HTTP_X_REQUEST_ID": "same-id"})
+        r1 = self._post(body, **{"HTTP_X_REQUEST_ID": "same-id"})
+        r2 = self._post(body, **{"HTTP_X_REQUEST_ID": "same-id"})
         self.assertEqual(r1.status_code, 200)
         self.assertEqual(r2.status_code, 200)
         # Order remains paid exactly once
@@ -79,7 +83,7 @@ class MPWebhookTests(TestCase):
         self.assertEqual(self.order.estado, Order.Estado.PAGADO)
 
     @override_settings(MP_WEBHOOK_SECRET="")
-    @patch('payments.views_webhooks.mercadopago')
+    @patch('payments.reconcile.mercadopago')
     def test_webhook_out_of_order_downgrade_ignored(self, mock_mp):
         # First approved
         order_id = str(self.order.id)
@@ -91,7 +95,7 @@ class MPWebhookTests(TestCase):
             def payment(self): return PayApproved()
         mock_mp.SDK = SDKApproved
         body = {"type": "payment", "data": {"id": "1"}}
-        self.client.post(self.url, data=body, content_type='application/json')
+        self._post(body)
 
         # Then pending for same payment
         class PayPending:
@@ -102,7 +106,7 @@ class MPWebhookTests(TestCase):
             def payment(self): return PayPending()
         mock_mp.SDK = SDKPending
         body2 = {"type": "payment", "data": {"id": "1"}}
-        r2 = self.client.post(self.url, data=body2, content_type='application/json')
+        r2 = self._post(body2)
         self.assertEqual(r2.status_code, 200)
 
         # Payment stays approved
@@ -120,7 +124,7 @@ class MPWebhookTests(TestCase):
         self.assertEqual(r.status_code, 403)
 
     @override_settings(MP_WEBHOOK_SECRET="")
-    @patch('payments.views_webhooks.mercadopago')
+    @patch('payments.reconcile.mercadopago')
     def test_webhook_handles_missing_order_safely(self, mock_mp):
         class Pay:
             def get(self, pid):
@@ -131,5 +135,73 @@ class MPWebhookTests(TestCase):
         mock_mp.SDK = SDK
 
         body = {"type": "payment", "data": {"id": "999"}}
-        r = self.client.post(self.url, data=body, content_type='application/json')
+        r = self._post(body)
         self.assertEqual(r.status_code, 200)
+        self.assertEqual(WebhookLog.objects.get().result, "sin_orden")
+
+    @override_settings(MP_WEBHOOK_SECRET="")
+    @patch('payments.reconcile.mercadopago')
+    def test_ingest_does_not_call_provider(self, mock_mp):
+        body = {"type": "payment", "data": {"id": "999"}}
+        for _ in range(2):
+            r = self.client.post(self.url, data=body, content_type='application/json',
+                                 **{"HTTP_X_REQUEST_ID": "fast-1"})
+            self.assertEqual(r.status_code, 200)
+        mock_mp.SDK.assert_not_called()
+        log = WebhookLog.objects.get()
+        self.assertIsNone(log.processed_at)
+        self.assertEqual(Job.objects.filter(name="payments.process_webhooks", status=Job.Estado.QUEUED).count(), 1)
+
+    @override_settings(MP_WEBHOOK_SECRET="")
+    @patch('payments.reconcile.mercadopago')
+    def test_events_batched_by_order(self, mock_mp):
+        order_id = str(self.order.id)
+        statuses = {"1": "pending", "2": "approved"}
+        class Pay:
+            def get(self, pid):
+                return {"response": {"external_reference": order_id, "status": statuses[pid]}}
+        class SDK:
+            def __init__(self, token): pass
+            def payment(self): return Pay()
+        mock_mp.SDK = SDK
+
+        for i, pid in enumerate(["2", "1", "2"]):
+            self.client.post(self.url, data={"type": "payment", "data": {"id": pid}},
+                             content_type='application/json', **{"HTTP_X_REQUEST_ID": f"b-{i}"})
+        Worker(only=["payments.process_webhooks"]).run_pending()
+
+        self.assertEqual(Payment.objects.filter(order=self.order).count(), 1)
+        self.assertEqual(Payment.last_for_order(self.order).status, 'approved')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.estado, Order.Estado.PAGADO)
+        self.assertFalse(WebhookLog.objects.filter(processed_at__isnull=True).exists())
+
+    @override_settings(MP_WEBHOOK_SECRET="")
+    @patch('payments.reconcile.mercadopago')
+    def test_provider_error_keeps_event_pending(self, mock_mp):
+        class Pay:
+            def get(self, pid):
+                raise ConnectionError("timeout")
+        class SDK:
+            def __init__(self, token): pass
+            def payment(self): return Pay()
+        mock_mp.SDK = SDK
+
+        self._post({"type": "payment", "data": {"id": "5"}})
+        log = WebhookLog.objects.get()
+        self.assertIsNone(log.processed_at)
+        self.assertEqual(log.attempts, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.estado, Order.Estado.PENDIENTE)
+
+    @override_settings(MP_WEBHOOK_SECRET="")
+    @patch('payments.reconcile.mercadopago', None)
+    def test_missing_sdk_retries_instead_of_dropping(self):
+        self._post({"type": "payment", "data": {"id": "7"}})
+        log = WebhookLog.objects.get()
+        self.assertIsNone(log.processed_at)
+        self.assertEqual(log.result, "")
+        job = Job.objects.get(name="payments.process_webhooks", attempts=1)
+        self.assertEqual(job.status, Job.Estado.QUEUED)
+        self.assertIn("SDK de Mercado Pago", job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
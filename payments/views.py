@@ -8,6 +8,7 @@ from django.utils import timezone
 import uuid
 import logging
 from marketplace.models import Order
+from marketplace.services.inventory import release_hold
 from .models import Payment
 from django.urls import reverse
 from django.conf import settings
@@ -102,7 +103,7 @@ def mp_mock_approve(request, order_id: int):
         # idempotent safe mark paid
         order.mark_paid()
         # mark last payment approved if exists
-        pay = Payment.last_for_order(order)
+        pay = Payment.objects.latest_for(order)
         if pay:
             pay.status = 'approved'
             pay.paid_at = timezone.now()
@@ -121,7 +122,7 @@ def payment_status(request, order_id: int):
         "order_estado": order.estado,
         "paid_at": order.paid_at,
     }
-    pay = Payment.last_for_order(order)
+    pay = Payment.objects.latest_for(order)
     data["payment"] = {
         "provider": getattr(pay, 'provider', None),
         "status": getattr(pay, 'status', None),
@@ -180,9 +181,11 @@ def cash_start(request, order_id: int):
     if order.metodo_pago != "efectivo":
         return HttpResponseBadRequest("El método seleccionado no es efectivo")
 
-    pay = Payment.objects.filter(order=order, provider="efectivo").order_by("-created_at").first()
+    pay = Payment.objects.filter(provider="efectivo").latest_for(order)
     if not pay or pay.status != "pending":
         pay = Payment.objects.create(order=order, provider="efectivo", status="pending")
+    # Reserva confirmada: el reaper de holds ya no la cancela
+    release_hold(order)
 
     return JsonResponse({
         "ok": True,
@@ -203,9 +206,10 @@ def transfer_start(request, order_id: int):
     if order.metodo_pago != "transferencia":
         return HttpResponseBadRequest("El método seleccionado no es transferencia")
 
-    pay = Payment.objects.filter(order=order, provider="transferencia").order_by("-created_at").first()
+    pay = Payment.objects.filter(provider="transferencia").latest_for(order)
     if not pay or pay.status != "pending":
         pay = Payment.objects.create(order=order, provider="transferencia", status="pending")
+    release_hold(order)
 
     bank = {
         "alias": getattr(settings, "BANK_INFO_ALIAS", ""),
@@ -3,5 +3,8 @@ set -euo pipefail
 
 python manage.py migrate --noinput
 python manage.py collectstatic --noinput
+# Avisa si falta STOCK_STREAM_URL: el stock en vivo necesita un segundo servicio
+# de Render con render_stream_start.sh y su URL (.../packs/stock/stream/) en esa variable
+python manage.py check --deploy --tag marketplace
 
 exec gunicorn resqfood.wsgi --preload --workers 2 --timeout 120 --bind 0.0.0.0:10000
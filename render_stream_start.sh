@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Servicio aparte solo para el stock en vivo (packs:stock_stream, SSE bajo ASGI).
+# El sitio sigue en WSGI (render_start.sh) y sus páginas apuntan acá con STOCK_STREAM_URL.
+# En Render: otro Web Service del mismo repo con este start command y las mismas
+# variables de entorno (base de datos); en el servicio principal, STOCK_STREAM_URL=
+# https://<este-servicio>/packs/stock/stream/. Sin eso, `check --deploy` avisa (marketplace.W001).
+exec gunicorn resqfood.asgi:application -k uvicorn_worker.UvicornWorker --workers 1 --timeout 120 --bind 0.0.0.0:10000
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     "packs",
     "payments",
     "usuarios",
+    "jobs",
 
     # Django admin
     "django.contrib.admin",
@@ -95,6 +96,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'marketplace.context_processors.cart_badge',
+                'marketplace.context_processors.stock_stream_url',
                 'core.context_processors.reminders_cp',
             ],
         },
@@ -117,6 +119,51 @@ DATABASES = {
 }
 
 
+# Cache: locmem por defecto; en producción usar un backend compartido
+# (p.ej. CACHE_URL=rediscache://...) para que las invalidaciones lleguen a todos los workers.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# Los índices covering (Index.include) solo existen en Postgres; en SQLite se crean sin esas columnas
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+# TTL (segundos) de las secciones cacheadas de la home; red de seguridad de la invalidación
+HOME_CACHE_TTL = int(os.getenv("HOME_CACHE_TTL", "60"))
+
+# TTL (segundos) de las imágenes QR cacheadas por orden
+QR_CACHE_TTL = int(os.getenv("QR_CACHE_TTL", "86400"))
+
+# Cache HTTP de páginas/APIs públicas del catálogo para anónimos (segundos)
+CATALOG_HTTP_MAX_AGE = int(os.getenv("CATALOG_HTTP_MAX_AGE", "60"))
+CATALOG_HTTP_STALE_WHILE_REVALIDATE = int(os.getenv("CATALOG_HTTP_STALE_WHILE_REVALIDATE", "300"))
+
+# Horas que se conserva el registro de cambios del catálogo (CatalogChange)
+CATALOG_CHANGES_RETENTION_HOURS = int(os.getenv("CATALOG_CHANGES_RETENTION_HOURS", "24"))
+
+# Stock en vivo por SSE (packs:stock_stream); segundos salvo indicación.
+# El stream necesita ASGI y el sitio corre en WSGI: se sirve desde un proceso aparte
+# (Procfile "stream", render_stream_start.sh) y STOCK_STREAM_URL es su URL absoluta.
+# Vacío: mismo origen (bajo WSGI responde 204 y las páginas quedan sin stock en vivo).
+STOCK_STREAM_URL = os.getenv("STOCK_STREAM_URL", "")
+STOCK_STREAM_POLL_INTERVAL = float(os.getenv("STOCK_STREAM_POLL_INTERVAL", "2"))
+STOCK_STREAM_HEARTBEAT = int(os.getenv("STOCK_STREAM_HEARTBEAT", "15"))
+STOCK_STREAM_MAX_SECONDS = int(os.getenv("STOCK_STREAM_MAX_SECONDS", "300"))
+STOCK_STREAM_MAX_PACKS = int(os.getenv("STOCK_STREAM_MAX_PACKS", "100"))  # ids por conexión
+STOCK_STREAM_LOOKBACK = int(os.getenv("STOCK_STREAM_LOOKBACK", "200"))  # filas del registro que se releen
+
+# TTL (segundos) de los contadores del navbar por usuario (carrito, recordatorios)
+BADGE_CACHE_TTL = int(os.getenv("BADGE_CACHE_TTL", "60"))
+
+# Cada cuántos segundos se reconstruye completo el índice de autocompletar de cada
+# proceso (las escrituras de otros workers no le llegan por señales); 0 = nunca
+SUGGEST_INDEX_MAX_AGE = int(os.getenv("SUGGEST_INDEX_MAX_AGE", "300"))
+
+# Segundos que el checkout del carrito aparta stock para una orden sin pagar;
+# vencido, `manage.py reap_stock_holds` la cancela y devuelve el stock
+STOCK_HOLD_TTL = int(os.getenv("STOCK_HOLD_TTL", "900"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -209,6 +256,8 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 USE_STOCK_IMAGES_FOR_EMPTY = True
 # Root under static/ for stock assets
 STOCK_IMAGE_ROOT = "img/stock"
+# Cada cuántos segundos el índice de imágenes stock revisa mtimes (0 = siempre)
+STOCK_IMAGE_INDEX_CHECK_SECONDS = int(os.getenv("STOCK_IMAGE_INDEX_CHECK_SECONDS", "5"))
 # NEW: force stock everywhere (ignore media files)
 USE_STOCK_IMAGES_FORCE_STOCK = True
 
@@ -227,6 +276,10 @@ REMINDER_ENABLED = True
 REMINDER_WINDOW_MINUTES = int(os.getenv("REMINDER_WINDOW_MINUTES", "120"))
 REMINDER_EMAIL_SENDER = os.getenv("REMINDER_EMAIL_SENDER", "notificaciones@resqfood.local")
 
+# Cola de jobs en base (python manage.py runworker)
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "4"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "2"))
+
 
 
 
@@ -248,4 +301,7 @@ if DEBUG:
 else:
     STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
-STORAGES = { "staticfiles": { "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage" } }
+STORAGES = {
+    "default": { "BACKEND": "django.core.files.storage.FileSystemStorage" },
+    "staticfiles": { "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage" },
+}